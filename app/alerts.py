@@ -1,106 +1,227 @@
 from __future__ import annotations
 
-import smtplib
-from email.message import EmailMessage
-from typing import Dict, Any
+import asyncio
+import time
+from typing import Any, Dict, List
 
-import requests
 import structlog
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from plyer import notification
 from sqlalchemy import select
 
 from .config import get_settings
-from .db import SessionLocal
+from .db import ReadSession, SessionLocal
+from .delivery import DeliveryWorker
+from .metrics import ALERT_EVALUATE_SECONDS, ALERTS_SUPPRESSED
 from .models import AlertEvent, AlertRule
+from .rule_index import RuleIndex
+from .versions import DATA, RULES, bump_version, get_version, local_version, notify_local
 
 logger = structlog.get_logger(__name__)
 
+# Matches listed in a digest message; the rest are only counted.
+DIGEST_LINES = 20
+
 
 class AlertEngine:
     def __init__(self):
         self.settings = get_settings()
-        self.scheduler = AsyncIOScheduler()
-        self.scheduler.start()
+        self.delivery = DeliveryWorker(self.settings)
+        self.rule_index: RuleIndex | None = None
+        self._rule_version = None
+        self._local_rule_version = None
+        self._rules_checked_at = 0.0
+        # rule id -> monotonic time it last produced an alert
+        self._rule_fired_at: Dict[int, float] = {}
+        # Throttled matches since the last recorded alert event.
+        self.suppressed = 0
+        self._pending: List[Dict[str, Any]] = []
+        self._window_task: asyncio.Task | None = None
+
+    def _rules_fresh(self) -> bool:
+        return (
+            self.rule_index is not None
+            and local_version(RULES) == self._local_rule_version
+            and time.monotonic() - self._rules_checked_at < self.settings.rule_refresh_seconds
+        )
+
+    def rules(self) -> RuleIndex:
+        """Return the compiled rule index, rebuilding it when the rule stamp moves.
+
+        The DB stamp is only consulted every ``rule_refresh_seconds``; rule
+        changes made in this process are picked up immediately. Blocking:
+        async callers use :meth:`current_rules`.
+        """
+        if self._rules_fresh():
+            return self.rule_index
+        now = time.monotonic()
+        local = local_version(RULES)
+        with ReadSession() as session:
+            version = get_version(session, RULES)
+            if self.rule_index is None or version != self._rule_version:
+                rules = session.scalars(
+                    select(AlertRule).where(AlertRule.active.is_(True))
+                ).all()
+                self.rule_index = RuleIndex(rules)
+                self._rule_version = version
+                logger.info(
+                    "alerts.rules_compiled",
+                    version=version,
+                    rules=self.rule_index.rule_count,
+                )
+        self._local_rule_version = local
+        self._rules_checked_at = now
+        return self.rule_index
+
+    async def current_rules(self) -> RuleIndex:
+        """:meth:`rules`, with any stamp check or rebuild run off the event loop."""
+        if self._rules_fresh():
+            return self.rule_index
+        return await asyncio.to_thread(self.rules)
 
     async def evaluate(self, tx_data: Dict[str, Any]):
-        with SessionLocal() as session:
-            rules = session.scalars(
-                select(AlertRule).where(AlertRule.active.is_(True))
-            ).all()
-        triggered = []
+        with ALERT_EVALUATE_SECONDS.time():
+            triggered = (await self.current_rules()).match(tx_data)
+            above_minimum = tx_data["amount_xrp"] >= self.settings.alert_min_xrp
+            if not triggered and not above_minimum:
+                return
+            if triggered:
+                triggered = self.throttle(triggered, time.monotonic())
+                if not triggered and not above_minimum:
+                    self.suppressed += 1
+                    ALERTS_SUPPRESSED.inc(reason="throttled")
+                    return
+            message = (
+                f"XRP Tx {tx_data['direction']} {tx_data['amount_xrp']:.2f} XRP "
+                f"with {tx_data.get('counterparty')}"
+            )
+            await self.submit(
+                {
+                    "message": message,
+                    "tx_hash": tx_data["hash"],
+                    "rule_ids": [rule.id for rule in triggered],
+                }
+            )
+
+    def throttle(self, rules: List[Any], now: float) -> List[Any]:
+        """Drop rules that already fired within their ``min_interval_seconds``."""
+        allowed = []
         for rule in rules:
-            if rule.min_amount_xrp and tx_data["amount_xrp"] < rule.min_amount_xrp:
-                continue
-            if rule.direction and tx_data["direction"] != rule.direction:
-                continue
-            if rule.counterparty and tx_data.get("counterparty") != rule.counterparty:
-                continue
-            if rule.memo_keyword and (
-                not tx_data.get("memo")
-                or rule.memo_keyword.lower() not in tx_data["memo"].lower()
-            ):
-                continue
-            triggered.append(rule)
-        if not triggered and tx_data["amount_xrp"] < self.settings.alert_min_xrp:
+            interval = rule.min_interval_seconds
+            if interval:
+                fired_at = self._rule_fired_at.get(rule.id)
+                if fired_at is not None and now - fired_at < interval:
+                    continue
+                self._rule_fired_at[rule.id] = now
+            allowed.append(rule)
+        return allowed
+
+    async def submit(self, alert: Dict[str, Any]):
+        """Record ``alert`` now, or hold it for the open coalescing window's digest.
+
+        The first alert after a quiet period goes out immediately and opens a
+        window of ``alert_coalesce_seconds``; whatever matches during it is
+        delivered as one digest when it closes, so a burst costs two
+        deliveries per channel rather than one per transaction.
+        """
+        window = self.settings.alert_coalesce_seconds
+        if window <= 0:
+            await self.dispatch_alert(**alert)
+            return
+        if self._window_task is not None:
+            self._pending.append(alert)
+            ALERTS_SUPPRESSED.inc(reason="coalesced")
             return
-        message = (
-            f"XRP Tx {tx_data['direction']} {tx_data['amount_xrp']:.2f} XRP "
-            f"with {tx_data.get('counterparty')}"
+        self._window_task = asyncio.create_task(self._coalesce(window))
+        await self.dispatch_alert(**alert)
+
+    async def _coalesce(self, window: float):
+        try:
+            while True:
+                await asyncio.sleep(window)
+                if not self._pending:
+                    return
+                pending, self._pending = self._pending, []
+                try:
+                    await self.dispatch_digest(pending)
+                except Exception:
+                    logger.exception("alert.digest_failed", alerts=len(pending))
+        finally:
+            self._window_task = None
+
+    async def flush(self):
+        """Record any held digest now, e.g. on shutdown."""
+        if self._window_task is not None:
+            self._window_task.cancel()
+            await asyncio.gather(self._window_task, return_exceptions=True)
+        pending, self._pending = self._pending, []
+        if pending:
+            try:
+                await self.dispatch_digest(pending)
+            except Exception:
+                logger.exception("alert.digest_failed", alerts=len(pending))
+
+    async def dispatch_alert(
+        self,
+        message: str,
+        tx_hash: str,
+        rule_ids: list[int],
+        tx_hashes: list[str] | None = None,
+    ):
+        suppressed, self.suppressed = self.suppressed, 0
+        if suppressed:
+            message = f"{message} (+{suppressed} throttled)"
+        await asyncio.to_thread(
+            self._record_alert, message, tx_hash, rule_ids, tx_hashes or [tx_hash], suppressed
         )
+        logger.info("alert.triggered", message=message, tx_hash=tx_hash)
+        self.delivery.notify()
+
+    async def dispatch_digest(self, alerts: List[Dict[str, Any]]):
+        if len(alerts) == 1:
+            await self.dispatch_alert(**alerts[0])
+            return
+        lines = [f"{len(alerts)} XRP alerts"]
+        lines.extend(alert["message"] for alert in alerts[:DIGEST_LINES])
+        if len(alerts) > DIGEST_LINES:
+            lines.append(f"... and {len(alerts) - DIGEST_LINES} more")
         await self.dispatch_alert(
-            message=message,
-            tx_hash=tx_data["hash"],
-            rule_ids=[rule.id for rule in triggered],
+            message="\n".join(lines),
+            tx_hash=alerts[0]["tx_hash"],
+            rule_ids=sorted({rule_id for alert in alerts for rule_id in alert["rule_ids"]}),
+            tx_hashes=[alert["tx_hash"] for alert in alerts],
         )
 
-    async def dispatch_alert(self, message: str, tx_hash: str, rule_ids: list[int]):
+    def _record_alert(
+        self,
+        message: str,
+        tx_hash: str,
+        rule_ids: list[int],
+        tx_hashes: list[str],
+        suppressed: int = 0,
+    ) -> int:
         with SessionLocal() as session:
             alert = AlertEvent(
                 rule_id=rule_ids[0] if rule_ids else None,
                 transaction_hash=tx_hash,
                 message=message,
+                alert_count=len(tx_hashes),
+                suppressed_count=suppressed,
             )
             session.add(alert)
-            session.commit()
+            session.flush()
             alert_id = alert.id
-        logger.info("alert.triggered", message=message, tx_hash=tx_hash)
-        if self.settings.webhook_url:
-            self._send_webhook(alert_id, message, tx_hash)
-        if self.settings.smtp_host and self.settings.smtp_to:
-            self._send_email(alert_id, message)
-        if self.settings.enable_desktop_notifications:
-            self._notify_desktop(message)
-
-    def _send_webhook(self, alert_id: int, message: str, tx_hash: str):
-        payload = {"id": alert_id, "message": message, "tx_hash": tx_hash}
-        try:
-            requests.post(self.settings.webhook_url, json=payload, timeout=5)
-        except requests.RequestException as exc:
-            logger.warning("alert.webhook_failed", error=str(exc))
-
-    def _send_email(self, alert_id: int, message: str):
-        msg = EmailMessage()
-        msg["Subject"] = f"XRP Alert #{alert_id}"
-        msg["From"] = self.settings.smtp_from
-        msg["To"] = self.settings.smtp_to
-        msg.set_content(message)
-        try:
-            with smtplib.SMTP(self.settings.smtp_host, self.settings.smtp_port) as smtp:
-                smtp.starttls()
-                if self.settings.smtp_username and self.settings.smtp_password:
-                    smtp.login(self.settings.smtp_username, self.settings.smtp_password)
-                smtp.send_message(msg)
-        except Exception as exc:
-            logger.warning("alert.email_failed", error=str(exc))
-
-    def _notify_desktop(self, message: str):
-        try:
-            notification.notify(
-                title="XRP Alert",
-                message=message,
-                app_name="XRP Monitor",
-                timeout=5,
+            self.delivery.enqueue(
+                session,
+                alert_id,
+                {
+                    "id": alert_id,
+                    "message": message,
+                    "tx_hash": tx_hash,
+                    "tx_hashes": tx_hashes,
+                    "alert_count": len(tx_hashes),
+                    "suppressed_count": suppressed,
+                },
             )
-        except Exception as exc:
-            logger.warning("alert.desktop_failed", error=str(exc))
+            bump_version(session, DATA)
+            session.commit()
+        notify_local(DATA)
+        return alert_id
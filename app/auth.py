@@ -3,7 +3,7 @@ from fastapi import Depends, HTTPException, Header, status
 from .config import get_settings
 
 
-def verify_api_key(x_api_key: str = Header(default="")):
+async def verify_api_key(x_api_key: str = Header(default="")):
     settings = get_settings()
     if not settings.api_key:
         return
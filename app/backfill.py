@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Collection, Dict, Iterable, List, Optional
+
+import structlog
+from sqlalchemy import select
+
+from .db import SessionLocal
+from .models import CursorState
+from .writer import BatchWriter
+from .xrpl_client import normalize_transaction
+
+logger = structlog.get_logger(__name__)
+
+
+def account_tx_to_event(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Reshape an ``account_tx`` entry into the transaction stream message format."""
+    tx = dict(item.get("tx") or item.get("tx_json") or {})
+    if item.get("hash") and "hash" not in tx:
+        tx["hash"] = item["hash"]
+    return {
+        "type": "transaction",
+        "transaction": tx,
+        "meta": item.get("meta") or {},
+        "ledger_index": item.get("ledger_index") or tx.get("ledger_index"),
+        "date": tx.get("date"),
+        "validated": item.get("validated", True),
+    }
+
+
+class BackfillEngine:
+    """Replays ``account_tx`` history from the cursor into the batch writer.
+
+    Addresses are fetched concurrently (bounded by ``concurrency``), each
+    following ``marker`` until the server has nothing left. Addresses that
+    fail are retried ``retries`` times with a doubling delay.
+
+    Gap backfills hold the writer's cursor: it stays frozen from the first
+    :meth:`schedule` until every pending gap backfill finished, so each one
+    starts from the same stored ledger (several subscription shards
+    reconnecting at once each schedule their own) and an interrupted
+    backfill is simply redone from that ledger next time. A gap that still
+    fails after its retries is logged and the cursor released, rather than
+    pinning it for the life of the process.
+
+    History backfills for newly watched accounts run with
+    ``hold_cursor=False``: they replay ledgers far behind the cursor, so
+    they neither freeze it nor queue behind gap backfills. Their rows are
+    marked ``skip_alerts`` so years of history do not raise alerts, while
+    rows a gap backfill recovers alert like live ones.
+    """
+
+    def __init__(
+        self,
+        writer: BatchWriter,
+        concurrency: int = 4,
+        page_size: int = 200,
+        session_factory=SessionLocal,
+        watched: Optional[Collection[str]] = None,
+        retries: int = 3,
+        retry_delay: float = 5.0,
+    ):
+        self.writer = writer
+        self.watched = watched
+        self.concurrency = max(1, concurrency)
+        self.page_size = page_size
+        self.session_factory = session_factory
+        self.retries = max(0, retries)
+        self.retry_delay = retry_delay
+        self.lock = asyncio.Lock()
+        self.tasks: set[asyncio.Task] = set()
+        # Gap backfills scheduled and not finished; the cursor settles at zero.
+        self.held = 0
+
+    def schedule(
+        self,
+        client,
+        addresses: Iterable[str],
+        ledger_index_min: Optional[int] = None,
+        hold_cursor: bool = True,
+    ):
+        """Freeze the cursor now and run a backfill in the background."""
+        addresses = list(addresses)
+        if hold_cursor:
+            self._hold()
+            coro = self._held_run(client, addresses, ledger_index_min)
+        else:
+            coro = self._run(client, addresses, ledger_index_min, hold_cursor)
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    def cancel(self):
+        for task in list(self.tasks):
+            task.cancel()
+
+    def start_ledger(self) -> int:
+        with self.session_factory() as session:
+            ledger_index = session.scalar(select(CursorState.last_ledger_index).limit(1))
+        return ledger_index if ledger_index else -1
+
+    async def run(
+        self,
+        client,
+        addresses: List[str],
+        ledger_index_min: Optional[int] = None,
+        hold_cursor: bool = True,
+    ) -> bool:
+        if not hold_cursor:
+            return await self._run(client, addresses, ledger_index_min, hold_cursor)
+        self._hold()
+        return await self._held_run(client, addresses, ledger_index_min)
+
+    def _hold(self):
+        self.held += 1
+        self.writer.cursor_frozen = True
+
+    async def _held_run(
+        self, client, addresses: List[str], ledger_index_min: Optional[int]
+    ) -> bool:
+        try:
+            async with self.lock:
+                ok = await self._run(client, addresses, ledger_index_min, True)
+        finally:
+            # Cancelled runs leave the cursor frozen: the gap is redone on restart.
+            self.held -= 1
+        if self.held == 0:
+            await self.writer.settle_cursor()
+            if self.held:
+                # Another gap was scheduled while the queue drained.
+                self.writer.cursor_frozen = True
+        return ok
+
+    async def _run(
+        self, client, addresses: List[str], ledger_index_min: Optional[int], hold_cursor: bool
+    ) -> bool:
+        if ledger_index_min is None:
+            # Frozen since the first pending gap was scheduled, so every
+            # pending gap backfill reads the same ledger here.
+            ledger_index_min = await asyncio.to_thread(self.start_ledger)
+        logger.info(
+            "backfill.start",
+            accounts=len(addresses),
+            ledger_index_min=ledger_index_min,
+            hold_cursor=hold_cursor,
+        )
+        transactions = 0
+        pending = addresses
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+                logger.info("backfill.retry", accounts=len(pending), attempt=attempt)
+            limit = asyncio.Semaphore(self.concurrency)
+            results = await asyncio.gather(
+                *(
+                    self._backfill_account(
+                        client, address, ledger_index_min, limit, alerts=hold_cursor
+                    )
+                    for address in pending
+                ),
+                return_exceptions=True,
+            )
+            failures = []
+            for address, result in zip(pending, results):
+                if isinstance(result, BaseException):
+                    logger.warning("backfill.account_failed", account=address, error=str(result))
+                    failures.append(address)
+                else:
+                    transactions += result
+            pending = failures
+            if not pending:
+                break
+        if pending:
+            logger.warning(
+                "backfill.incomplete",
+                failed=len(pending),
+                ledger_index_min=ledger_index_min,
+                hold_cursor=hold_cursor,
+            )
+            return False
+        logger.info(
+            "backfill.complete",
+            accounts=len(addresses),
+            transactions=transactions,
+        )
+        return True
+
+    async def _backfill_account(
+        self,
+        client,
+        address: str,
+        ledger_index_min: int,
+        limit: asyncio.Semaphore,
+        alerts: bool = True,
+    ) -> int:
+        from xrpl.models.requests import AccountTx
+
+        count = 0
+        marker = None
+        async with limit:
+            while True:
+                response = await client.request(
+                    AccountTx(
+                        account=address,
+                        ledger_index_min=ledger_index_min,
+                        ledger_index_max=-1,
+                        limit=self.page_size,
+                        forward=True,
+                        marker=marker,
+                    )
+                )
+                if not response.is_successful():
+                    raise RuntimeError(response.result.get("error_message") or response.result)
+                for item in response.result.get("transactions", []):
+                    if not item.get("validated", True):
+                        continue
+                    tx_data = normalize_transaction(account_tx_to_event(item), self.watched)
+                    if not alerts:
+                        tx_data["skip_alerts"] = True
+                    await self.writer.put(tx_data)
+                    count += 1
+                marker = response.result.get("marker")
+                if not marker:
+                    return count
@@ -0,0 +1,201 @@
+"""Per-account XRP balances taken from transaction metadata.
+
+Every stored transaction that touches a watched account's AccountRoot
+leaves a row in ``account_balances`` keyed on (account, ledger_index), so
+the current balance is one index probe per account and balance over time
+is a range read. Databases from before the table existed are filled from
+the stored raw payloads::
+
+    python -m app.balances rebuild
+"""
+from __future__ import annotations
+
+import argparse
+from datetime import datetime
+from itertools import chain
+from typing import Any, Collection, Dict, Iterable, List, Optional
+
+import structlog
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert
+
+from .models import AccountBalance, Transaction, TransactionRaw, WatchedAccount
+from .raw_store import get_codec
+from .retention import iter_archived, partitions
+from .versions import BALANCES_BUILT, bump_version, get_version
+
+logger = structlog.get_logger(__name__)
+
+DROPS_PER_XRP = 1_000_000
+
+_upsert = insert(AccountBalance.__table__)
+# Several transactions in one ledger can touch the same account; keep the
+# balance left by the last of them.
+UPSERT_BALANCES = _upsert.on_conflict_do_update(
+    index_elements=["account", "ledger_index"],
+    set_={
+        "tx_index": _upsert.excluded.tx_index,
+        "balance_xrp": _upsert.excluded.balance_xrp,
+        "timestamp": _upsert.excluded.timestamp,
+        "tx_hash": _upsert.excluded.tx_hash,
+    },
+    where=_upsert.excluded.tx_index >= AccountBalance.__table__.c.tx_index,
+)
+
+
+def extract_balances(
+    event: Dict[str, Any],
+    watched: Collection[str],
+    ledger_index: Optional[int] = None,
+    timestamp: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """Final XRP balance of each watched AccountRoot the transaction modified."""
+    meta = event.get("meta") or {}
+    if not isinstance(meta, dict):
+        return []
+    tx = event.get("transaction") or {}
+    balances = []
+    for wrapper in meta.get("AffectedNodes") or []:
+        for node in wrapper.values():
+            if node.get("LedgerEntryType") != "AccountRoot":
+                continue
+            fields = node.get("FinalFields") or node.get("NewFields") or {}
+            account = fields.get("Account")
+            balance = fields.get("Balance")
+            if account not in watched or not isinstance(balance, str):
+                continue
+            balances.append(
+                {
+                    "account": account,
+                    "ledger_index": ledger_index,
+                    "tx_index": meta.get("TransactionIndex", 0),
+                    "balance_xrp": int(balance) / DROPS_PER_XRP,
+                    "timestamp": timestamp,
+                    "tx_hash": tx.get("hash") or event.get("hash"),
+                }
+            )
+    return balances
+
+
+def store_balances(session, rows: Iterable[Dict[str, Any]]):
+    values = [
+        balance
+        for row in rows
+        for balance in row.get("balances") or ()
+        if balance["ledger_index"] is not None and balance["timestamp"] is not None
+    ]
+    if values:
+        session.execute(UPSERT_BALANCES, values)
+
+
+def latest_balances(session, accounts: Optional[Iterable[str]] = None) -> Dict[str, float]:
+    """Most recent balance per account (defaults to every watched account)."""
+    if accounts is None:
+        accounts = session.scalars(select(WatchedAccount.address)).all()
+    latest = {}
+    for account in accounts:
+        balance = session.scalar(
+            select(AccountBalance.balance_xrp)
+            .where(AccountBalance.account == account)
+            .order_by(AccountBalance.ledger_index.desc())
+            .limit(1)
+        )
+        if balance is not None:
+            latest[account] = balance
+    return latest
+
+
+def total_balance(session, accounts: Optional[Iterable[str]] = None) -> float:
+    return sum(latest_balances(session, accounts).values())
+
+
+def balance_history(
+    session,
+    account: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    stmt = select(
+        AccountBalance.ledger_index, AccountBalance.timestamp, AccountBalance.balance_xrp
+    ).where(AccountBalance.account == account)
+    if start is not None:
+        stmt = stmt.where(AccountBalance.timestamp >= start)
+    if end is not None:
+        stmt = stmt.where(AccountBalance.timestamp < end)
+    stmt = stmt.order_by(AccountBalance.timestamp, AccountBalance.ledger_index)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return [
+        {"ledger_index": ledger, "timestamp": ts.isoformat(), "balance_xrp": balance}
+        for ledger, ts, balance in session.execute(stmt)
+    ]
+
+
+def rebuild(session, chunk_size: int = 2_000) -> int:
+    """Recompute every balance from the compressed raw payloads, archives included."""
+    codec = get_codec()
+    watched = set(session.scalars(select(WatchedAccount.address)))
+    session.execute(delete(AccountBalance))
+    stmt = (
+        select(
+            Transaction.ledger_index,
+            Transaction.timestamp,
+            TransactionRaw.codec,
+            TransactionRaw.dict_id,
+            TransactionRaw.data,
+        )
+        .join(TransactionRaw, TransactionRaw.hash == Transaction.hash)
+        .execution_options(yield_per=chunk_size)
+    )
+    total = 0
+    hot = session.execute(stmt).partitions()
+    for partition in chain(hot, iter_archived(stmt, partitions(session))):
+        rows = [
+            {
+                "balances": extract_balances(
+                    codec.decompress(session, name, dict_id, data), watched, ledger, ts
+                )
+            }
+            for ledger, ts, name, dict_id, data in partition
+        ]
+        store_balances(session, rows)
+        total += sum(len(row["balances"]) for row in rows)
+    return total
+
+
+def ensure_built(session) -> bool:
+    """Rebuild once for databases that predate the balance table.
+
+    Completion is stamped in ``state_versions``, since payloads without
+    balance metadata for a watched account leave the table empty.
+    """
+    if get_version(session, BALANCES_BUILT):
+        return False
+    built = (
+        session.scalar(select(AccountBalance.account).limit(1)) is None
+        and session.scalar(select(TransactionRaw.hash).limit(1)) is not None
+    )
+    if built:
+        total = rebuild(session)
+        logger.info("balances.rebuilt", balances=total)
+    bump_version(session, BALANCES_BUILT)
+    return built
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.balances")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args(argv)
+
+    from .db import SessionLocal, init_db
+
+    init_db()
+    with SessionLocal() as session:
+        total = rebuild(session)
+        session.commit()
+    logger.info("balances.rebuilt", balances=total)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+import orjson
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+from .db import ReadSession, run_read
+from .versions import DATA, get_version
+
+
+def to_json_bytes(payload: Any) -> bytes:
+    if isinstance(payload, BaseModel):
+        return payload.model_dump_json().encode()
+    # Plain dicts, lists and datetimes natively; anything else via FastAPI's encoder.
+    return orjson.dumps(payload, default=jsonable_encoder)
+
+
+class CachedResponse:
+    __slots__ = ("version", "body", "etag", "created_at")
+
+    def __init__(self, version: int, body: bytes):
+        self.version = version
+        self.body = body
+        self.etag = f'"{version}-{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+        self.created_at = time.monotonic()
+
+    def respond(self, request: Request) -> Response:
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            if self.etag in tags or "*" in tags:
+                return Response(status_code=304, headers=headers)
+        return Response(content=self.body, media_type="application/json", headers=headers)
+
+
+class ResponseCache:
+    """Serialized API responses keyed on the ``data`` version stamp.
+
+    The collector bumps the stamp whenever it commits new transactions or
+    alert events, so a hit costs one primary-key read. ``ttl`` bounds how
+    stale time-relative figures (the 24h flows) can get when nothing new
+    arrives.
+    """
+
+    def __init__(self, session_factory=ReadSession, max_entries: int = 256, ttl: float = 30.0):
+        self.session_factory = session_factory
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: OrderedDict[Hashable, CachedResponse] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def current_version(self) -> int:
+        with self.session_factory() as session:
+            return get_version(session, DATA)
+
+    async def current_version_async(self) -> int:
+        return await run_read(get_version, DATA)
+
+    def get_or_build(self, key: Hashable, build: Callable[[], Any]) -> CachedResponse:
+        version = self.current_version()
+        cached = self._lookup(key, version)
+        if cached is None:
+            cached = self._store(key, CachedResponse(version, to_json_bytes(build())))
+        return cached
+
+    async def get_or_build_async(
+        self, key: Hashable, build: Callable[[], Awaitable[Any]]
+    ) -> CachedResponse:
+        version = await self.current_version_async()
+        cached = self._lookup(key, version)
+        if cached is None:
+            cached = self._store(key, CachedResponse(version, to_json_bytes(await build())))
+        return cached
+
+    def _lookup(self, key: Hashable, version: int) -> Optional[CachedResponse]:
+        with self.lock:
+            cached = self.entries.get(key)
+            if (
+                cached is not None
+                and cached.version == version
+                and time.monotonic() - cached.created_at < self.ttl
+            ):
+                self.entries.move_to_end(key)
+                return cached
+        return None
+
+    def _store(self, key: Hashable, cached: CachedResponse) -> CachedResponse:
+        with self.lock:
+            self.entries[key] = cached
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return cached
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
@@ -0,0 +1,215 @@
+"""Chart series over arbitrary ranges, read from precomputed buckets.
+
+``inflow``, ``outflow`` and ``tx_count`` come from the flow rollups at the
+finest resolution that keeps the range within ``OVERSAMPLE`` buckets per
+requested point, and are then reduced to the point budget with LTTB or
+min/max per pixel. ``balance`` is the watched accounts' closing balance
+at the end of each step: each account's balance before the range, then
+one ordered scan of the balance changes inside it. Neither path reads
+transaction rows, and neither issues a query per point or per account.
+"""
+from __future__ import annotations
+
+import json
+import math
+from datetime import datetime
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select
+
+from .models import AccountBalance, FlowRollup, WatchedAccount
+from .rollups import DAY, HOUR, MINUTE, RESOLUTIONS, bucket_start
+
+SERIES = ("balance", "inflow", "outflow", "tx_count")
+METHODS = ("lttb", "minmax")
+# Buckets read per requested point before downsampling.
+OVERSAMPLE = 4
+MAX_BUCKETS = 100_000
+
+Point = Tuple[datetime, float]
+
+_FLOW_COLUMNS = {
+    "inflow": FlowRollup.inflow,
+    "outflow": FlowRollup.outflow,
+    "tx_count": FlowRollup.tx_count,
+}
+
+
+def lttb(points: Sequence[Point], threshold: int) -> List[Point]:
+    """Largest-Triangle-Three-Buckets: keeps the points that shape the line."""
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+    xs = [ts.timestamp() for ts, _ in points]
+    ys = [value for _, value in points]
+    sampled = [points[0]]
+    every = (n - 2) / (threshold - 2)
+    anchor = 0
+    for i in range(threshold - 2):
+        lo = int(i * every) + 1
+        hi = int((i + 1) * every) + 1
+        next_lo, next_hi = hi, min(int((i + 2) * every) + 1, n)
+        avg_x = sum(xs[next_lo:next_hi]) / (next_hi - next_lo)
+        avg_y = sum(ys[next_lo:next_hi]) / (next_hi - next_lo)
+        ax, ay = xs[anchor], ys[anchor]
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        anchor = best
+    sampled.append(points[-1])
+    return sampled
+
+
+def minmax(points: Sequence[Point], threshold: int) -> List[Point]:
+    """Lowest and highest point of each pixel, so no spike is dropped."""
+    if threshold >= len(points):
+        return list(points)
+    pixels = max(threshold // 2, 1)
+    size = len(points) / pixels
+    sampled: List[Point] = []
+    for i in range(pixels):
+        chunk = points[int(i * size) : int((i + 1) * size)]
+        if chunk:
+            low, high = min(chunk, key=itemgetter(1)), max(chunk, key=itemgetter(1))
+            sampled.extend(sorted({low, high}))
+    return sampled
+
+
+def downsample(points: Sequence[Point], threshold: int, method: str = "lttb") -> List[Point]:
+    if method == "minmax":
+        return minmax(points, threshold)
+    return lttb(points, threshold)
+
+
+def choose_resolution(start: datetime, end: datetime, points: int) -> str:
+    """Finest rollup resolution that keeps the read within the oversample budget."""
+    for resolution in (MINUTE, HOUR):
+        if (end - start) / RESOLUTIONS[resolution] <= points * OVERSAMPLE:
+            return resolution
+    return DAY
+
+
+def grid(start: datetime, end: datetime, resolution: str) -> List[datetime]:
+    step = RESOLUTIONS[resolution]
+    count = math.ceil((end - bucket_start(start, resolution)) / step)
+    if count > MAX_BUCKETS:
+        raise ValueError(f"range spans {count} {resolution} buckets; use a coarser resolution")
+    first = bucket_start(start, resolution)
+    return [first + i * step for i in range(count)]
+
+
+def flow_series(
+    session,
+    series: str,
+    buckets: List[datetime],
+    resolution: str,
+    accounts: Optional[Iterable[str]] = None,
+) -> List[Point]:
+    """Per-bucket totals from the rollups, zero-filled so gaps read as no activity."""
+    if not buckets:
+        return []
+    column = _FLOW_COLUMNS[series]
+    stmt = (
+        select(FlowRollup.bucket_start, func.sum(column))
+        .where(
+            FlowRollup.resolution == resolution,
+            FlowRollup.bucket_start >= buckets[0],
+            FlowRollup.bucket_start <= buckets[-1],
+        )
+        .group_by(FlowRollup.bucket_start)
+    )
+    if accounts:
+        stmt = stmt.where(FlowRollup.account.in_(list(accounts)))
+    totals = dict(session.execute(stmt).all())
+    return [(ts, float(totals.get(ts) or 0)) for ts in buckets]
+
+
+def opening_balances(session, accounts: List[str], before: datetime) -> Dict[str, float]:
+    """Each account's last balance before ``before``, in one statement."""
+    if not accounts:
+        return {}
+    names = func.json_each(json.dumps(accounts)).table_valued("value")
+    latest = (
+        select(AccountBalance.balance_xrp)
+        .where(AccountBalance.account == names.c.value, AccountBalance.timestamp < before)
+        .order_by(AccountBalance.timestamp.desc(), AccountBalance.ledger_index.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    rows = session.execute(select(names.c.value, latest)).all()
+    return {account: balance for account, balance in rows if balance is not None}
+
+
+def balance_series(
+    session,
+    buckets: List[datetime],
+    resolution: str,
+    points: int,
+    end: datetime,
+    accounts: Optional[Iterable[str]] = None,
+) -> List[Point]:
+    """Summed closing balance per step, with steps widened to fit ``points``."""
+    if not buckets:
+        return []
+    if accounts is None:
+        accounts = session.scalars(select(WatchedAccount.address)).all()
+    accounts = list(accounts)
+    balances = opening_balances(session, accounts, buckets[0])
+    changes = iter(
+        session.execute(
+            select(AccountBalance.account, AccountBalance.timestamp, AccountBalance.balance_xrp)
+            .where(
+                AccountBalance.account.in_(accounts),
+                AccountBalance.timestamp >= buckets[0],
+                AccountBalance.timestamp < end,
+            )
+            .order_by(AccountBalance.timestamp, AccountBalance.ledger_index)
+        )
+    )
+    change = next(changes, None)
+    stride = max(math.ceil(len(buckets) / points), 1)
+    width = RESOLUTIONS[resolution] * stride
+    series = []
+    for ts in buckets[::stride]:
+        until = min(ts + width, end)
+        while change is not None and change.timestamp < until:
+            balances[change.account] = change.balance_xrp
+            change = next(changes, None)
+        series.append((ts, sum(balances.values())))
+    return series
+
+
+def build_series(
+    session,
+    series: str,
+    start: datetime,
+    end: datetime,
+    points: int = 500,
+    resolution: Optional[str] = None,
+    method: str = "lttb",
+    accounts: Optional[Iterable[str]] = None,
+) -> Dict[str, Any]:
+    if series not in SERIES:
+        raise ValueError(f"unknown series {series!r}")
+    if method not in METHODS:
+        raise ValueError(f"unknown downsampling method {method!r}")
+    if start >= end:
+        raise ValueError("start must be before end")
+    resolution = resolution or choose_resolution(start, end, points)
+    buckets = grid(start, end, resolution)
+    if series == "balance":
+        data = balance_series(session, buckets, resolution, points, end, accounts)
+    else:
+        data = downsample(flow_series(session, series, buckets, resolution, accounts), points, method)
+    return {
+        "series": series,
+        "resolution": resolution,
+        "method": method,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "points": [{"timestamp": ts.isoformat(), "value": value} for ts, value in data],
+    }
@@ -1,16 +1,26 @@
 from __future__ import annotations
 
 import asyncio
+import time
 from contextlib import contextmanager
 
 import structlog
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.exc import SQLAlchemyError
 
-from .db import SessionLocal, init_db
-from .models import Transaction, CursorState
+from . import balances, rollups
+from .config import get_settings
+from .db import ReadSession, SessionLocal, checkpoint_loop, init_db
+from .dedup import SeenHashes
+from .metrics import EVENTS, INGEST_LAG, NORMALIZE_SECONDS, PERSIST_SECONDS, snapshot_loop
+from .models import WatchedAccount
+from .retention import retention_loop
+from .services.account_service import AccountService
+from .versions import ACCOUNTS, get_version, local_version, wait_local
 from .xrpl_client import XRPLStream, normalize_transaction
 from .alerts import AlertEngine
+from .backfill import BackfillEngine
+from .writer import BatchWriter
 
 logger = structlog.get_logger(__name__)
 
@@ -28,48 +38,205 @@ def session_scope():
         session.close()
 
 
+def load_watched_accounts() -> dict[str, bool]:
+    """Watched addresses mapped to whether their history is backfilled."""
+    with session_scope() as session:
+        rows = session.execute(
+            select(WatchedAccount.address, WatchedAccount.history_complete)
+        ).all()
+        return {address: complete for address, complete in rows}
+
+
+def mark_history_complete(address: str):
+    with session_scope() as session:
+        session.execute(
+            update(WatchedAccount)
+            .where(WatchedAccount.address == address)
+            .values(history_complete=True)
+        )
+
+
 class CollectorService:
-    def __init__(self):
+    def __init__(self, write_metrics_snapshot: bool = True):
         init_db()
-        self.stream = XRPLStream()
+        with session_scope() as session:
+            rollups.ensure_built(session)
+        self.settings = get_settings()
+        # Off when running inside the API, which already exposes this
+        # process's registry.
+        self.write_metrics_snapshot = write_metrics_snapshot
+        AccountService().seed(self.settings.xrpl_account_addresses)
+        with session_scope() as session:
+            balances.ensure_built(session)
+        accounts = load_watched_accounts()
+        # Shared with normalize_transaction and the backfill engine; the
+        # account sync loop updates it in place.
+        self.watched: set[str] = set(accounts)
+        self.history_pending: set[str] = {a for a, done in accounts.items() if not done}
+        self.history_running: set[str] = set()
+        self.accounts_version = (0, 0)
+        self.stream = XRPLStream(list(accounts))
         self.alert_engine = AlertEngine()
+        self.writer = BatchWriter(
+            batch_size=self.settings.collector_batch_size,
+            flush_interval=self.settings.collector_flush_ms / 1000,
+            on_commit=self.on_commit,
+            dedup=SeenHashes(
+                maxsize=self.settings.dedup_cache_size,
+                # Each generation holds a full warm load.
+                bloom_capacity=self.settings.dedup_warm_rows,
+            ),
+            read_session_factory=ReadSession,
+        )
+        self.backfill = BackfillEngine(
+            self.writer,
+            concurrency=self.settings.backfill_concurrency,
+            page_size=self.settings.backfill_page_size,
+            watched=self.watched,
+        )
 
     async def run(self):
         logger.info("collector.start")
-        async for event in self.stream.stream():
-            tx_data = normalize_transaction(event)
-            await self.persist_transaction(tx_data)
-            await self.alert_engine.evaluate(tx_data)
+        # A gap backfill cancelled by the last restart left the cursor held.
+        self.writer.release_cursor()
+        # Rebuilt on every (re)start so rows queued by a failed run are retried.
+        await asyncio.to_thread(self.writer.warm_dedup, self.settings.dedup_warm_rows)
+        writer_task = asyncio.create_task(self.writer.run())
+        tasks = [
+            writer_task,
+            asyncio.create_task(self.alert_engine.delivery.run()),
+            asyncio.create_task(checkpoint_loop()),
+            asyncio.create_task(self.account_sync_loop()),
+        ]
+        if self.settings.retention_days > 0:
+            tasks.append(asyncio.create_task(retention_loop()))
+        if self.write_metrics_snapshot:
+            tasks.append(
+                asyncio.create_task(
+                    snapshot_loop(
+                        self.settings.collector_metrics_path,
+                        self.settings.metrics_snapshot_seconds,
+                    )
+                )
+            )
+        try:
+            async for event in self.stream.stream(on_connect=self.on_connect):
+                EVENTS.inc()
+                with NORMALIZE_SECONDS.time():
+                    tx_data = normalize_transaction(event, self.watched)
+                INGEST_LAG.set(time.time() - tx_data["timestamp"].timestamp())
+                with PERSIST_SECONDS.time():
+                    await self.persist_transaction(tx_data)
+                if writer_task.done():
+                    writer_task.result()
+        finally:
+            await self.alert_engine.flush()
+            self.backfill.cancel()
+            for task in tasks:
+                task.cancel()
+            # Wait them out so a restart never overlaps the previous run.
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.alert_engine.delivery.close()
+
+    async def on_connect(self, client, accounts):
+        # Subscribed already, so anything the gap backfill misses arrives live.
+        # Accounts still waiting for their full history are left to that.
+        gap = [account for account in accounts if account not in self.history_pending]
+        if gap:
+            self.backfill.schedule(client, gap)
+
+    async def account_sync_loop(self):
+        while True:
+            try:
+                await self.sync_accounts()
+            except Exception as exc:
+                logger.warning("collector.account_sync_failed", error=str(exc))
+                await asyncio.sleep(self.settings.account_refresh_seconds)
+                continue
+            # Accounts added through the API in this process wake it at once.
+            await wait_local(
+                ACCOUNTS, self.accounts_version[1], self.settings.account_refresh_seconds
+            )
+
+    def _accounts_version(self):
+        with SessionLocal() as session:
+            return get_version(session, ACCOUNTS), local_version(ACCOUNTS)
+
+    async def sync_accounts(self):
+        """Apply watched-account changes made through the API to live subscriptions."""
+        version = await asyncio.to_thread(self._accounts_version)
+        if version != self.accounts_version:
+            accounts = await asyncio.to_thread(load_watched_accounts)
+            added = [a for a in accounts if a not in self.watched]
+            removed = [a for a in self.watched if a not in accounts]
+            if added:
+                self.watched.update(added)
+                self.history_pending.update(a for a in added if not accounts[a])
+                await self.stream.add_accounts(added)
+            if removed:
+                self.watched.difference_update(removed)
+                self.history_pending.difference_update(removed)
+                await self.stream.remove_accounts(removed)
+            if added or removed:
+                logger.info("collector.accounts_changed", added=added, removed=removed)
+            self.accounts_version = version
+        self.schedule_history()
+
+    def schedule_history(self):
+        client = self.stream.connections.live_client()
+        if client is None:
+            return
+        for address in self.history_pending - self.history_running:
+            self.history_running.add(address)
+            task = asyncio.create_task(self.backfill_history(client, address))
+            self.backfill.tasks.add(task)
+            task.add_done_callback(self.backfill.tasks.discard)
+
+    async def backfill_history(self, client, address: str):
+        """Replay an account's whole history; live rows are already streaming."""
+        try:
+            task = self.backfill.schedule(client, [address], ledger_index_min=-1, hold_cursor=False)
+            if await task and address in self.watched:
+                await asyncio.to_thread(mark_history_complete, address)
+                self.history_pending.discard(address)
+        finally:
+            self.history_running.discard(address)
 
     async def persist_transaction(self, tx_data):
-        with session_scope() as session:
-            existing = session.get(Transaction, tx_data["hash"])
-            if existing:
-                return
-            tx = Transaction(**tx_data)
-            session.add(tx)
-            cursor = session.scalar(select(CursorState).limit(1))
-            if not cursor:
-                cursor = CursorState(last_ledger_index=tx.ledger_index)
-                session.add(cursor)
-            else:
-                cursor.last_ledger_index = max(
-                    cursor.last_ledger_index or 0, tx.ledger_index or 0
-                )
-        logger.info("collector.persisted", hash=tx_data["hash"])
+        await self.writer.put(tx_data)
 
+    async def on_commit(self, inserted):
+        for tx_data in inserted:
+            # History replayed for a newly added account is not news.
+            if not tx_data.get("skip_alerts"):
+                await self.alert_engine.evaluate(tx_data)
 
-async def main():
-    service = CollectorService()
+
+async def supervise(factory=CollectorService, restart_seconds: float = 10.0):
+    """Run the collector until cancelled, restarting it after any failure.
+
+    A service that fails to start is rebuilt on the next attempt; one that
+    fails while running is restarted with its caches and subscriptions.
+    Building it (migrations, rollup and balance rebuilds, account seeding)
+    runs in a worker thread, so it never blocks the loop it shares with
+    the API.
+    """
+    service = None
     while True:
         try:
+            if service is None:
+                service = await asyncio.to_thread(factory)
             await service.run()
         except SQLAlchemyError as db_exc:
             logger.exception("collector.db_error", exc_info=db_exc)
-            await asyncio.sleep(5)
+            await asyncio.sleep(restart_seconds / 2)
         except Exception as exc:
             logger.exception("collector.error", exc_info=exc)
-            await asyncio.sleep(10)
+            await asyncio.sleep(restart_seconds)
+
+
+async def main():
+    await supervise()
 
 
 if __name__ == "__main__":
@@ -18,6 +18,13 @@ class Settings(BaseModel):
         default="wss://s1.ripple.com/",
         alias="XRPL_WS_URL",
     )
+    xrpl_ws_urls: List[str] = Field(
+        default_factory=list,
+        alias="XRPL_WS_URLS",
+    )
+    xrpl_hedge_connections: int = Field(default=2, alias="XRPL_HEDGE_CONNECTIONS")
+    xrpl_heartbeat_seconds: float = Field(default=20.0, alias="XRPL_HEARTBEAT_SECONDS")
+    xrpl_subscription_shards: int = Field(default=1, alias="XRPL_SUBSCRIPTION_SHARDS")
     xrpl_rpc_url: str = Field(
         default="https://s2.ripple.com:51234/",
         alias="XRPL_RPC_URL",
@@ -27,8 +34,19 @@ class Settings(BaseModel):
         alias="XRPL_ACCOUNT_ADDRESSES",
     )
     db_path: Path = Field(default=Path("data/xrp_monitor.db"), alias="DB_PATH")
+    raw_codec: str = Field(default="zlib", alias="RAW_CODEC")
+    raw_compression_level: int | None = Field(default=None, alias="RAW_COMPRESSION_LEVEL")
+    db_read_pool_size: int = Field(default=8, alias="DB_READ_POOL_SIZE")
+    db_async_concurrency: int = Field(default=8, alias="DB_ASYNC_CONCURRENCY")
+    sqlite_busy_timeout_ms: int = Field(default=5000, alias="SQLITE_BUSY_TIMEOUT_MS")
+    sqlite_cache_size_kb: int = Field(default=65536, alias="SQLITE_CACHE_SIZE_KB")
+    sqlite_mmap_size_mb: int = Field(default=256, alias="SQLITE_MMAP_SIZE_MB")
+    sqlite_checkpoint_seconds: float = Field(
+        default=60.0, alias="SQLITE_CHECKPOINT_SECONDS"
+    )
     api_key: str = Field(default="change-me", alias="API_KEY")
     alert_min_xrp: float = Field(default=50.0, alias="ALERT_MIN_XRP")
+    alert_coalesce_seconds: float = Field(default=30.0, alias="ALERT_COALESCE_SECONDS")
     webhook_url: str | None = Field(default=None, alias="WEBHOOK_URL")
     smtp_host: str | None = Field(default=None, alias="SMTP_HOST")
     smtp_port: int = Field(default=587, alias="SMTP_PORT")
@@ -39,6 +57,45 @@ class Settings(BaseModel):
     enable_desktop_notifications: bool = Field(
         default=False, alias="ENABLE_DESKTOP_NOTIFICATIONS"
     )
+    collector_batch_size: int = Field(default=100, alias="COLLECTOR_BATCH_SIZE")
+    collector_flush_ms: int = Field(default=250, alias="COLLECTOR_FLUSH_MS")
+    dedup_cache_size: int = Field(default=50_000, alias="DEDUP_CACHE_SIZE")
+    dedup_warm_rows: int = Field(default=100_000, alias="DEDUP_WARM_ROWS")
+    rule_refresh_seconds: float = Field(default=5.0, alias="RULE_REFRESH_SECONDS")
+    account_refresh_seconds: float = Field(default=5.0, alias="ACCOUNT_REFRESH_SECONDS")
+    webhook_concurrency: int = Field(default=4, alias="WEBHOOK_CONCURRENCY")
+    email_concurrency: int = Field(default=1, alias="EMAIL_CONCURRENCY")
+    desktop_concurrency: int = Field(default=1, alias="DESKTOP_CONCURRENCY")
+    alert_max_attempts: int = Field(default=5, alias="ALERT_MAX_ATTEMPTS")
+    alert_retry_base_seconds: float = Field(
+        default=2.0, alias="ALERT_RETRY_BASE_SECONDS"
+    )
+    alert_retry_max_seconds: float = Field(
+        default=300.0, alias="ALERT_RETRY_MAX_SECONDS"
+    )
+    backfill_concurrency: int = Field(default=4, alias="BACKFILL_CONCURRENCY")
+    backfill_page_size: int = Field(default=200, alias="BACKFILL_PAGE_SIZE")
+    outbox_poll_seconds: float = Field(default=5.0, alias="OUTBOX_POLL_SECONDS")
+    retention_days: int = Field(default=0, alias="RETENTION_DAYS")
+    retention_interval_seconds: float = Field(default=3600.0, alias="RETENTION_INTERVAL_SECONDS")
+    retention_batch_size: int = Field(default=5000, alias="RETENTION_BATCH_SIZE")
+    archive_dir: Path | None = Field(default=None, alias="ARCHIVE_DIR")
+    run_collector_in_api: bool = Field(default=False, alias="RUN_COLLECTOR_IN_API")
+    feed_poll_seconds: float = Field(default=0.5, alias="FEED_POLL_SECONDS")
+    feed_heartbeat_seconds: float = Field(default=15.0, alias="FEED_HEARTBEAT_SECONDS")
+    response_cache_ttl_seconds: float = Field(
+        default=30.0, alias="RESPONSE_CACHE_TTL_SECONDS"
+    )
+    metrics_snapshot_path: Path | None = Field(default=None, alias="METRICS_SNAPSHOT_PATH")
+    metrics_snapshot_seconds: float = Field(default=10.0, alias="METRICS_SNAPSHOT_SECONDS")
+
+    @property
+    def collector_metrics_path(self) -> Path:
+        return self.metrics_snapshot_path or self.db_path.parent / "collector_metrics.json"
+
+    @property
+    def archive_path(self) -> Path:
+        return self.archive_dir or self.db_path.parent / "archive"
 
     @classmethod
     def parse_addresses(cls, value: str | List[str] | None) -> List[str]:
@@ -51,10 +108,9 @@ class Settings(BaseModel):
     @classmethod
     def model_validate_env(cls) -> "Settings":
         raw = {k: v for k, v in os.environ.items()}
-        if "XRPL_ACCOUNT_ADDRESSES" in raw:
-            raw["XRPL_ACCOUNT_ADDRESSES"] = cls.parse_addresses(
-                raw["XRPL_ACCOUNT_ADDRESSES"]
-            )
+        for key in ("XRPL_ACCOUNT_ADDRESSES", "XRPL_WS_URLS"):
+            if key in raw:
+                raw[key] = cls.parse_addresses(raw[key])
         return cls.model_validate(raw)
 
 
@@ -0,0 +1,347 @@
+from __future__ import annotations
+
+import asyncio
+import time
+import zlib
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncGenerator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+)
+
+import structlog
+
+from .dedup import RecentHashes
+from .metrics import DUPLICATES, RECONNECTS
+
+if TYPE_CHECKING:
+    # xrpl-py takes a third of a second to import; loaded on first connect.
+    from xrpl.asyncio.clients import AsyncWebsocketClient
+
+logger = structlog.get_logger(__name__)
+
+OnConnect = Callable[["AsyncWebsocketClient", List[str]], Awaitable[Any]]
+
+
+def message_key(message: Dict[str, Any]) -> Optional[Hashable]:
+    """Identity of a stream message shared by every node that relays it."""
+    kind = message.get("type")
+    if kind == "transaction":
+        return (message.get("transaction") or {}).get("hash") or message.get("hash")
+    if kind == "ledgerClosed":
+        return ("ledger", message.get("ledger_index"))
+    return None
+
+
+class Endpoint:
+    def __init__(self, url: str):
+        self.url = url
+        self.in_use = False
+        self.failures = 0
+        self.retry_at = 0.0
+        self.lag: Optional[float] = None  # EWMA of seconds behind the first copy
+        self.first_copies = 0
+        self.late_copies = 0
+        self.last_message_at = 0.0
+        # Blocked handing a message to a full output queue: backpressure from
+        # the consumer, not a quiet socket, so the heartbeat leaves it alone.
+        self.waiting = False
+
+    def record_lag(self, lag: float, alpha: float = 0.2):
+        self.lag = lag if self.lag is None else (1 - alpha) * self.lag + alpha * lag
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "connected": self.in_use and self.failures == 0,
+            "failures": self.failures,
+            "lag_seconds": self.lag,
+            "first_copies": self.first_copies,
+            "late_copies": self.late_copies,
+        }
+
+
+class ConnectionManager:
+    """Hedged subscriptions over several rippled websocket endpoints.
+
+    ``hedge`` connections stay subscribed at once, each on a different node.
+    Messages are keyed by transaction hash (or ledger index for ledger
+    closes); the first copy is delivered and later copies only feed the
+    per-node lag estimate used to pick endpoints on reconnect. A connection
+    that errors or goes quiet for ``heartbeat_timeout`` seconds is replaced
+    while the others keep streaming, so there is no blind window. Time spent
+    waiting on a full output queue does not count as quiet.
+
+    Every shard receives every ledger close, so ledger keys are scoped to
+    ``shard``; transaction hashes are deduplicated across shards.
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        hedge: int = 2,
+        heartbeat_timeout: float = 20.0,
+        max_backoff: float = 30.0,
+        dedup_size: int = 50_000,
+        seen: RecentHashes | None = None,
+        out: asyncio.Queue | None = None,
+        shard: int = 0,
+    ):
+        self.endpoints = [Endpoint(url) for url in dict.fromkeys(urls)]
+        self.hedge = max(1, min(hedge, len(self.endpoints)))
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_backoff = max_backoff
+        self.seen = seen if seen is not None else RecentHashes(dedup_size)
+        self.shard = shard
+        self.live = 0
+        self.accounts: List[str] = []
+        self.clients: set[AsyncWebsocketClient] = set()
+        self._out: asyncio.Queue = out if out is not None else asyncio.Queue(maxsize=10_000)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [endpoint.snapshot() for endpoint in self.endpoints]
+
+    def start(self, accounts: List[str], on_connect: OnConnect | None = None) -> List[asyncio.Task]:
+        self.accounts = list(accounts)
+        return [asyncio.create_task(self._worker(on_connect)) for _ in range(self.hedge)]
+
+    async def stream(
+        self, accounts: List[str], on_connect: OnConnect | None = None
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        workers = self.start(accounts, on_connect)
+        try:
+            while True:
+                yield await self._out.get()
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+    def live_client(self) -> Optional[AsyncWebsocketClient]:
+        return next(iter(self.clients), None)
+
+    async def add_accounts(self, accounts: Iterable[str]):
+        """Subscribe live connections to ``accounts`` without reconnecting."""
+        new = [account for account in accounts if account not in self.accounts]
+        if not new:
+            return
+        self.accounts.extend(new)
+        from xrpl.models.requests import Subscribe
+
+        await self._broadcast(Subscribe(accounts=new))
+
+    async def remove_accounts(self, accounts: Iterable[str]):
+        gone = [account for account in accounts if account in self.accounts]
+        if not gone:
+            return
+        self.accounts = [account for account in self.accounts if account not in gone]
+        from xrpl.models.requests import Unsubscribe
+
+        await self._broadcast(Unsubscribe(accounts=gone))
+
+    async def _broadcast(self, request):
+        # A connection that fails here is torn down by its heartbeat and
+        # resubscribes from self.accounts when it comes back.
+        for client in list(self.clients):
+            try:
+                await asyncio.wait_for(client.request(request), timeout=self.heartbeat_timeout)
+            except Exception as exc:
+                logger.warning("xrpl.subscription_update_failed", error=str(exc))
+
+    def _pick(self) -> Optional[Endpoint]:
+        now = time.monotonic()
+        candidates = [
+            endpoint
+            for endpoint in self.endpoints
+            if not endpoint.in_use and endpoint.retry_at <= now
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda e: (e.failures, e.lag or 0.0))
+
+    async def _worker(self, on_connect: OnConnect | None):
+        while True:
+            endpoint = self._pick()
+            if endpoint is None:
+                await asyncio.sleep(1)
+                continue
+            endpoint.in_use = True
+            try:
+                await self._connection(endpoint, on_connect)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                endpoint.failures += 1
+                RECONNECTS.inc(url=endpoint.url)
+                backoff = min(2 ** endpoint.failures, self.max_backoff)
+                endpoint.retry_at = time.monotonic() + backoff
+                logger.warning(
+                    "xrpl.connection_lost",
+                    url=endpoint.url,
+                    error=str(exc) or type(exc).__name__,
+                    retry_in=backoff,
+                    live=self.live,
+                )
+            finally:
+                endpoint.in_use = False
+
+    async def _connection(self, endpoint: Endpoint, on_connect: OnConnect | None):
+        from xrpl.asyncio.clients import AsyncWebsocketClient
+        from xrpl.models.requests import StreamParameter, Subscribe
+
+        client = AsyncWebsocketClient(endpoint.url)
+        await asyncio.wait_for(client.open(), timeout=self.heartbeat_timeout)
+        try:
+            accounts = list(self.accounts)
+            subscribe = Subscribe(streams=[StreamParameter.LEDGER], accounts=accounts or None)
+            response = await asyncio.wait_for(
+                client.request(subscribe), timeout=self.heartbeat_timeout
+            )
+            if not response.is_successful():
+                raise ConnectionError(f"subscribe failed: {response.result}")
+            endpoint.failures = 0
+            endpoint.last_message_at = time.monotonic()
+            # Only a connection that comes up with no other live ones can
+            # have missed anything; hand it to on_connect to backfill.
+            gap = self.live == 0
+            self.live += 1
+            self.clients.add(client)
+            logger.info("xrpl.connected", url=endpoint.url, live=self.live, gap=gap)
+            try:
+                if gap and on_connect and accounts:
+                    await on_connect(client, accounts)
+                await self._pump(endpoint, client)
+            finally:
+                self.live -= 1
+                self.clients.discard(client)
+        finally:
+            await client.close()
+
+    async def _pump(self, endpoint: Endpoint, client: AsyncWebsocketClient):
+        reader = asyncio.create_task(self._read(endpoint, client))
+        try:
+            while True:
+                done, _ = await asyncio.wait({reader}, timeout=self.heartbeat_timeout / 4)
+                if done:
+                    reader.result()
+                    raise ConnectionError("stream closed")
+                if not client.is_open():
+                    raise ConnectionError("socket closed")
+                quiet = time.monotonic() - endpoint.last_message_at
+                if not endpoint.waiting and quiet > self.heartbeat_timeout:
+                    raise ConnectionError("no messages within heartbeat timeout")
+        finally:
+            reader.cancel()
+
+    async def _read(self, endpoint: Endpoint, client: AsyncWebsocketClient):
+        async for message in client:
+            now = time.monotonic()
+            endpoint.last_message_at = now
+            key = message_key(message)
+            if key is None:
+                continue
+            if message.get("type") != "transaction":
+                key = (self.shard, key)
+            if self.seen.add(key, now):
+                endpoint.first_copies += 1
+                endpoint.record_lag(0.0)
+                if message.get("type") == "transaction":
+                    await self._put(endpoint, message)
+            else:
+                endpoint.late_copies += 1
+                DUPLICATES.inc(stage="stream")
+                endpoint.record_lag(now - self.seen.get(key))
+
+    async def _put(self, endpoint: Endpoint, message: Dict[str, Any]):
+        endpoint.waiting = True
+        try:
+            await self._out.put(message)
+        finally:
+            endpoint.waiting = False
+            # Nothing was read while blocked; the quiet period starts now.
+            endpoint.last_message_at = time.monotonic()
+
+
+class SubscriptionShards:
+    """Watched accounts spread over ``shards`` independent connection managers.
+
+    Each account is pinned to a shard by a stable hash of its address, and
+    every shard keeps its own hedged connections. All shards feed one
+    queue through one dedup set, with ledger closes keyed per shard.
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        shards: int = 1,
+        hedge: int = 2,
+        heartbeat_timeout: float = 20.0,
+        dedup_size: int = 50_000,
+    ):
+        self.seen = RecentHashes(dedup_size)
+        self._out: asyncio.Queue = asyncio.Queue(maxsize=10_000)
+        self.managers = [
+            ConnectionManager(
+                urls,
+                hedge=hedge,
+                heartbeat_timeout=heartbeat_timeout,
+                seen=self.seen,
+                out=self._out,
+                shard=shard,
+            )
+            for shard in range(max(1, shards))
+        ]
+
+    def shard_for(self, account: str) -> ConnectionManager:
+        return self.managers[zlib.crc32(account.encode()) % len(self.managers)]
+
+    def partition(self, accounts: Iterable[str]) -> Dict[int, List[str]]:
+        parts: Dict[int, List[str]] = {}
+        for account in accounts:
+            parts.setdefault(self.managers.index(self.shard_for(account)), []).append(account)
+        return parts
+
+    def live_client(self) -> Optional[AsyncWebsocketClient]:
+        return next(
+            (client for manager in self.managers for client in manager.clients), None
+        )
+
+    @property
+    def accounts(self) -> List[str]:
+        return [account for manager in self.managers for account in manager.accounts]
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [
+            {"shard": index, "accounts": len(manager.accounts), "endpoints": manager.stats()}
+            for index, manager in enumerate(self.managers)
+        ]
+
+    async def stream(
+        self, accounts: List[str], on_connect: OnConnect | None = None
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        parts = self.partition(accounts)
+        workers = [
+            task
+            for index, manager in enumerate(self.managers)
+            for task in manager.start(parts.get(index, []), on_connect)
+        ]
+        try:
+            while True:
+                yield await self._out.get()
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+    async def add_accounts(self, accounts: Iterable[str]):
+        for index, part in self.partition(accounts).items():
+            await self.managers[index].add_accounts(part)
+
+    async def remove_accounts(self, accounts: Iterable[str]):
+        for index, part in self.partition(accounts).items():
+            await self.managers[index].remove_accounts(part)
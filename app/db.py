@@ -1,17 +1,247 @@
+"""SQLite storage layer.
+
+The collector and the API share one database file, so the file runs in WAL
+mode: readers see a consistent snapshot and never wait on the writer.
+
+Engines are built on first use (``get_write_engine`` and friends), so
+importing this module touches neither SQLite nor aiosqlite.
+
+* ``write_engine`` / ``SessionLocal``: a single connection per process that
+  opens every transaction with ``BEGIN IMMEDIATE``, so a competing writer
+  waits on ``busy_timeout`` instead of failing on a lock upgrade.
+* ``read_engine`` / ``ReadSession``: a pool of read-only connections for
+  API queries.
+* ``async_read_engine`` / ``async_read_session``: the same read-only
+  connections on aiosqlite for the async API handlers, behind a semaphore
+  of ``DB_ASYNC_CONCURRENCY`` slots so bursts queue on the event loop
+  rather than in the pool or Starlette's thread pool.
+* ``checkpoint_loop``: periodic passive WAL checkpoints run by the
+  collector, so the WAL is folded back without stalling commits.
+"""
 from __future__ import annotations
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, scoped_session
+import asyncio
+import time
+import weakref
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+import structlog
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.orm import sessionmaker
 
 from .config import get_settings
+from .metrics import DB_READ_WAIT_SECONDS, instrument_engine
+
+logger = structlog.get_logger(__name__)
 
 settings = get_settings()
 
-engine = create_engine(f"sqlite:///{settings.db_path}", future=True, echo=False)
-SessionLocal = scoped_session(sessionmaker(bind=engine, autoflush=False, autocommit=False))
+
+def _apply_common_pragmas(cursor):
+    cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}")
+    cursor.execute(f"PRAGMA cache_size=-{settings.sqlite_cache_size_kb}")
+    cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_size_mb * 1024 * 1024}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+
+
+def _configure_writer(engine):
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        # Let SQLAlchemy's "begin" event below own transaction start.
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        # Only takes effect on a new file; lets retention hand pages back.
+        cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        _apply_common_pragmas(cursor)
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def on_begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def _configure_reader(engine):
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA query_only=ON")
+        _apply_common_pragmas(cursor)
+        cursor.close()
+
+
+@lru_cache(maxsize=None)
+def get_write_engine() -> Engine:
+    engine = create_engine(
+        f"sqlite:///{settings.db_path}",
+        future=True,
+        echo=False,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=settings.sqlite_busy_timeout_ms / 1000 * 6,
+    )
+    _configure_writer(engine)
+    instrument_engine(engine, "write")
+    return engine
+
+
+@lru_cache(maxsize=None)
+def get_read_engine() -> Engine:
+    engine = create_engine(
+        f"sqlite:///file:{settings.db_path}?mode=ro&uri=true",
+        future=True,
+        echo=False,
+        pool_size=settings.db_read_pool_size,
+        max_overflow=settings.db_read_pool_size,
+    )
+    _configure_reader(engine)
+    instrument_engine(engine, "read")
+    return engine
+
+
+async def _connect_async_reader():
+    import aiosqlite
+
+    connection = aiosqlite.connect(f"file:{settings.db_path}?mode=ro", uri=True)
+    # SQLAlchemy marks aiosqlite connections as daemon threads so idle pooled
+    # ones never hold the process open at exit; aiosqlite >= 0.21 keeps the
+    # thread in ``_thread`` instead of being one, so mark that.
+    getattr(connection, "_thread", connection).daemon = True
+    return await connection
+
+
+@lru_cache(maxsize=None)
+def get_async_read_engine():
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    engine = create_async_engine(
+        "sqlite+aiosqlite://",
+        echo=False,
+        async_creator=_connect_async_reader,
+        # One connection per slot, kept open: opening one (thread + pragmas)
+        # cost more than the typical API query it served.
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=settings.db_async_concurrency,
+        max_overflow=0,
+    )
+    _configure_reader(engine.sync_engine)
+    instrument_engine(engine.sync_engine, "async_read")
+    return engine
+
+
+async def dispose_async_read_engine():
+    """Close the pooled aiosqlite connections, if the engine was ever built."""
+    if get_async_read_engine.cache_info().currsize:
+        await get_async_read_engine().dispose()
+
+
+@lru_cache(maxsize=None)
+def _async_read_sessions():
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    return async_sessionmaker(get_async_read_engine(), autoflush=False, expire_on_commit=False)
+
+
+class _LazySessionmaker(sessionmaker):
+    """A sessionmaker whose engine is created when the first session is."""
+
+    def __init__(self, engine_factory, **kw):
+        super().__init__(**kw)
+        self._engine_factory = engine_factory
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=self._engine_factory())
+        return super().__call__(**local_kw)
+
+
+SessionLocal = _LazySessionmaker(get_write_engine, autoflush=False, autocommit=False)
+ReadSession = _LazySessionmaker(get_read_engine, autoflush=False, autocommit=False)
+
+_ENGINES = {
+    "engine": get_write_engine,
+    "write_engine": get_write_engine,
+    "read_engine": get_read_engine,
+    "async_read_engine": get_async_read_engine,
+}
+
+
+def __getattr__(name: str):
+    # The engine names stay importable; each engine is built on first use.
+    if name in _ENGINES:
+        return _ENGINES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# asyncio primitives belong to one loop; tests and restarts run several.
+_read_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _slots() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    slots = _read_slots.get(loop)
+    if slots is None:
+        slots = _read_slots[loop] = asyncio.Semaphore(settings.db_async_concurrency)
+    return slots
+
+
+@asynccontextmanager
+async def async_read_session():
+    """An async read session, once one of the concurrency slots is free."""
+    slots = _slots()
+    start = time.perf_counter()
+    async with slots:
+        DB_READ_WAIT_SECONDS.observe(time.perf_counter() - start)
+        async with _async_read_sessions()() as session:
+            yield session
+
+
+async def run_read(fn, *args, **kwargs):
+    """``fn(session, *args, **kwargs)`` on an async read session.
+
+    The sync query code runs unchanged: SQLAlchemy drives it through
+    aiosqlite from the event loop, without a worker thread.
+    """
+    async with async_read_session() as session:
+        return await session.run_sync(fn, *args, **kwargs)
 
 
 def init_db():
     from . import models  # noqa: F401
+    from .migrations import migrate
 
+    settings.db_path.parent.mkdir(parents=True, exist_ok=True)
+    engine = get_write_engine()
     models.Base.metadata.create_all(bind=engine)
+    migrate(engine, models.Base.metadata)
+
+
+def checkpoint(mode: str = "PASSIVE"):
+    # Raw connection: the "begin" hook would otherwise wrap the pragma in a
+    # write transaction, and a checkpoint cannot run inside one.
+    conn = get_write_engine().raw_connection()
+    try:
+        busy, log_frames, checkpointed = conn.execute(
+            f"PRAGMA wal_checkpoint({mode})"
+        ).fetchone()
+    finally:
+        conn.close()
+    logger.debug(
+        "db.checkpoint", mode=mode, busy=busy, log_frames=log_frames, checkpointed=checkpointed
+    )
+    return busy, log_frames, checkpointed
+
+
+async def checkpoint_loop(interval: float | None = None):
+    interval = interval or settings.sqlite_checkpoint_seconds
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(checkpoint)
+        except Exception as exc:
+            logger.warning("db.checkpoint_failed", error=str(exc))
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import hashlib
+import math
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, Optional
+
+
+class RecentHashes:
+    """Bounded LRU of recently seen keys, each with an optional value."""
+
+    def __init__(self, maxsize: int = 50_000):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        return self._entries.get(key)
+
+    def add(self, key: Hashable, value: Any = None) -> bool:
+        """Record ``key``; returns False if it was already present."""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return False
+        self._entries[key] = value
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return True
+
+    def clear(self):
+        self._entries.clear()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing on blake2b)."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def clear(self):
+        self.bits = bytearray(len(self.bits))
+
+
+class SeenHashes:
+    """Duplicate filter for transaction hashes in front of the database.
+
+    :meth:`check` answers ``True`` for hashes in the LRU (certainly stored
+    or queued), ``False`` for hashes the Bloom filter has never seen (skip
+    any lookup and insert), and ``None`` when only the Bloom filter matches
+    and the caller has to ask the database. Without a Bloom filter every
+    LRU miss is ``False``; the insert-or-ignore in the writer still catches
+    older duplicates.
+
+    The Bloom filter keeps two generations of ``bloom_capacity`` hashes
+    each. New hashes go into the current one; once it is full it becomes
+    the previous generation and the older one is emptied to take its place.
+    A long-running process therefore remembers the last one to two
+    generations of hashes at about twice ``error_rate``, instead of filling
+    a single filter until nearly every lookup is a false positive.
+    """
+
+    def __init__(self, maxsize: int = 50_000, bloom_capacity: int = 0, error_rate: float = 0.01):
+        self.recent = RecentHashes(maxsize)
+        self.bloom_capacity = bloom_capacity
+        self.bloom = self.previous = None
+        if bloom_capacity > 0:
+            self.bloom = BloomFilter(bloom_capacity, error_rate)
+            self.previous = BloomFilter(bloom_capacity, error_rate)
+        self.bloom_count = 0
+
+    def check(self, key: str) -> Optional[bool]:
+        if key in self.recent:
+            return True
+        if self.bloom is not None and (key in self.bloom or key in self.previous):
+            return None
+        return False
+
+    def add(self, key: str):
+        self.recent.add(key)
+        if self.bloom is not None:
+            if self.bloom_count >= self.bloom_capacity:
+                self.previous.clear()
+                self.bloom, self.previous = self.previous, self.bloom
+                self.bloom_count = 0
+            self.bloom.add(key)
+            self.bloom_count += 1
+
+    def warm(self, keys: Iterable[str]):
+        for key in keys:
+            self.add(key)
+
+    def clear(self):
+        self.recent.clear()
+        if self.bloom is not None:
+            self.bloom.clear()
+            self.previous.clear()
+        self.bloom_count = 0
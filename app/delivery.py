@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Dict, List
+
+import structlog
+from sqlalchemy import select, update
+
+from .config import Settings, get_settings
+from .db import SessionLocal
+from .metrics import ALERT_DELIVERY_SECONDS, ALERT_FAILURES
+from .models import AlertDelivery
+
+if TYPE_CHECKING:
+    import smtplib
+
+logger = structlog.get_logger(__name__)
+
+# Rows claimed before this is a crashed (or stopped) process's; see _recover.
+PROCESS_STARTED = datetime.utcnow()
+
+
+class WebhookChannel:
+    name = "webhook"
+
+    def __init__(self, settings: Settings):
+        # Channel libraries load only when the channel is configured.
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.url = settings.webhook_url
+        self.concurrency = settings.webhook_concurrency
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def send(self, payload: Dict[str, Any]):
+        response = self.session.post(self.url, json=payload, timeout=5)
+        response.raise_for_status()
+
+    def close(self):
+        self.session.close()
+
+
+class EmailChannel:
+    """SMTP delivery over long-lived sessions, one per concurrency slot."""
+
+    name = "email"
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.concurrency = settings.email_concurrency
+        self._idle: List[smtplib.SMTP] = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> smtplib.SMTP:
+        import smtplib
+
+        smtp = smtplib.SMTP(self.settings.smtp_host, self.settings.smtp_port, timeout=10)
+        smtp.starttls()
+        if self.settings.smtp_username and self.settings.smtp_password:
+            smtp.login(self.settings.smtp_username, self.settings.smtp_password)
+        return smtp
+
+    def _acquire(self) -> smtplib.SMTP:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._connect()
+
+    def _release(self, smtp: smtplib.SMTP):
+        with self._lock:
+            self._idle.append(smtp)
+
+    def send(self, payload: Dict[str, Any]):
+        import smtplib
+        from email.message import EmailMessage
+
+        msg = EmailMessage()
+        count = payload.get("alert_count", 1)
+        msg["Subject"] = (
+            f"XRP Alert digest #{payload['id']} ({count} alerts)"
+            if count > 1
+            else f"XRP Alert #{payload['id']}"
+        )
+        msg["From"] = self.settings.smtp_from
+        msg["To"] = self.settings.smtp_to
+        msg.set_content(payload["message"])
+        smtp = self._acquire()
+        try:
+            try:
+                smtp.send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                # Idle sessions get dropped by the server; reconnect once.
+                smtp.close()
+                smtp = self._connect()
+                smtp.send_message(msg)
+        except Exception:
+            self._discard(smtp)
+            raise
+        self._release(smtp)
+
+    def _discard(self, smtp: smtplib.SMTP):
+        try:
+            smtp.quit()
+        except Exception:
+            smtp.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for smtp in idle:
+            self._discard(smtp)
+
+
+class DesktopChannel:
+    name = "desktop"
+
+    def __init__(self, settings: Settings):
+        from plyer import notification
+
+        self.concurrency = settings.desktop_concurrency
+        self.notification = notification
+
+    def send(self, payload: Dict[str, Any]):
+        self.notification.notify(
+            title="XRP Alert",
+            message=payload["message"],
+            app_name="XRP Monitor",
+            timeout=5,
+        )
+
+    def close(self):
+        pass
+
+
+def build_channels(settings: Settings) -> Dict[str, Any]:
+    channels: Dict[str, Any] = {}
+    if settings.webhook_url:
+        channels[WebhookChannel.name] = WebhookChannel(settings)
+    if settings.smtp_host and settings.smtp_to:
+        channels[EmailChannel.name] = EmailChannel(settings)
+    if settings.enable_desktop_notifications:
+        channels[DesktopChannel.name] = DesktopChannel(settings)
+    return channels
+
+
+class DeliveryWorker:
+    """Drains the ``alert_outbox`` table on the event loop.
+
+    Blocking channel I/O runs in threads, bounded per channel by a semaphore,
+    so a slow webhook or SMTP server never holds up ingestion. Failed
+    deliveries are retried with exponential backoff until
+    ``alert_max_attempts`` is reached.
+
+    Stopping the worker waits for sends already handed to a thread and
+    records their outcome, so a restart in the same process never sends
+    them again.
+    """
+
+    def __init__(self, settings: Settings | None = None, session_factory=SessionLocal):
+        self.settings = settings or get_settings()
+        self.session_factory = session_factory
+        self.channels = build_channels(self.settings)
+        self.limits = {
+            name: asyncio.Semaphore(max(1, channel.concurrency))
+            for name, channel in self.channels.items()
+        }
+        self.tasks: set[asyncio.Task] = set()
+        self._wake = asyncio.Event()
+
+    def enqueue(self, session, alert_id: int, payload: Dict[str, Any]):
+        """Add outbox rows for every configured channel to ``session``."""
+        for name in self.channels:
+            session.add(AlertDelivery(alert_id=alert_id, channel=name, payload=payload))
+
+    def notify(self):
+        self._wake.set()
+
+    async def run(self):
+        if not self.channels:
+            return
+        await asyncio.to_thread(self._recover)
+        try:
+            while True:
+                self._wake.clear()
+                for row_id, channel, payload in await asyncio.to_thread(self._claim_due):
+                    task = asyncio.create_task(self._deliver(row_id, channel, payload))
+                    self.tasks.add(task)
+                    task.add_done_callback(self.tasks.discard)
+                try:
+                    await asyncio.wait_for(
+                        self._wake.wait(), timeout=self.settings.outbox_poll_seconds
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            tasks = list(self.tasks)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def close(self):
+        for channel in self.channels.values():
+            channel.close()
+
+    def _recover(self):
+        # Rows left in "sending" by a crashed process are retried. Rows this
+        # process claimed are settled by their own task, even across restarts.
+        with self.session_factory() as session:
+            session.execute(
+                update(AlertDelivery)
+                .where(
+                    AlertDelivery.status == "sending",
+                    (AlertDelivery.claimed_at < PROCESS_STARTED)
+                    | AlertDelivery.claimed_at.is_(None),
+                )
+                .values(status="pending")
+            )
+            session.commit()
+
+    def _claim_due(self) -> List[tuple]:
+        with self.session_factory() as session:
+            stmt = (
+                select(AlertDelivery)
+                .where(
+                    AlertDelivery.status == "pending",
+                    AlertDelivery.next_attempt_at <= datetime.utcnow(),
+                    AlertDelivery.channel.in_(list(self.channels)),
+                )
+                .order_by(AlertDelivery.next_attempt_at)
+                .limit(100)
+            )
+            claimed = []
+            now = datetime.utcnow()
+            for row in session.scalars(stmt).all():
+                row.status = "sending"
+                row.claimed_at = now
+                claimed.append((row.id, row.channel, row.payload))
+            session.commit()
+            return claimed
+
+    async def _deliver(self, row_id: int, channel_name: str, payload: Dict[str, Any]):
+        channel = self.channels[channel_name]
+        async with self.limits[channel_name]:
+            try:
+                with ALERT_DELIVERY_SECONDS.time(channel=channel_name):
+                    sending = asyncio.ensure_future(asyncio.to_thread(channel.send, payload))
+                    try:
+                        await asyncio.shield(sending)
+                    except asyncio.CancelledError:
+                        # The thread cannot be stopped; record what it did.
+                        await asyncio.wait({sending})
+                        await asyncio.to_thread(self._settle, row_id, sending)
+                        raise
+            except Exception as exc:
+                ALERT_FAILURES.inc(channel=channel_name)
+                logger.warning(
+                    f"alert.{channel_name}_failed", alert_id=payload["id"], error=str(exc)
+                )
+                await asyncio.to_thread(self._mark_failed, row_id, str(exc))
+            else:
+                await asyncio.to_thread(self._mark_sent, row_id)
+
+    def _settle(self, row_id: int, sending: asyncio.Future):
+        if sending.exception() is None:
+            self._mark_sent(row_id)
+        else:
+            self._mark_failed(row_id, str(sending.exception()))
+
+    def _mark_sent(self, row_id: int):
+        with self.session_factory() as session:
+            row = session.get(AlertDelivery, row_id)
+            row.status = "sent"
+            row.attempts += 1
+            row.sent_at = datetime.utcnow()
+            row.last_error = None
+            session.commit()
+
+    def _mark_failed(self, row_id: int, error: str):
+        with self.session_factory() as session:
+            row = session.get(AlertDelivery, row_id)
+            row.attempts += 1
+            row.last_error = error
+            if row.attempts >= self.settings.alert_max_attempts:
+                row.status = "failed"
+            else:
+                delay = min(
+                    self.settings.alert_retry_base_seconds * 2 ** (row.attempts - 1),
+                    self.settings.alert_retry_max_seconds,
+                )
+                row.status = "pending"
+                row.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+            session.commit()
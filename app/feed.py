@@ -0,0 +1,257 @@
+"""Live feed of newly stored transactions and alert events.
+
+The collector writes from its own process, so the hub watches the ``data``
+version stamp it bumps on every commit: one primary-key read per poll for
+the whole API process, however many clients are connected. Commits made
+in the API process itself wake the hub straight away. When the
+stamp moves, one query per table picks up the rows past the feed position
+and the batch is handed to every subscriber's queue.
+
+Event ids are ``<transaction seq>-<alert id>``, the feed position after
+that event. ``seq`` comes from ``transaction_feed``, which triggers fill on
+every insert into ``transactions``; unlike the rowid it is never reused or
+renumbered, so an id stays valid across retention runs and VACUUM.
+
+A client reconnecting with ``Last-Event-ID`` is caught up from the
+database before it joins the live fan-out, and so is a subscriber whose
+queue overflowed, so slow clients never hold the hub back.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Set, Tuple
+
+import orjson
+import structlog
+from sqlalchemy import func, select
+
+from .db import ReadSession
+from .metrics import FEED_SUBSCRIBERS
+from .models import AlertEvent, Transaction, TransactionFeed
+from .services.alert_service import serialize_alert
+from .services.tx_service import LIST_COLUMNS, serialize_row
+from .versions import DATA, get_version, local_version, wait_local
+
+logger = structlog.get_logger(__name__)
+
+Position = Tuple[int, int]
+
+TRANSACTION = "transaction"
+ALERT = "alert"
+
+FEED_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS transaction_feed_insert AFTER INSERT ON transactions "
+    "BEGIN INSERT INTO transaction_feed (hash) VALUES (NEW.hash); END",
+    "CREATE TRIGGER IF NOT EXISTS transaction_feed_delete AFTER DELETE ON transactions "
+    "BEGIN DELETE FROM transaction_feed WHERE hash = OLD.hash; END",
+)
+
+
+class FeedEvent(NamedTuple):
+    kind: str
+    position: Position
+    data: Dict[str, Any]
+
+
+def format_id(position: Position) -> str:
+    return f"{position[0]}-{position[1]}"
+
+
+def parse_id(value: str) -> Position:
+    try:
+        tx_id, alert_id = value.split("-")
+        return int(tx_id), int(alert_id)
+    except (AttributeError, ValueError) as exc:
+        raise ValueError("Invalid event id") from exc
+
+
+def encode_sse(event: Optional[FeedEvent]) -> bytes:
+    """One SSE frame; ``None`` is a keep-alive comment."""
+    if event is None:
+        return b": keep-alive\n\n"
+    head = f"id: {format_id(event.position)}\nevent: {event.kind}\ndata: ".encode()
+    return head + orjson.dumps(event.data) + b"\n\n"
+
+
+def is_newer(event: FeedEvent, position: Position) -> bool:
+    if event.kind == TRANSACTION:
+        return event.position[0] > position[0]
+    return event.position[1] > position[1]
+
+
+def advance(event: FeedEvent, position: Position) -> FeedEvent:
+    """``event`` stamped with the reader's position after it.
+
+    Live batches and catch-up reads overlap, so a batch can be behind the
+    reader on the other table; the id sent must not move either part back.
+    """
+    return event._replace(
+        position=(max(event.position[0], position[0]), max(event.position[1], position[1]))
+    )
+
+
+def head_position(session) -> Position:
+    return (
+        session.scalar(select(func.coalesce(func.max(TransactionFeed.seq), 0))),
+        session.scalar(select(func.coalesce(func.max(AlertEvent.id), 0))),
+    )
+
+
+def fetch_after(session, position: Position, limit: int) -> Tuple[List[FeedEvent], bool]:
+    """Events past ``position`` in feed order, and whether that was all of them."""
+    tx_id, alert_id = position
+    txs = session.execute(
+        select(TransactionFeed.seq, *LIST_COLUMNS)
+        .join_from(TransactionFeed, Transaction, TransactionFeed.hash == Transaction.hash)
+        .where(TransactionFeed.seq > tx_id)
+        .order_by(TransactionFeed.seq)
+        .limit(limit)
+    ).all()
+    alerts = session.scalars(
+        select(AlertEvent).where(AlertEvent.id > alert_id).order_by(AlertEvent.id).limit(limit)
+    ).all()
+    events = []
+    for row in txs:
+        tx_id = row.seq
+        events.append(FeedEvent(TRANSACTION, (tx_id, alert_id), serialize_row(row)))
+    for alert in alerts:
+        alert_id = alert.id
+        events.append(FeedEvent(ALERT, (tx_id, alert_id), serialize_alert(alert)))
+    return events, len(txs) < limit and len(alerts) < limit
+
+
+def create_feed_sequence(conn):
+    """Migration: install the ``transaction_feed`` triggers, numbering existing rows."""
+    exists = conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'transaction_feed_insert'"
+    ).first()
+    if exists:
+        return
+    conn.exec_driver_sql(
+        "INSERT OR IGNORE INTO transaction_feed (hash) SELECT hash FROM transactions ORDER BY rowid"
+    )
+    for ddl in FEED_TRIGGERS:
+        conn.exec_driver_sql(ddl)
+    logger.info("migrations.applied", step="create_feed_sequence")
+
+
+class Subscription:
+    def __init__(self, size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(size)
+
+    def overflow(self):
+        """Drop what is queued and tell the reader to catch up from the DB."""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class FeedHub:
+    def __init__(
+        self,
+        session_factory=ReadSession,
+        poll_seconds: float = 0.5,
+        heartbeat_seconds: float = 15.0,
+        batch_size: int = 500,
+        queue_size: int = 256,
+    ):
+        self.session_factory = session_factory
+        self.poll_seconds = poll_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.subscribers: Set[Subscription] = set()
+        self.position: Optional[Position] = None
+        self.version: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _head(self) -> Tuple[Position, int]:
+        with self.session_factory() as session:
+            return head_position(session), get_version(session, DATA)
+
+    def _poll(self) -> Tuple[List[FeedEvent], bool]:
+        with self.session_factory() as session:
+            version = get_version(session, DATA)
+            if version == self.version:
+                return [], True
+            events, complete = fetch_after(session, self.position, self.batch_size)
+        if complete:
+            self.version = version
+        return events, complete
+
+    def _fetch(self, position: Position) -> Tuple[List[FeedEvent], bool]:
+        with self.session_factory() as session:
+            return fetch_after(session, position, self.batch_size)
+
+    async def start(self):
+        """Start polling on the running loop (again, if a previous loop went away)."""
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._task.get_loop() is loop:
+            return
+        self.position, self.version = await asyncio.to_thread(self._head)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            complete = True
+            seen = local_version(DATA)
+            try:
+                events, complete = await asyncio.to_thread(self._poll)
+            except Exception:
+                logger.exception("feed.poll_failed")
+                events = []
+            if events:
+                self.position = events[-1].position
+                self.publish(events)
+            if complete:
+                await wait_local(DATA, seen, self.poll_seconds)
+
+    def publish(self, events: List[FeedEvent]):
+        for subscription in list(self.subscribers):
+            try:
+                subscription.queue.put_nowait(events)
+            except asyncio.QueueFull:
+                subscription.overflow()
+
+    async def stream(self, after: Optional[Position] = None) -> AsyncIterator[Optional[FeedEvent]]:
+        """Events after ``after`` (or from now on); ``None`` items are heartbeats."""
+        await self.start()
+        subscription = Subscription(self.queue_size)
+        self.subscribers.add(subscription)
+        FEED_SUBSCRIBERS.set(len(self.subscribers))
+        position = after or self.position
+        catch_up = after is not None
+        try:
+            while True:
+                while catch_up:
+                    # Queued live batches overlap the backlog; is_newer skips repeats.
+                    events, complete = await asyncio.to_thread(self._fetch, position)
+                    for event in events:
+                        event = advance(event, position)
+                        position = event.position
+                        yield event
+                    catch_up = not complete
+                try:
+                    batch = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=self.heartbeat_seconds
+                    )
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if batch is None:
+                    catch_up = True
+                    continue
+                for event in batch:
+                    if is_newer(event, position):
+                        event = advance(event, position)
+                        position = event.position
+                        yield event
+        finally:
+            self.subscribers.discard(subscription)
+            FEED_SUBSCRIBERS.set(len(self.subscribers))
@@ -0,0 +1,257 @@
+"""Offline bulk import of ``account_tx`` dumps.
+
+::
+
+    python -m app.importer dump-1.jsonl dump-2.json.gz --accounts rAbc...,rDef...
+
+Each input is JSONL (one ``account_tx`` item or whole response per line) or
+a JSON document holding a response or a list of items; ``.gz`` files are
+read transparently. Items are normalized across a process pool with the
+collector's own :func:`normalize_transaction`, written through
+:func:`store_transactions` one transaction per chunk while the secondary
+indexes on ``transactions`` are dropped, and the indexes and cursor are
+rebuilt at the end.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import structlog
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert
+
+from .backfill import account_tx_to_event
+from .config import Settings, get_settings
+from .db import SessionLocal, get_write_engine, init_db
+from .models import Transaction, WatchedAccount
+from .versions import ACCOUNTS, bump_version, notify_local
+from .writer import advance_cursor, store_transactions
+from .xrpl_client import normalize_transaction
+
+logger = structlog.get_logger(__name__)
+
+
+def _open(path: Path):
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def _items(document: Any) -> Iterator[Dict[str, Any]]:
+    """``account_tx`` items from a response, a bare result, a list or a single item."""
+    if isinstance(document, list):
+        for entry in document:
+            yield from _items(entry)
+        return
+    if not isinstance(document, dict):
+        return
+    result = document.get("result", document)
+    if isinstance(result, dict) and "transactions" in result:
+        yield from result["transactions"]
+    elif "tx" in document or "tx_json" in document:
+        yield document
+
+
+def read_dump(path: Path) -> Iterator[Dict[str, Any]]:
+    stem = path.name[:-3] if path.suffix == ".gz" else path.name
+    with _open(path) as handle:
+        if stem.endswith(".jsonl") or stem.endswith(".ndjson"):
+            for line in handle:
+                if line.strip():
+                    yield from _items(json.loads(line))
+        else:
+            yield from _items(json.load(handle))
+
+
+def chunked(items: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk: List[Dict[str, Any]] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def normalize_chunk(items: List[Dict[str, Any]], watched: frozenset) -> List[Dict[str, Any]]:
+    """Process-pool worker: the same conversion the backfill applies."""
+    return [
+        normalize_transaction(account_tx_to_event(item), watched)
+        for item in items
+        if item.get("validated", True)
+    ]
+
+
+def watch_accounts(addresses: List[str]):
+    """Record imported accounts as watched with their history already present."""
+    if not addresses:
+        return
+    with SessionLocal() as session:
+        stmt = insert(WatchedAccount).values(
+            [{"address": address, "history_complete": True} for address in addresses]
+        )
+        session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["address"], set_={"history_complete": True}
+            )
+        )
+        bump_version(session, ACCOUNTS)
+        session.commit()
+    notify_local(ACCOUNTS)
+
+
+def watched_addresses() -> List[str]:
+    with SessionLocal() as session:
+        return list(session.scalars(select(WatchedAccount.address)))
+
+
+def drop_transaction_indexes():
+    with get_write_engine().begin() as conn:
+        for index in Transaction.__table__.indexes:
+            index.drop(conn, checkfirst=True)
+
+
+def create_transaction_indexes():
+    with get_write_engine().begin() as conn:
+        for index in Transaction.__table__.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def set_synchronous(mode: str):
+    # Raw connection: PRAGMA synchronous cannot change inside the BEGIN
+    # IMMEDIATE the writer engine opens for every statement.
+    conn = get_write_engine().raw_connection()
+    try:
+        conn.execute(f"PRAGMA synchronous={mode}")
+    finally:
+        conn.close()
+
+
+def write_chunk(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    with SessionLocal() as session:
+        inserted = store_transactions(session, rows)
+        session.commit()
+    return inserted
+
+
+def rebuild_cursor() -> Optional[int]:
+    with SessionLocal() as session:
+        ledger_index = session.scalar(select(func.max(Transaction.ledger_index)))
+        advance_cursor(session, ledger_index)
+        session.commit()
+    return ledger_index
+
+
+async def run_import(
+    paths: List[Path],
+    watched: Iterable[str],
+    workers: Optional[int] = None,
+    chunk_size: int = 5000,
+    skip_alerts: bool = False,
+    defer_indexes: bool = True,
+) -> Dict[str, Any]:
+    """Normalize in the pool while the previous chunk is being written."""
+    loop = asyncio.get_running_loop()
+    watched = frozenset(watched)
+    engine = None
+    if not skip_alerts:
+        from .alerts import AlertEngine
+
+        engine = AlertEngine()
+    stats = {"items": 0, "inserted": 0, "alerts_evaluated": 0}
+    started = time.perf_counter()
+    if defer_indexes:
+        await asyncio.to_thread(drop_transaction_indexes)
+    await asyncio.to_thread(set_synchronous, "OFF")
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Enough chunks in flight to keep every worker busy during a write.
+            window = (workers or os.cpu_count() or 1) * 2
+            pending: List[asyncio.Future] = []
+
+            async def drain_one():
+                rows = await pending.pop(0)
+                stats["items"] += len(rows)
+                inserted = await asyncio.to_thread(write_chunk, rows)
+                stats["inserted"] += len(inserted)
+                if engine is not None:
+                    for row in inserted:
+                        await engine.evaluate(row)
+                    stats["alerts_evaluated"] += len(inserted)
+                logger.info(
+                    "importer.progress",
+                    items=stats["items"],
+                    inserted=stats["inserted"],
+                    rows_per_s=round(stats["items"] / (time.perf_counter() - started)),
+                )
+
+            for path in paths:
+                for chunk in chunked(read_dump(path), chunk_size):
+                    pending.append(loop.run_in_executor(pool, normalize_chunk, chunk, watched))
+                    if len(pending) >= window:
+                        await drain_one()
+            while pending:
+                await drain_one()
+    finally:
+        await asyncio.to_thread(set_synchronous, "NORMAL")
+        if defer_indexes:
+            index_started = time.perf_counter()
+            await asyncio.to_thread(create_transaction_indexes)
+            stats["index_seconds"] = round(time.perf_counter() - index_started, 2)
+        if engine is not None:
+            await engine.flush()
+            engine.delivery.close()
+    stats["cursor"] = await asyncio.to_thread(rebuild_cursor)
+    stats["seconds"] = round(time.perf_counter() - started, 2)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.importer")
+    parser.add_argument("paths", nargs="+", type=Path, help="JSON/JSONL account_tx dumps (.gz ok)")
+    parser.add_argument(
+        "--accounts",
+        type=Settings.parse_addresses,
+        default=[],
+        help="watched accounts the dumps belong to (default: the watched account list)",
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--skip-alerts", action="store_true", help="do not evaluate alert rules")
+    parser.add_argument(
+        "--keep-indexes",
+        action="store_true",
+        help="leave transaction indexes in place (faster for small imports into large DBs)",
+    )
+    args = parser.parse_args(argv)
+
+    from .services.account_service import AccountService
+
+    init_db()
+    AccountService().seed(get_settings().xrpl_account_addresses)
+    watch_accounts(args.accounts)
+    watched = args.accounts or watched_addresses()
+    stats = asyncio.run(
+        run_import(
+            args.paths,
+            watched,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            skip_alerts=args.skip_alerts,
+            defer_indexes=not args.keep_indexes,
+        )
+    )
+    logger.info("importer.complete", **stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,231 @@
-from fastapi import Depends, FastAPI, HTTPException
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
 
 from .auth import verify_api_key
-from .db import init_db
-from .schemas import AlertRuleCreate, DashboardResponse
+from .cache import ResponseCache
+from .charts import SERIES
+from .config import get_settings
+from .db import dispose_async_read_engine, init_db
+from .feed import FeedHub, encode_sse, parse_id
+from .metrics import HTTP_REQUEST_SECONDS, exposition
+from .schemas import AlertRuleCreate, DashboardResponse, TransactionQuery, WatchedAccountCreate
+from .services.account_service import AccountService
 from .services.alert_service import AlertService
+from .services.chart_service import ChartService
 from .services.dashboard_service import DashboardService
-from .services.tx_service import TransactionService
-
-app = FastAPI(title="XRP Monitor MCP API")
+from .services.tx_service import TransactionService, decode_cursor
 
 dashboard_service = DashboardService()
 tx_service = TransactionService()
 alert_service = AlertService()
+account_service = AccountService()
+chart_service = ChartService()
+response_cache = ResponseCache(ttl=get_settings().response_cache_ttl_seconds)
+feed_hub = FeedHub(
+    poll_seconds=get_settings().feed_poll_seconds,
+    heartbeat_seconds=get_settings().feed_heartbeat_seconds,
+)
 
 
-@app.on_event("startup")
-def startup():
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = get_settings()
     init_db()
+    account_service.seed(settings.xrpl_account_addresses)
+    collector_task = None
+    if settings.run_collector_in_api:
+        from .collector import CollectorService, supervise
+
+        # Same process and loop: the rule index, watched set and version
+        # counters the handlers update are the ones the collector reads.
+        collector_task = asyncio.create_task(
+            supervise(lambda: CollectorService(write_metrics_snapshot=False))
+        )
+    try:
+        yield
+    finally:
+        if collector_task is not None:
+            collector_task.cancel()
+            await asyncio.gather(collector_task, return_exceptions=True)
+        await feed_hub.stop()
+        await dispose_async_read_engine()
+
+
+# Read endpoints are async on aiosqlite (see db.async_read_session), so polling
+# clients wait on the DB slots, not on Starlette's thread pool. Writes keep
+# the sync handlers and the single writer connection.
+app = FastAPI(
+    title="XRP Monitor MCP API", lifespan=lifespan, default_response_class=ORJSONResponse
+)
+
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.observe(
+        time.perf_counter() - start,
+        method=request.method,
+        route=route.path if route else "unmatched",
+        status=response.status_code,
+    )
+    return response
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics(user=Depends(verify_api_key)):
+    settings = get_settings()
+    # An in-process collector is already in this registry.
+    snapshot = None if settings.run_collector_in_api else settings.collector_metrics_path
+    return PlainTextResponse(
+        exposition(snapshot),
+        media_type="text/plain; version=0.0.4",
+    )
 
 
 @app.get("/dashboard", response_model=DashboardResponse)
-def dashboard(user=Depends(verify_api_key)):
-    return dashboard_service.build()
+async def dashboard(request: Request, user=Depends(verify_api_key)):
+    cached = await response_cache.get_or_build_async("dashboard", dashboard_service.build_async)
+    return cached.respond(request)
+
+
+@app.get("/charts/{series}")
+async def chart_series(
+    request: Request,
+    series: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    resolution: str | None = Query(default=None, pattern="^(minute|hour|day)$"),
+    points: int = Query(default=500, ge=2, le=5000),
+    method: str = Query(default="lttb", pattern="^(lttb|minmax)$"),
+    account: str | None = None,
+    user=Depends(verify_api_key),
+):
+    if series not in SERIES:
+        raise HTTPException(status_code=404, detail="Unknown series")
+    try:
+        cached = await response_cache.get_or_build_async(
+            ("charts", series, start, end, resolution, points, method, account),
+            lambda: chart_service.series_async(
+                series, start, end, points, resolution, method, account
+            ),
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return cached.respond(request)
+
+
+@app.get("/feed")
+async def feed(
+    request: Request,
+    last_event_id: str | None = Query(default=None),
+    user=Depends(verify_api_key),
+):
+    """Server-sent events for new transactions and alerts, resumable by event id."""
+    resume = request.headers.get("last-event-id") or last_event_id
+    try:
+        after = parse_id(resume) if resume else None
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    async def frames():
+        async for event in feed_hub.stream(after):
+            yield encode_sse(event)
+
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def transaction_query(
+    limit: int = Query(default=50, ge=1, le=500),
+    cursor: str | None = None,
+    direction: str | None = Query(default=None, pattern="^(inbound|outbound)$"),
+    account: str | None = None,
+    counterparty: str | None = None,
+    ledger_min: int | None = None,
+    ledger_max: int | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    min_amount_xrp: float | None = None,
+    max_amount_xrp: float | None = None,
+    q: str | None = Query(default=None, min_length=1, max_length=256),
+) -> TransactionQuery:
+    return TransactionQuery(
+        limit=limit,
+        cursor=cursor,
+        direction=direction,
+        account=account,
+        counterparty=counterparty,
+        ledger_min=ledger_min,
+        ledger_max=ledger_max,
+        since=since,
+        until=until,
+        min_amount_xrp=min_amount_xrp,
+        max_amount_xrp=max_amount_xrp,
+        q=q,
+    )
 
 
 @app.get("/transactions")
-def list_transactions(limit: int = 50, direction: str | None = None, user=Depends(verify_api_key)):
-    return {"items": tx_service.list(limit=limit, direction=direction)}
+async def list_transactions(
+    request: Request,
+    query: TransactionQuery = Depends(transaction_query),
+    user=Depends(verify_api_key),
+):
+    try:
+        cached = await response_cache.get_or_build_async(
+            ("transactions", *query.model_dump().values()),
+            lambda: tx_service.list_async(query),
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return cached.respond(request)
+
+
+@app.get("/transactions/export")
+def export_transactions(
+    request: Request,
+    fmt: str = Query(default="ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    query: TransactionQuery = Depends(transaction_query),
+    user=Depends(verify_api_key),
+):
+    if query.cursor:
+        try:
+            decode_cursor(query.cursor)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+    compress = "gzip" in request.headers.get("accept-encoding", "")
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="transactions.{fmt}"'}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        tx_service.export(query, fmt=fmt, compress=compress),
+        media_type=media_type,
+        headers=headers,
+    )
+
+
+@app.get("/transactions/{tx_hash}")
+async def get_transaction(tx_hash: str, user=Depends(verify_api_key)):
+    result = await tx_service.get_async(tx_hash)
+    if not result:
+        raise HTTPException(status_code=404, detail="Transaction not found")
+    return result
 
 
 @app.get("/alerts")
-def list_alerts(status: str | None = None, user=Depends(verify_api_key)):
-    return {"items": alert_service.list(status=status)}
+async def list_alerts(status: str | None = None, user=Depends(verify_api_key)):
+    return {"items": await alert_service.list_async(status=status)}
 
 
 @app.post("/alerts")
@@ -45,3 +239,38 @@ def ack_alert(alert_id: int, user=Depends(verify_api_key)):
     if not result:
         raise HTTPException(status_code=404, detail="Alert not found")
     return result
+
+
+@app.get("/accounts")
+def list_accounts(user=Depends(verify_api_key)):
+    return {"items": account_service.list()}
+
+
+@app.post("/accounts", status_code=201)
+def add_account(account: WatchedAccountCreate, user=Depends(verify_api_key)):
+    result = account_service.add(account.address)
+    if not result:
+        raise HTTPException(status_code=409, detail="Account already watched")
+    return result
+
+
+@app.get("/accounts/{address}/balances")
+def account_balances(
+    address: str,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    limit: int = Query(default=1000, ge=1, le=10_000),
+    user=Depends(verify_api_key),
+):
+    result = account_service.balances(address, since, until, limit)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Account not found")
+    return result
+
+
+@app.delete("/accounts/{address}")
+def remove_account(address: str, user=Depends(verify_api_key)):
+    result = account_service.remove(address)
+    if not result:
+        raise HTTPException(status_code=404, detail="Account not found")
+    return result
@@ -0,0 +1,154 @@
+"""Full-text search over transaction memos.
+
+``transaction_memos`` is an SQLite FTS5 table holding every decoded
+``MemoData`` of a transaction, not only the first one kept in
+``transactions.memo``. Its rowid is the transaction's rowid, so a search
+is an FTS lookup followed by rowid probes into ``transactions``. Rows are
+added in the same transaction as the rows they index. Archived months are
+not indexed: a search covers the hot table only, and reports the archived
+months in its range as unsearched.
+
+Databases from before the index are seeded from ``transactions.memo``.
+To index every memo from the stored raw payloads instead::
+
+    python -m app.memos rebuild
+"""
+from __future__ import annotations
+
+import argparse
+from typing import Any, Dict, Iterable, List
+
+import structlog
+from sqlalchemy import column, literal_column, select, table, text
+
+from .models import MEMO_INDEX_DDL, Transaction, TransactionRaw
+from .raw_store import get_codec
+
+logger = structlog.get_logger(__name__)
+
+memo_index = table("transaction_memos", column("rowid"), column("memo"), column("rank"))
+transaction_rowid = literal_column("transactions.rowid")
+
+INSERT_MEMOS = text(
+    "INSERT INTO transaction_memos (rowid, memo) "
+    "SELECT rowid, :memo FROM transactions WHERE hash = :hash"
+)
+
+
+def decode_memos(tx: Dict[str, Any]) -> List[str]:
+    """Decoded ``MemoData`` of every entry in ``tx["Memos"]``, in order."""
+    memos = []
+    for entry in tx.get("Memos") or ():
+        data = (entry.get("Memo") or {}).get("MemoData")
+        if not data:
+            continue
+        try:
+            memo = bytes.fromhex(data).decode("utf-8", errors="ignore")
+        except ValueError:
+            continue
+        if memo:
+            memos.append(memo)
+    return memos
+
+
+def memo_text(row: Dict[str, Any]) -> str:
+    return "\n".join(row.get("memos") or ([row["memo"]] if row.get("memo") else []))
+
+
+def match_expression(q: str) -> str:
+    """``q`` as an FTS5 query: every word must appear, ``word*`` matches a prefix.
+
+    Words are quoted, so FTS5 operators and punctuation in user input are
+    searched for literally instead of raising syntax errors.
+    """
+    terms = []
+    for word in q.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*")
+        if word:
+            terms.append('"' + word.replace('"', '""') + '"' + ("*" if prefix else ""))
+    if not terms:
+        raise ValueError("Search query has no terms")
+    return " ".join(terms)
+
+
+def _match(q: str):
+    return literal_column("transaction_memos").op("MATCH")(match_expression(q))
+
+
+def ranked_matches(q: str):
+    """Subquery of (rowid, score) for memos matching ``q``; lower score ranks higher."""
+    return (
+        select(memo_index.c.rowid.label("rowid"), memo_index.c.rank.label("score"))
+        .where(_match(q))
+        .subquery("memo_matches")
+    )
+
+
+def memo_filter(q: str):
+    """WHERE clause restricting ``transactions`` to rows whose memos match ``q``."""
+    return transaction_rowid.in_(select(memo_index.c.rowid).where(_match(q)))
+
+
+def store_memos(session, rows: Iterable[Dict[str, Any]]):
+    values = [
+        {"hash": row["hash"], "memo": memo}
+        for row in rows
+        if (memo := memo_text(row))
+    ]
+    if values:
+        session.execute(INSERT_MEMOS, values)
+
+
+def create_memo_index(conn):
+    """Migration: create the index on older databases, seeded from ``transactions.memo``."""
+    exists = conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE name = 'transaction_memos'"
+    ).first()
+    if exists:
+        return
+    conn.execute(MEMO_INDEX_DDL)
+    conn.exec_driver_sql(
+        "INSERT INTO transaction_memos (rowid, memo) "
+        "SELECT rowid, memo FROM transactions WHERE memo IS NOT NULL AND memo != ''"
+    )
+    logger.info("migrations.applied", step="create_memo_index")
+
+
+def rebuild(session, chunk_size: int = 2_000) -> int:
+    """Re-index every memo of the hot transactions from their raw payloads."""
+    codec = get_codec()
+    session.execute(text("DELETE FROM transaction_memos"))
+    stmt = (
+        select(Transaction.hash, TransactionRaw.codec, TransactionRaw.dict_id, TransactionRaw.data)
+        .join(TransactionRaw, TransactionRaw.hash == Transaction.hash)
+        .execution_options(yield_per=chunk_size)
+    )
+    total = 0
+    for partition in session.execute(stmt).partitions():
+        rows = []
+        for tx_hash, name, dict_id, data in partition:
+            event = codec.decompress(session, name, dict_id, data)
+            tx = event.get("transaction") or event.get("tx") or {}
+            rows.append({"hash": tx_hash, "memos": decode_memos(tx)})
+        store_memos(session, rows)
+        total += sum(1 for row in rows if row["memos"])
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.memos")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args(argv)
+
+    from .db import SessionLocal, init_db
+
+    init_db()
+    with SessionLocal() as session:
+        total = rebuild(session)
+        session.commit()
+    logger.info("memos.rebuilt", transactions=total)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+The collector and the API are separate processes. The collector writes its
+samples to ``METRICS_SNAPSHOT_PATH`` every ``METRICS_SNAPSHOT_SECONDS``;
+the API's ``/metrics`` serves its own samples plus that snapshot, each
+tagged with a ``process`` label.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+
+LabelValues = Tuple[str, ...]
+# (suffix, labels, value)
+Sample = Tuple[str, Dict[str, str], float]
+
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def _labels(self, key: LabelValues) -> Dict[str, str]:
+        return dict(zip(self.labels, key))
+
+    def samples(self) -> List[Sample]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            return [("_total", self._labels(k), v) for k, v in self._values.items()]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels) -> Optional[float]:
+        return self._values.get(self._key(labels))
+
+    def samples(self):
+        with self._lock:
+            return [("", self._labels(k), v) for k, v in self._values.items()]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts..., +Inf count], sum
+        self._values: Dict[LabelValues, Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def samples(self):
+        out: List[Sample] = []
+        with self._lock:
+            for key, (counts, total) in self._values.items():
+                labels = self._labels(key)
+                cumulative = 0
+                for bound, count in zip(self.buckets + (math.inf,), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == math.inf else repr(bound)
+                    out.append(("_bucket", {**labels, "le": le}, cumulative))
+                out.append(("_sum", labels, total))
+                out.append(("_count", labels, cumulative))
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.setdefault(metric.name, metric)
+        return self.metrics[metric.name]
+
+    def counter(self, name, documentation, labels=()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=()) -> Gauge:
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def collect(self, **extra_labels) -> Dict[str, dict]:
+        """Families that have samples, as JSON-serializable dicts."""
+        families = {}
+        for metric in self.metrics.values():
+            samples = metric.samples()
+            if samples:
+                families[metric.name] = {
+                    "type": metric.kind,
+                    "help": metric.documentation,
+                    "samples": [
+                        [suffix, {**extra_labels, **labels}, value]
+                        for suffix, labels, value in samples
+                    ],
+                }
+        return families
+
+
+REGISTRY = Registry()
+
+EVENTS = REGISTRY.counter("xrpl_events", "Transaction messages received from the stream.")
+DUPLICATES = REGISTRY.counter(
+    "xrpl_duplicates",
+    "Transactions dropped as duplicates, by where they were caught.",
+    ["stage"],
+)
+RECONNECTS = REGISTRY.counter(
+    "xrpl_reconnects", "Websocket connections lost and retried.", ["url"]
+)
+INSERTED = REGISTRY.counter("xrpl_transactions_inserted", "New transactions committed.")
+INGEST_LAG = REGISTRY.gauge(
+    "xrpl_ingest_lag_seconds",
+    "Wall clock minus ledger close time of the latest streamed transaction.",
+)
+NORMALIZE_SECONDS = REGISTRY.histogram(
+    "xrpl_normalize_seconds", "Time spent in normalize_transaction."
+)
+PERSIST_SECONDS = REGISTRY.histogram(
+    "xrpl_persist_seconds", "Time to hand a transaction to the batch writer, including backpressure."
+)
+BATCH_WRITE_SECONDS = REGISTRY.histogram(
+    "xrpl_batch_write_seconds", "Time to write and commit one batch."
+)
+ALERT_EVALUATE_SECONDS = REGISTRY.histogram(
+    "alert_evaluate_seconds", "Time spent in AlertEngine.evaluate."
+)
+ALERT_DELIVERY_SECONDS = REGISTRY.histogram(
+    "alert_delivery_seconds", "Time per delivery attempt, by channel.", ["channel"]
+)
+ALERTS_SUPPRESSED = REGISTRY.counter(
+    "alerts_suppressed",
+    "Alert matches not delivered on their own: throttled by a rule, or coalesced into a digest.",
+    ["reason"],
+)
+ALERT_FAILURES = REGISTRY.counter(
+    "alert_delivery_failures", "Failed delivery attempts, by channel.", ["channel"]
+)
+DB_QUERY_SECONDS = REGISTRY.histogram(
+    "db_query_seconds", "SQL statement execution time, by engine and statement kind.",
+    ["engine", "statement"],
+)
+DB_READ_WAIT_SECONDS = REGISTRY.histogram(
+    "db_read_wait_seconds", "Time async API reads waited for a database slot."
+)
+SNAPSHOT_AGE = REGISTRY.gauge(
+    "metrics_snapshot_age_seconds", "Age of the collector metrics snapshot served by the API."
+)
+FEED_SUBSCRIBERS = REGISTRY.gauge("feed_subscribers", "Clients connected to the live feed.")
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_seconds", "API request latency, by route.", ["method", "route", "status"]
+)
+
+
+def instrument_engine(engine, name: str, histogram: Histogram = DB_QUERY_SECONDS):
+    @event.listens_for(engine, "before_cursor_execute")
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("metrics_start")
+        if not starts:
+            return
+        kind = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else ""
+        histogram.observe(time.perf_counter() - starts.pop(), engine=name, statement=kind)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def merge(*family_sets: Dict[str, dict]) -> Dict[str, dict]:
+    merged: Dict[str, dict] = {}
+    for families in family_sets:
+        for name, family in families.items():
+            target = merged.setdefault(name, {**family, "samples": []})
+            target["samples"].extend(family["samples"])
+    return merged
+
+
+def render(families: Dict[str, dict]) -> str:
+    lines = []
+    for name, family in sorted(families.items()):
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        for suffix, labels, value in family["samples"]:
+            lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def write_snapshot(path: Path, registry: Registry = REGISTRY, process: str = "collector"):
+    payload = {"written_at": time.time(), "families": registry.collect(process=process)}
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(payload))
+    os.replace(tmp, path)
+
+
+def read_snapshot(path: Path) -> Tuple[Dict[str, dict], Optional[float]]:
+    try:
+        payload = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}, None
+    return payload.get("families", {}), time.time() - payload.get("written_at", 0)
+
+
+def exposition(snapshot_path: Optional[Path] = None, process: str = "api") -> str:
+    """This process's metrics plus the collector snapshot, if one exists."""
+    snapshot: Dict[str, dict] = {}
+    if snapshot_path is not None:
+        snapshot, age = read_snapshot(snapshot_path)
+        if age is not None:
+            SNAPSHOT_AGE.set(age)
+    return render(merge(REGISTRY.collect(process=process), snapshot))
+
+
+async def snapshot_loop(path: Path, interval: float):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    while True:
+        await asyncio.to_thread(write_snapshot, path)
+        await asyncio.sleep(interval)
@@ -0,0 +1,93 @@
+"""Idempotent schema upgrades for databases created by older versions.
+
+``create_all`` only creates missing tables, so new columns and indexes on
+existing tables are added here. Each step checks the live schema first and
+is safe to run on every start.
+"""
+from __future__ import annotations
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+def column_names(conn, table: str) -> set[str]:
+    return {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+
+
+def add_transaction_counterparty(conn):
+    if "counterparty" in column_names(conn, "transactions"):
+        return
+    conn.exec_driver_sql("ALTER TABLE transactions ADD COLUMN counterparty VARCHAR(64)")
+    conn.exec_driver_sql(
+        "UPDATE transactions SET counterparty = "
+        "CASE WHEN direction = 'outbound' THEN destination ELSE account END"
+    )
+    logger.info("migrations.applied", step="add_transaction_counterparty")
+
+
+def drop_superseded_indexes(conn):
+    # Replaced by ix_transactions_account_timestamp and
+    # ix_transactions_destination_timestamp.
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_transactions_account")
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_transactions_destination")
+
+
+def move_raw_payloads(conn):
+    from .raw_store import migrate_raw_column
+
+    migrate_raw_column(conn)
+
+
+def add_alert_throttle_columns(conn):
+    if "min_interval_seconds" not in column_names(conn, "alert_rules"):
+        conn.exec_driver_sql("ALTER TABLE alert_rules ADD COLUMN min_interval_seconds FLOAT")
+        logger.info("migrations.applied", step="add_alert_rules_min_interval_seconds")
+    event_columns = column_names(conn, "alert_events")
+    if "alert_count" not in event_columns:
+        conn.exec_driver_sql(
+            "ALTER TABLE alert_events ADD COLUMN alert_count INTEGER NOT NULL DEFAULT 1"
+        )
+        conn.exec_driver_sql(
+            "ALTER TABLE alert_events ADD COLUMN suppressed_count INTEGER NOT NULL DEFAULT 0"
+        )
+        logger.info("migrations.applied", step="add_alert_events_counts")
+
+
+def add_outbox_claimed_at(conn):
+    if "claimed_at" in column_names(conn, "alert_outbox"):
+        return
+    conn.exec_driver_sql("ALTER TABLE alert_outbox ADD COLUMN claimed_at DATETIME")
+    logger.info("migrations.applied", step="add_outbox_claimed_at")
+
+
+def create_memo_index(conn):
+    from .memos import create_memo_index as create
+
+    create(conn)
+
+
+def create_feed_sequence(conn):
+    from .feed import create_feed_sequence as create
+
+    create(conn)
+
+
+MIGRATIONS = [
+    add_transaction_counterparty,
+    drop_superseded_indexes,
+    move_raw_payloads,
+    add_alert_throttle_columns,
+    create_memo_index,
+    add_outbox_claimed_at,
+    create_feed_sequence,
+]
+
+
+def migrate(engine, metadata):
+    with engine.begin() as conn:
+        for step in MIGRATIONS:
+            step(conn)
+        for table in metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
@@ -3,14 +3,19 @@ from __future__ import annotations
 from datetime import datetime
 
 from sqlalchemy import (
+    DDL,
     Column,
     DateTime,
     Float,
     Integer,
+    LargeBinary,
     String,
     Text,
     Boolean,
+    Index,
     JSON,
+    PrimaryKeyConstraint,
+    event,
 )
 from sqlalchemy.orm import declarative_base
 
@@ -27,16 +32,126 @@ class CursorState(Base):
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    # Every equality filter is backed by an index whose tail matches the
+    # (timestamp, hash) keyset order, so deep pages are plain range scans.
+    # The ledger and amount filters are ranges: an index on them cannot also
+    # yield that order, so their single-column indexes only narrow the rows
+    # that are then sorted. Wide ledger or amount ranges are best paired with
+    # since/until.
+    __table_args__ = (
+        Index("ix_transactions_timestamp_hash", "timestamp", "hash"),
+        Index("ix_transactions_account_timestamp", "account", "timestamp", "hash"),
+        Index(
+            "ix_transactions_destination_timestamp", "destination", "timestamp", "hash"
+        ),
+        Index(
+            "ix_transactions_counterparty_timestamp", "counterparty", "timestamp", "hash"
+        ),
+        Index("ix_transactions_direction_timestamp", "direction", "timestamp", "hash"),
+        Index("ix_transactions_ledger_index", "ledger_index"),
+        Index("ix_transactions_amount_xrp", "amount_xrp"),
+    )
 
     hash = Column(String(128), primary_key=True)
     ledger_index = Column(Integer, nullable=False)
-    account = Column(String(64), index=True, nullable=False)
-    destination = Column(String(64), index=True, nullable=True)
+    account = Column(String(64), nullable=False)
+    destination = Column(String(64), nullable=True)
+    counterparty = Column(String(64), nullable=True)
     amount_xrp = Column(Float, nullable=False)
     direction = Column(String(8), nullable=False)
     memo = Column(Text, nullable=True)
     timestamp = Column(DateTime, nullable=False)
-    raw = Column(JSON, nullable=True)
+
+
+# FTS5 index over every decoded memo of a transaction; its rowid is the
+# transaction's rowid. Maintained by app.memos.
+MEMO_INDEX_DDL = DDL(
+    "CREATE VIRTUAL TABLE IF NOT EXISTS transaction_memos "
+    "USING fts5(memo, tokenize = 'unicode61 remove_diacritics 2')"
+)
+event.listen(Transaction.__table__, "after_create", MEMO_INDEX_DDL)
+
+
+class TransactionFeed(Base):
+    """Live-feed position of each hot transaction. Maintained by triggers, see app.feed.
+
+    AUTOINCREMENT keeps ``seq`` from being reused after retention deletes
+    the newest rows, and VACUUM never renumbers it, unlike a rowid.
+    """
+
+    __tablename__ = "transaction_feed"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq = Column(Integer, primary_key=True)
+    hash = Column(String(128), nullable=False, unique=True)
+
+
+class TransactionRaw(Base):
+    """Compressed websocket payload for a transaction, read only on detail lookups."""
+
+    __tablename__ = "transaction_raw"
+
+    hash = Column(String(128), primary_key=True)
+    codec = Column(String(8), nullable=False)  # zlib/zstd
+    dict_id = Column(Integer, nullable=True)
+    data = Column(LargeBinary, nullable=False)
+
+
+class CompressionDict(Base):
+    __tablename__ = "compression_dicts"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    codec = Column(String(8), nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class FlowRollup(Base):
+    """Inflow/outflow/count per watched account per minute, hour or day bucket."""
+
+    __tablename__ = "flow_rollups"
+    __table_args__ = (
+        PrimaryKeyConstraint("account", "resolution", "bucket_start"),
+        Index("ix_flow_rollups_resolution_bucket", "resolution", "bucket_start"),
+    )
+
+    account = Column(String(64), nullable=False)
+    resolution = Column(String(8), nullable=False)  # minute/hour/day
+    bucket_start = Column(DateTime, nullable=False)
+    inflow = Column(Float, default=0.0, nullable=False)
+    outflow = Column(Float, default=0.0, nullable=False)
+    tx_count = Column(Integer, default=0, nullable=False)
+
+
+class AccountBalance(Base):
+    """XRP balance of a watched account after its last transaction in a ledger.
+
+    Read from the AccountRoot ``Balance`` in ``meta.AffectedNodes``, so fees,
+    non-payment transactions and the starting balance are all reflected.
+    """
+
+    __tablename__ = "account_balances"
+    __table_args__ = (
+        PrimaryKeyConstraint("account", "ledger_index"),
+        Index("ix_account_balances_account_timestamp", "account", "timestamp"),
+    )
+
+    account = Column(String(64), nullable=False)
+    ledger_index = Column(Integer, nullable=False)
+    # Position within the ledger; the highest one holds the closing balance.
+    tx_index = Column(Integer, default=0, nullable=False)
+    balance_xrp = Column(Float, nullable=False)
+    timestamp = Column(DateTime, nullable=False)
+    tx_hash = Column(String(128), nullable=True)
+
+
+class WatchedAccount(Base):
+    __tablename__ = "watched_accounts"
+
+    address = Column(String(64), primary_key=True)
+    # False until the account's full account_tx history has been backfilled.
+    history_complete = Column(Boolean, default=False, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
 
 class AlertRule(Base):
@@ -48,6 +163,8 @@ class AlertRule(Base):
     direction = Column(String(8), nullable=True)  # inbound/outbound
     counterparty = Column(String(64), nullable=True)
     memo_keyword = Column(String(128), nullable=True)
+    # At most one alert per this many seconds; further matches are counted.
+    min_interval_seconds = Column(Float, nullable=True)
     active = Column(Boolean, default=True, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
@@ -59,6 +176,50 @@ class AlertEvent(Base):
     rule_id = Column(Integer, nullable=True)
     transaction_hash = Column(String(128), nullable=True)
     message = Column(Text, nullable=False)
+    # Matches merged into this event (>1 for a digest) and matches dropped
+    # by rule throttles since the previous event.
+    alert_count = Column(Integer, default=1, nullable=False)
+    suppressed_count = Column(Integer, default=0, nullable=False)
     status = Column(String(32), default="open", nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     acknowledged_at = Column(DateTime, nullable=True)
+
+
+class AlertDelivery(Base):
+    """Outbox row: one pending delivery of an alert event over one channel."""
+
+    __tablename__ = "alert_outbox"
+    __table_args__ = (Index("ix_alert_outbox_due", "status", "next_attempt_at"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    alert_id = Column(Integer, index=True, nullable=False)
+    channel = Column(String(16), nullable=False)  # webhook/email/desktop
+    payload = Column(JSON, nullable=False)
+    status = Column(String(16), default="pending", nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    claimed_at = Column(DateTime, nullable=True)  # when a worker took it for "sending"
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
+
+
+class ArchivePartition(Base):
+    """A month of transactions moved out of the hot tables into its own file."""
+
+    __tablename__ = "archive_partitions"
+
+    month = Column(String(7), primary_key=True)  # YYYY-MM
+    file_name = Column(String(64), nullable=False)  # inside ARCHIVE_DIR
+    row_count = Column(Integer, default=0, nullable=False)
+    min_timestamp = Column(DateTime, nullable=True)
+    max_timestamp = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class StateVersion(Base):
+    __tablename__ = "state_versions"
+
+    name = Column(String(32), primary_key=True)
+    value = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
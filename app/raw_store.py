@@ -0,0 +1,203 @@
+"""Compressed cold storage for raw XRPL payloads.
+
+The full websocket event (``meta``, ``AffectedNodes`` and all) is kept out of
+the ``transactions`` table in ``transaction_raw``, compressed with zlib or,
+when the optional ``zstandard`` package is installed and ``RAW_CODEC=zstd``,
+with zstd and an optional trained dictionary::
+
+    python -m app.raw_store train-dict
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import zlib
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import structlog
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import OperationalError
+
+from .config import get_settings
+from .models import CompressionDict, TransactionRaw
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+logger = structlog.get_logger(__name__)
+
+ZLIB = "zlib"
+ZSTD = "zstd"
+DEFAULT_LEVELS = {ZLIB: 6, ZSTD: 3}
+
+
+def encode_payload(payload: Dict[str, Any]) -> bytes:
+    return json.dumps(payload, separators=(",", ":"), default=str).encode()
+
+
+class RawCodec:
+    def __init__(self, codec: Optional[str] = None, level: Optional[int] = None):
+        settings = get_settings()
+        codec = codec or settings.raw_codec
+        if codec == ZSTD and zstandard is None:
+            logger.warning("raw_store.zstd_unavailable", fallback=ZLIB)
+            codec = ZLIB
+        self.codec = codec
+        self.level = level or settings.raw_compression_level or DEFAULT_LEVELS[codec]
+        self.dict_id: Optional[int] = None
+        self._dict_loaded = False
+        self._compressor = None
+        self._dicts: Dict[int, Any] = {}
+
+    def _dictionary(self, session, dict_id: int):
+        if dict_id not in self._dicts:
+            row = session.get(CompressionDict, dict_id)
+            if row is None:
+                raise LookupError(f"compression dictionary {dict_id} is missing")
+            self._dicts[dict_id] = zstandard.ZstdCompressionDict(row.data)
+        return self._dicts[dict_id]
+
+    def _load_latest_dictionary(self, session):
+        self._dict_loaded = True
+        if self.codec != ZSTD:
+            return
+        dict_id = session.scalar(
+            select(CompressionDict.id)
+            .where(CompressionDict.codec == ZSTD)
+            .order_by(CompressionDict.id.desc())
+            .limit(1)
+        )
+        self.dict_id = dict_id
+        self._compressor = zstandard.ZstdCompressor(
+            level=self.level,
+            dict_data=self._dictionary(session, dict_id) if dict_id else None,
+        )
+
+    def compress(self, session, payload: Dict[str, Any]) -> Tuple[str, Optional[int], bytes]:
+        if not self._dict_loaded:
+            self._load_latest_dictionary(session)
+        data = encode_payload(payload)
+        if self.codec == ZSTD:
+            return ZSTD, self.dict_id, self._compressor.compress(data)
+        return ZLIB, None, zlib.compress(data, self.level)
+
+    def decompress(self, session, codec: str, dict_id: Optional[int], data: bytes) -> Dict[str, Any]:
+        if codec == ZSTD:
+            if zstandard is None:
+                raise RuntimeError("zstandard is required to read zstd payloads")
+            dict_data = self._dictionary(session, dict_id) if dict_id else None
+            raw = zstandard.ZstdDecompressor(dict_data=dict_data).decompress(data)
+        else:
+            raw = zlib.decompress(data)
+        return json.loads(raw)
+
+
+_codec: Optional[RawCodec] = None
+
+
+def get_codec() -> RawCodec:
+    global _codec
+    if _codec is None:
+        _codec = RawCodec()
+    return _codec
+
+
+def store_raw(session, rows: Iterable[Dict[str, Any]], codec: Optional[RawCodec] = None):
+    codec = codec or get_codec()
+    values = []
+    for row in rows:
+        if not row.get("raw"):
+            continue
+        name, dict_id, data = codec.compress(session, row["raw"])
+        values.append({"hash": row["hash"], "codec": name, "dict_id": dict_id, "data": data})
+    if values:
+        session.execute(
+            insert(TransactionRaw.__table__).on_conflict_do_nothing(index_elements=["hash"]),
+            values,
+        )
+
+
+def load_raw(
+    session,
+    tx_hash: str,
+    codec: Optional[RawCodec] = None,
+    execution_options: Optional[Dict[str, Any]] = None,
+) -> Optional[Dict[str, Any]]:
+    row = session.get(TransactionRaw, tx_hash, execution_options=execution_options or {})
+    if row is None:
+        return None
+    return (codec or get_codec()).decompress(session, row.codec, row.dict_id, row.data)
+
+
+def migrate_raw_column(conn, chunk_size: int = 2000):
+    """Move payloads from the legacy ``transactions.raw`` JSON column."""
+    columns = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(transactions)")}
+    if "raw" not in columns:
+        return
+    codec = RawCodec(codec=ZLIB)
+    moved = 0
+    result = conn.exec_driver_sql(
+        "SELECT hash, raw FROM transactions WHERE raw IS NOT NULL"
+    )
+    while True:
+        chunk = result.fetchmany(chunk_size)
+        if not chunk:
+            break
+        values = []
+        for tx_hash, raw in chunk:
+            _, _, data = codec.compress(None, json.loads(raw) if isinstance(raw, str) else raw)
+            values.append({"hash": tx_hash, "codec": ZLIB, "dict_id": None, "data": data})
+        for offset in range(0, len(values), 500):
+            conn.execute(
+                insert(TransactionRaw)
+                .values(values[offset : offset + 500])
+                .on_conflict_do_nothing(index_elements=["hash"])
+            )
+        moved += len(chunk)
+    try:
+        conn.exec_driver_sql("ALTER TABLE transactions DROP COLUMN raw")
+    except OperationalError:
+        # SQLite < 3.35 has no DROP COLUMN; emptying it still frees the pages.
+        conn.exec_driver_sql("UPDATE transactions SET raw = NULL")
+    logger.info("migrations.applied", step="migrate_raw_column", moved=moved)
+
+
+def train_dictionary(session, samples: int = 5000, size: int = 112_640) -> int:
+    """Train a zstd dictionary on a sample of stored payloads and make it the active one."""
+    if zstandard is None:
+        raise RuntimeError("install the zstandard package to train a dictionary")
+    codec = RawCodec()
+    rows = session.scalars(
+        select(TransactionRaw).order_by(TransactionRaw.hash).limit(samples)
+    ).all()
+    payloads = [encode_payload(codec.decompress(session, r.codec, r.dict_id, r.data)) for r in rows]
+    if not payloads:
+        raise RuntimeError("no payloads to train on")
+    trained = zstandard.train_dictionary(size, payloads)
+    model = CompressionDict(codec=ZSTD, data=trained.as_bytes())
+    session.add(model)
+    session.flush()
+    return model.id
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.raw_store")
+    parser.add_argument("command", choices=["train-dict"])
+    parser.add_argument("--samples", type=int, default=5000)
+    parser.add_argument("--size", type=int, default=112_640)
+    args = parser.parse_args(argv)
+
+    from .db import SessionLocal, init_db
+
+    init_db()
+    with SessionLocal() as session:
+        dict_id = train_dictionary(session, samples=args.samples, size=args.size)
+        session.commit()
+    logger.info("raw_store.dictionary_trained", dict_id=dict_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""Retention: old transactions move to per-month archive files.
+
+Rows older than ``RETENTION_DAYS`` are copied with their raw payloads into
+``ARCHIVE_DIR/transactions-YYYY-MM.db`` and deleted from the hot tables in
+batches of ``RETENTION_BATCH_SIZE``, each its own short write transaction.
+``archive_partitions`` records which months exist and the time span each
+holds. Rollups, balances and alert events stay in the main file, so the
+dashboard and charts still cover the full history.
+
+Reads attach an archive only when a query's time range reaches it (see
+:func:`partitions` and :func:`attached`). Freed pages go back to the OS
+through incremental vacuum. Databases created before this change need a
+one-off ``python -m app.retention vacuum``, run with the collector and API
+stopped, to switch ``auto_vacuum`` on.
+
+Archive and main commits are separate in WAL mode. A crash between them
+leaves a batch in both places: readers drop the duplicates, and the next
+pass removes them from the hot table.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import structlog
+from sqlalchemy import create_engine, select, text
+
+from .config import get_settings
+from .models import ArchivePartition, Base, Transaction, TransactionRaw
+
+logger = structlog.get_logger(__name__)
+
+ARCHIVED_TABLES = [Transaction.__table__, TransactionRaw.__table__]
+TX_COLUMNS = ", ".join(column.name for column in Transaction.__table__.columns)
+RAW_COLUMNS = ", ".join(column.name for column in TransactionRaw.__table__.columns)
+
+
+def month_key(ts: datetime) -> str:
+    return ts.strftime("%Y-%m")
+
+
+def month_bounds(key: str) -> Tuple[datetime, datetime]:
+    start = datetime.strptime(key, "%Y-%m")
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+def file_name(key: str) -> str:
+    return f"transactions-{key}.db"
+
+
+def _sql_datetime(ts: datetime) -> str:
+    # The format SQLAlchemy stores DateTime columns in, so string comparison
+    # in raw SQL orders the same way.
+    return ts.isoformat(sep=" ", timespec="microseconds")
+
+
+def partitions(
+    session,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> List[ArchivePartition]:
+    """Archived months overlapping [since, until), newest first."""
+    stmt = select(ArchivePartition).where(ArchivePartition.row_count > 0)
+    if since is not None:
+        stmt = stmt.where(ArchivePartition.max_timestamp >= since)
+    if until is not None:
+        stmt = stmt.where(ArchivePartition.min_timestamp < until)
+    return list(session.scalars(stmt.order_by(ArchivePartition.month.desc())))
+
+
+@contextmanager
+def attached(session, partition: ArchivePartition, archive_dir: Optional[Path] = None):
+    """ATTACH ``partition``'s file to the session's connection for the block.
+
+    Yields execution options that point unqualified table names at it.
+    Only for read sessions: SQLite cannot attach inside the writer's
+    ``BEGIN IMMEDIATE``.
+    """
+    path = (archive_dir or get_settings().archive_path) / partition.file_name
+    alias = f"archive_{partition.month.replace('-', '_')}"
+    session.execute(text(f"ATTACH DATABASE :path AS {alias}"), {"path": str(path)})
+    try:
+        yield {"schema_translate_map": {None: alias}}
+    finally:
+        session.execute(text(f"DETACH DATABASE {alias}"))
+
+
+def iter_archived(
+    stmt, archived: List[ArchivePartition], chunk_size: int = 2_000, mappings: bool = False
+) -> Iterator[List[Any]]:
+    """Row chunks of ``stmt`` run against each of ``archived``, for full rebuilds."""
+    if not archived:
+        return
+    from .db import ReadSession
+
+    with ReadSession() as session:
+        for partition in archived:
+            with attached(session, partition) as options:
+                result = session.execute(
+                    stmt.execution_options(yield_per=chunk_size, **options)
+                )
+                yield from (result.mappings() if mappings else result).partitions()
+
+
+def create_archive(path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    engine = create_engine(f"sqlite:///{path}")
+    try:
+        Base.metadata.create_all(engine, tables=ARCHIVED_TABLES)
+    finally:
+        engine.dispose()
+
+
+def archive_batch(conn, key: str, lo: datetime, hi: datetime, batch_size: int) -> int:
+    """Move up to ``batch_size`` rows with lo <= timestamp < hi into ``archive``."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM temp.retention_batch")
+        conn.execute(
+            "INSERT INTO temp.retention_batch (hash) SELECT hash FROM main.transactions "
+            "WHERE timestamp >= ? AND timestamp < ? ORDER BY timestamp LIMIT ?",
+            (_sql_datetime(lo), _sql_datetime(hi), batch_size),
+        )
+        count, first, last = conn.execute(
+            "SELECT count(*), min(timestamp), max(timestamp) FROM main.transactions "
+            "WHERE hash IN (SELECT hash FROM temp.retention_batch)"
+        ).fetchone()
+        if not count:
+            conn.execute("ROLLBACK")
+            return 0
+        moved = conn.execute(
+            f"INSERT OR IGNORE INTO archive.transactions ({TX_COLUMNS}) "
+            f"SELECT {TX_COLUMNS} FROM main.transactions "
+            "WHERE hash IN (SELECT hash FROM temp.retention_batch)"
+        ).rowcount
+        conn.execute(
+            f"INSERT OR IGNORE INTO archive.transaction_raw ({RAW_COLUMNS}) "
+            f"SELECT {RAW_COLUMNS} FROM main.transaction_raw "
+            "WHERE hash IN (SELECT hash FROM temp.retention_batch)"
+        )
+        conn.execute(
+            "DELETE FROM main.transaction_raw WHERE hash IN (SELECT hash FROM temp.retention_batch)"
+        )
+        # Memo search covers the hot table only.
+        conn.execute(
+            "DELETE FROM main.transaction_memos WHERE rowid IN (SELECT rowid FROM main.transactions "
+            "WHERE hash IN (SELECT hash FROM temp.retention_batch))"
+        )
+        conn.execute(
+            "DELETE FROM main.transactions WHERE hash IN (SELECT hash FROM temp.retention_batch)"
+        )
+        conn.execute(
+            "INSERT INTO main.archive_partitions "
+            "(month, file_name, row_count, min_timestamp, max_timestamp, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(month) DO UPDATE SET "
+            "row_count = row_count + excluded.row_count, "
+            "min_timestamp = min(coalesce(min_timestamp, excluded.min_timestamp), excluded.min_timestamp), "
+            "max_timestamp = max(coalesce(max_timestamp, excluded.max_timestamp), excluded.max_timestamp), "
+            "updated_at = excluded.updated_at",
+            (key, file_name(key), moved, first, last, _sql_datetime(datetime.utcnow())),
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return count
+
+
+def incremental_vacuum(conn) -> int:
+    """Hand free pages back to the OS; a no-op unless auto_vacuum is INCREMENTAL."""
+    (freelist,) = conn.execute("PRAGMA freelist_count").fetchone()
+    (mode,) = conn.execute("PRAGMA auto_vacuum").fetchone()
+    if mode != 2:
+        if freelist:
+            logger.info("retention.vacuum_disabled", free_pages=freelist)
+        return 0
+    conn.execute("PRAGMA incremental_vacuum").fetchall()
+    return freelist
+
+
+@contextmanager
+def _writer_connection():
+    """The writer's raw connection: ATTACH is not allowed inside its BEGIN IMMEDIATE.
+
+    Checked out per batch, so the collector's writer gets it back in between.
+    """
+    from .db import get_write_engine
+
+    conn = get_write_engine().raw_connection()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def _oldest_timestamp(since: Optional[datetime] = None) -> Optional[datetime]:
+    with _writer_connection() as conn:
+        (oldest,) = conn.execute(
+            "SELECT min(timestamp) FROM main.transactions WHERE timestamp >= ?",
+            (_sql_datetime(since or datetime.min),),
+        ).fetchone()
+    return datetime.fromisoformat(oldest) if oldest else None
+
+
+def _archive_next_batch(path: Path, key: str, lo: datetime, hi: datetime, batch_size: int) -> int:
+    with _writer_connection() as conn:
+        conn.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS retention_batch (hash VARCHAR(128) PRIMARY KEY)"
+        )
+        conn.execute("ATTACH DATABASE ? AS archive", (str(path),))
+        try:
+            return archive_batch(conn, key, lo, hi, batch_size)
+        finally:
+            conn.execute("DETACH DATABASE archive")
+
+
+def run_retention(
+    days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    now: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """Archive everything older than ``days`` and reclaim the freed pages."""
+    settings = get_settings()
+    days = settings.retention_days if days is None else days
+    batch_size = batch_size or settings.retention_batch_size
+    cutoff = (now or datetime.utcnow()) - timedelta(days=days)
+    stats: Dict[str, Any] = {"cutoff": cutoff.isoformat(), "moved": 0, "months": []}
+    # Month by month, skipping straight to the next one holding rows, so
+    # no archive file is created for an empty month.
+    oldest = _oldest_timestamp()
+    while oldest is not None and oldest < cutoff:
+        key = month_key(oldest)
+        start, end = month_bounds(key)
+        path = settings.archive_path / file_name(key)
+        if not path.exists():
+            create_archive(path)
+        moved = 0
+        while True:
+            count = _archive_next_batch(path, key, start, min(end, cutoff), batch_size)
+            moved += count
+            if count < batch_size:
+                break
+        if moved:
+            stats["moved"] += moved
+            stats["months"].append(key)
+            logger.info("retention.archived", month=key, rows=moved)
+        oldest = _oldest_timestamp(since=end)
+    if stats["moved"]:
+        with _writer_connection() as conn:
+            stats["pages_freed"] = incremental_vacuum(conn)
+    return stats
+
+
+async def retention_loop(interval: Optional[float] = None):
+    interval = interval or get_settings().retention_interval_seconds
+    while True:
+        try:
+            stats = await asyncio.to_thread(run_retention)
+            if stats["moved"]:
+                logger.info("retention.complete", **stats)
+        except Exception as exc:
+            logger.warning("retention.failed", error=str(exc))
+        await asyncio.sleep(interval)
+
+
+def enable_incremental_vacuum():
+    """One-off switch of an existing file to auto_vacuum=INCREMENTAL (rewrites it)."""
+    with _writer_connection() as conn:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+    # VACUUM may renumber transaction rowids, which the memo index is keyed on.
+    from . import memos
+    from .db import SessionLocal
+
+    with SessionLocal() as session:
+        memos.rebuild(session)
+        session.commit()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.retention")
+    parser.add_argument("command", choices=["run", "vacuum"])
+    parser.add_argument("--days", type=int, default=None, help="override RETENTION_DAYS")
+    args = parser.parse_args(argv)
+
+    from .db import init_db
+
+    init_db()
+    if args.command == "vacuum":
+        enable_incremental_vacuum()
+        logger.info("retention.vacuum_enabled")
+        return
+    days = args.days if args.days is not None else get_settings().retention_days
+    if days <= 0:
+        parser.error("set RETENTION_DAYS or pass --days")
+    logger.info("retention.complete", **run_retention(days))
+
+
+if __name__ == "__main__":
+    main()
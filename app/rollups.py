@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import argparse
+from itertools import chain
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import structlog
+from sqlalchemy import and_, delete, func, or_, select
+from sqlalchemy.dialects.sqlite import insert
+
+from .models import FlowRollup, Transaction
+from .retention import iter_archived, partitions
+from .versions import ROLLUPS_BUILT, bump_version, get_version
+
+logger = structlog.get_logger(__name__)
+
+MINUTE = "minute"
+HOUR = "hour"
+DAY = "day"
+RESOLUTIONS = {
+    MINUTE: timedelta(minutes=1),
+    HOUR: timedelta(hours=1),
+    DAY: timedelta(days=1),
+}
+
+_upsert = insert(FlowRollup.__table__)
+# Executed with a parameter list: compiled once, batched by SQLAlchemy.
+UPSERT_ROLLUPS = _upsert.on_conflict_do_update(
+    index_elements=["account", "resolution", "bucket_start"],
+    set_={
+        "inflow": FlowRollup.__table__.c.inflow + _upsert.excluded.inflow,
+        "outflow": FlowRollup.__table__.c.outflow + _upsert.excluded.outflow,
+        "tx_count": FlowRollup.__table__.c.tx_count + _upsert.excluded.tx_count,
+    },
+)
+
+
+def bucket_start(ts: datetime, resolution: str) -> datetime:
+    if resolution == MINUTE:
+        return ts.replace(second=0, microsecond=0)
+    if resolution == HOUR:
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _ceil(ts: datetime, resolution: str) -> datetime:
+    floor = bucket_start(ts, resolution)
+    return floor if floor == ts else floor + RESOLUTIONS[resolution]
+
+
+def watched_account(tx_data: Dict[str, Any]) -> Optional[str]:
+    """The wallet on our side of the transaction."""
+    if tx_data["direction"] == "outbound":
+        return tx_data.get("account")
+    return tx_data.get("destination")
+
+
+def apply_rollups(session, rows: Iterable[Dict[str, Any]]):
+    """Add newly stored transactions to every bucket they fall in."""
+    deltas: Dict[Tuple[str, str, datetime], List[float]] = {}
+    for row in rows:
+        account = watched_account(row)
+        if not account or not row.get("timestamp"):
+            continue
+        inbound = row["direction"] == "inbound"
+        for resolution in RESOLUTIONS:
+            key = (account, resolution, bucket_start(row["timestamp"], resolution))
+            delta = deltas.setdefault(key, [0.0, 0.0, 0])
+            delta[0 if inbound else 1] += row["amount_xrp"]
+            delta[2] += 1
+    if not deltas:
+        return
+    values = [
+        {
+            "account": account,
+            "resolution": resolution,
+            "bucket_start": start,
+            "inflow": inflow,
+            "outflow": outflow,
+            "tx_count": count,
+        }
+        for (account, resolution, start), (inflow, outflow, count) in deltas.items()
+    ]
+    session.execute(UPSERT_ROLLUPS, values)
+
+
+def cover(start: datetime, end: datetime, resolutions=(DAY, HOUR, MINUTE)) -> List[Tuple[str, datetime, datetime]]:
+    """Split [start, end) into the fewest aligned bucket ranges, coarsest first."""
+    if start >= end:
+        return []
+    resolution, finer = resolutions[0], resolutions[1:]
+    if not finer:
+        return [(resolution, bucket_start(start, resolution), end)]
+    lo, hi = _ceil(start, resolution), bucket_start(end, resolution)
+    if lo >= hi:
+        return cover(start, end, finer)
+    return cover(start, lo, finer) + [(resolution, lo, hi)] + cover(hi, end, finer)
+
+
+def flow_between(
+    session,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    accounts: Optional[List[str]] = None,
+) -> Tuple[float, float, int]:
+    """Inflow, outflow and count over [start, end) read from a handful of buckets.
+
+    Resolution is one minute: the minute containing ``start`` is included
+    whole. With no ``start`` the day buckets give the all-time totals.
+    """
+    if start is None:
+        ranges = [FlowRollup.resolution == DAY]
+    else:
+        end = end or datetime.utcnow()
+        end = bucket_start(end, MINUTE) + RESOLUTIONS[MINUTE]
+        ranges = [
+            and_(
+                FlowRollup.resolution == resolution,
+                FlowRollup.bucket_start >= lo,
+                FlowRollup.bucket_start < hi,
+            )
+            for resolution, lo, hi in cover(bucket_start(start, MINUTE), end)
+        ]
+        if not ranges:
+            return 0.0, 0.0, 0
+    stmt = select(
+        func.coalesce(func.sum(FlowRollup.inflow), 0.0),
+        func.coalesce(func.sum(FlowRollup.outflow), 0.0),
+        func.coalesce(func.sum(FlowRollup.tx_count), 0),
+    ).where(or_(*ranges))
+    if accounts:
+        stmt = stmt.where(FlowRollup.account.in_(accounts))
+    inflow, outflow, count = session.execute(stmt).one()
+    return inflow, outflow, count
+
+
+def rebuild(session, chunk_size: int = 10_000) -> int:
+    """Recompute every bucket from the transactions table and its archives."""
+    session.execute(delete(FlowRollup))
+    stmt = select(
+        Transaction.account,
+        Transaction.destination,
+        Transaction.direction,
+        Transaction.amount_xrp,
+        Transaction.timestamp,
+    ).execution_options(yield_per=chunk_size)
+    total = 0
+    hot = session.execute(stmt).mappings().partitions()
+    for partition in chain(hot, iter_archived(stmt, partitions(session), mappings=True)):
+        apply_rollups(session, partition)
+        total += len(partition)
+    return total
+
+
+def ensure_built(session) -> bool:
+    """Rebuild once for databases that predate the rollup table.
+
+    Completion is stamped in ``state_versions``: a build can leave the table
+    empty, and that must not bring the full scan back on every start.
+    """
+    if get_version(session, ROLLUPS_BUILT):
+        return False
+    built = (
+        session.scalar(select(FlowRollup.account).limit(1)) is None
+        and session.scalar(select(Transaction.hash).limit(1)) is not None
+    )
+    if built:
+        total = rebuild(session)
+        logger.info("rollups.rebuilt", transactions=total)
+    bump_version(session, ROLLUPS_BUILT)
+    return built
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.rollups")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args(argv)
+
+    from .db import SessionLocal, init_db
+
+    init_db()
+    with SessionLocal() as session:
+        total = rebuild(session)
+        session.commit()
+    logger.info("rollups.rebuilt", transactions=total)
+
+
+if __name__ == "__main__":
+    main()
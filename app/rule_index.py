@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton: finds every keyword in a memo in a single pass."""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[Set[str]] = [set()]
+        for keyword in keywords:
+            self._add(keyword)
+        self._link()
+
+    def _add(self, keyword: str):
+        state = 0
+        for char in keyword:
+            nxt = self.goto[state].get(char)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][char] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(set())
+            state = nxt
+        self.output[state].add(keyword)
+
+    def _link(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.output[nxt] |= self.output[self.fail[nxt]]
+
+    def find(self, text: str) -> Set[str]:
+        found: Set[str] = set()
+        state = 0
+        for char in text:
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            if self.output[state]:
+                found |= self.output[state]
+        return found
+
+
+BucketKey = Tuple[Optional[str], Optional[str], Optional[str]]
+
+
+class RuleIndex:
+    """Active alert rules compiled for lookup by transaction.
+
+    Rules are bucketed by (direction, counterparty, memo keyword), with each
+    bucket sorted by ``min_amount_xrp`` so the amount check is a bisect. An
+    unset field is stored under ``None`` and acts as a wildcard.
+    """
+
+    def __init__(self, rules: Iterable[Any]):
+        grouped: Dict[BucketKey, List[Tuple[float, int, Any]]] = {}
+        for rule in rules:
+            key = (
+                rule.direction or None,
+                rule.counterparty or None,
+                rule.memo_keyword.lower() if rule.memo_keyword else None,
+            )
+            grouped.setdefault(key, []).append(
+                (rule.min_amount_xrp or 0.0, rule.id, rule)
+            )
+        self.buckets: Dict[BucketKey, Tuple[List[float], List[Any]]] = {}
+        for key, entries in grouped.items():
+            entries.sort(key=lambda entry: (entry[0], entry[1]))
+            self.buckets[key] = (
+                [entry[0] for entry in entries],
+                [entry[2] for entry in entries],
+            )
+        self.rule_count = sum(len(entries) for entries in grouped.values())
+        self.matcher = KeywordMatcher({key[2] for key in self.buckets if key[2]})
+
+    def match(self, tx_data: Dict[str, Any]) -> List[Any]:
+        if not self.buckets:
+            return []
+        amount = tx_data["amount_xrp"]
+        # Every memo, not just the first; newlines keep keywords from
+        # matching across two of them.
+        memo = "\n".join(tx_data.get("memos") or ()) or tx_data.get("memo")
+        keywords: List[Optional[str]] = [None]
+        if memo:
+            keywords.extend(self.matcher.find(memo.lower()))
+        counterparty = tx_data.get("counterparty")
+        triggered = []
+        for direction in {None, tx_data["direction"]}:
+            for party in {None, counterparty}:
+                for keyword in keywords:
+                    bucket = self.buckets.get((direction, party, keyword))
+                    if bucket:
+                        thresholds, rules = bucket
+                        triggered.extend(rules[: bisect_right(thresholds, amount)])
+        triggered.sort(key=lambda rule: rule.id)
+        return triggered
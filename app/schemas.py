@@ -1,9 +1,16 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
+
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """``value`` as a naive UTC datetime, the form timestamps are stored in."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
 
 
 class TransactionRow(BaseModel):
@@ -15,6 +22,31 @@ class TransactionRow(BaseModel):
     memo: Optional[str]
 
 
+class WatchedAccountCreate(BaseModel):
+    address: str = Field(pattern="^r[1-9A-HJ-NP-Za-km-z]{24,34}$")
+
+
+class TransactionQuery(BaseModel):
+    limit: int = Field(default=50, ge=1, le=500)
+    cursor: Optional[str] = None
+    direction: Optional[str] = Field(default=None, pattern="^(inbound|outbound)$")
+    account: Optional[str] = None
+    counterparty: Optional[str] = None
+    ledger_min: Optional[int] = None
+    ledger_max: Optional[int] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    min_amount_xrp: Optional[float] = None
+    max_amount_xrp: Optional[float] = None
+    # Full-text memo search; results come best match first.
+    q: Optional[str] = Field(default=None, min_length=1, max_length=256)
+
+    @field_validator("since", "until")
+    @classmethod
+    def _naive_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        return naive_utc(value)
+
+
 class DashboardSummary(BaseModel):
     total_balance_xrp: float = Field(default=0.0)
     inflow_24h: float = Field(default=0.0)
@@ -35,6 +67,7 @@ class AlertRuleCreate(BaseModel):
     direction: Optional[str] = Field(default=None, pattern="^(inbound|outbound)$")
     counterparty: Optional[str] = None
     memo_keyword: Optional[str] = None
+    min_interval_seconds: Optional[float] = Field(default=None, ge=0)
 
 
 class AlertAction(BaseModel):
@@ -0,0 +1,81 @@
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import select
+
+from ..balances import balance_history, latest_balances
+from ..db import ReadSession, SessionLocal
+from ..models import WatchedAccount
+from ..versions import ACCOUNTS, bump_version, get_version, notify_local
+
+
+def serialize_account(account: WatchedAccount, balance: float | None = None):
+    return {
+        "address": account.address,
+        "history_complete": account.history_complete,
+        "balance_xrp": balance,
+        "created_at": account.created_at.isoformat(),
+    }
+
+
+class AccountService:
+    def list(self):
+        with ReadSession() as session:
+            stmt = select(WatchedAccount).order_by(WatchedAccount.created_at, WatchedAccount.address)
+            accounts = session.scalars(stmt).all()
+            balances = latest_balances(session, [account.address for account in accounts])
+            return [
+                serialize_account(account, balances.get(account.address)) for account in accounts
+            ]
+
+    def balances(
+        self,
+        address: str,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        limit: int = 1000,
+    ):
+        with ReadSession() as session:
+            if session.get(WatchedAccount, address) is None:
+                return None
+            return {
+                "address": address,
+                "items": balance_history(session, address, since, until, limit),
+            }
+
+    def add(self, address: str):
+        """Start watching ``address``; returns None if it is already watched."""
+        with SessionLocal() as session:
+            if session.get(WatchedAccount, address):
+                return None
+            account = WatchedAccount(address=address, history_complete=False)
+            session.add(account)
+            bump_version(session, ACCOUNTS)
+            session.commit()
+            notify_local(ACCOUNTS)
+            return serialize_account(account)
+
+    def remove(self, address: str):
+        with SessionLocal() as session:
+            account = session.get(WatchedAccount, address)
+            if not account:
+                return None
+            session.delete(account)
+            bump_version(session, ACCOUNTS)
+            session.commit()
+            notify_local(ACCOUNTS)
+            return {"address": address, "status": "removed"}
+
+    def seed(self, addresses: Iterable[str]):
+        """Import ``XRPL_ACCOUNT_ADDRESSES`` the first time the table is used.
+
+        Those accounts were already streamed and backfilled from the cursor
+        before the table existed, so they are not backfilled again.
+        """
+        with SessionLocal() as session:
+            if get_version(session, ACCOUNTS):
+                return
+            for address in dict.fromkeys(addresses):
+                session.add(WatchedAccount(address=address, history_complete=True))
+            bump_version(session, ACCOUNTS)
+            session.commit()
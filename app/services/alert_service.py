@@ -2,32 +2,44 @@ from datetime import datetime
 
 from sqlalchemy import select
 
-from ..db import SessionLocal
+from ..db import ReadSession, SessionLocal, run_read
 from ..models import AlertEvent, AlertRule
 from ..schemas import AlertRuleCreate
+from ..versions import DATA, RULES, bump_version, notify_local
+
+
+def serialize_alert(alert: AlertEvent):
+    return {
+        "id": alert.id,
+        "message": alert.message,
+        "status": alert.status,
+        "alert_count": alert.alert_count,
+        "suppressed_count": alert.suppressed_count,
+        "created_at": alert.created_at.isoformat(),
+    }
 
 
 class AlertService:
     def list(self, status: str | None = None):
-        with SessionLocal() as session:
-            stmt = select(AlertEvent).order_by(AlertEvent.created_at.desc())
-            if status:
-                stmt = stmt.where(AlertEvent.status == status)
-            return [
-                {
-                    "id": alert.id,
-                    "message": alert.message,
-                    "status": alert.status,
-                    "created_at": alert.created_at.isoformat(),
-                }
-                for alert in session.scalars(stmt).all()
-            ]
+        with ReadSession() as session:
+            return self._list(session, status)
+
+    async def list_async(self, status: str | None = None):
+        return await run_read(self._list, status)
+
+    def _list(self, session, status: str | None = None):
+        stmt = select(AlertEvent).order_by(AlertEvent.created_at.desc())
+        if status:
+            stmt = stmt.where(AlertEvent.status == status)
+        return [serialize_alert(alert) for alert in session.scalars(stmt).all()]
 
     def create(self, rule: AlertRuleCreate):
         with SessionLocal() as session:
             model = AlertRule(**rule.model_dump())
             session.add(model)
+            bump_version(session, RULES)
             session.commit()
+            notify_local(RULES)
             session.refresh(model)
             return {"id": model.id, "name": model.name}
 
@@ -38,5 +50,7 @@ class AlertService:
                 return None
             alert.status = "acknowledged"
             alert.acknowledged_at = datetime.utcnow()
+            bump_version(session, DATA)
             session.commit()
+            notify_local(DATA)
             return {"id": alert_id, "status": alert.status}
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+from ..charts import build_series
+from ..db import ReadSession, run_read
+from ..schemas import naive_utc
+
+DEFAULT_RANGE = timedelta(days=30)
+
+
+class ChartService:
+    def series(
+        self,
+        series: str,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        points: int = 500,
+        resolution: str | None = None,
+        method: str = "lttb",
+        account: str | None = None,
+    ):
+        with ReadSession() as session:
+            return self._series(session, series, start, end, points, resolution, method, account)
+
+    async def series_async(
+        self,
+        series: str,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        points: int = 500,
+        resolution: str | None = None,
+        method: str = "lttb",
+        account: str | None = None,
+    ):
+        return await run_read(
+            self._series, series, start, end, points, resolution, method, account
+        )
+
+    def _series(self, session, series, start, end, points, resolution, method, account):
+        # Rollup buckets are naive UTC; aware bounds would never match them.
+        end = naive_utc(end) or datetime.utcnow()
+        start = naive_utc(start) or end - DEFAULT_RANGE
+        return build_series(
+            session,
+            series,
+            start,
+            end,
+            points=points,
+            resolution=resolution,
+            method=method,
+            accounts=[account] if account else None,
+        )
@@ -1,54 +1,36 @@
 from datetime import datetime, timedelta
 
-from sqlalchemy import func, select, desc
+from sqlalchemy import select, desc
 
-from ..db import SessionLocal
+from ..db import ReadSession, run_read
 from ..models import Transaction, AlertEvent
+from ..balances import total_balance
+from ..rollups import flow_between
 from ..schemas import DashboardResponse, DashboardSummary, TransactionRow
 
 
 class DashboardService:
     def build(self) -> DashboardResponse:
-        with SessionLocal() as session:
-            balance = (
-                session.query(
-                    func.sum(
-                        func.case(
-                            (Transaction.direction == "inbound", Transaction.amount_xrp),
-                            else_=-Transaction.amount_xrp,
-                        )
-                    )
-                ).scalar()
-                or 0.0
-            )
-            since = datetime.utcnow() - timedelta(hours=24)
-            inflow = (
-                session.query(func.sum(Transaction.amount_xrp))
-                .filter(
-                    Transaction.direction == "inbound", Transaction.timestamp >= since
-                )
-                .scalar()
-                or 0.0
-            )
-            outflow = (
-                session.query(func.sum(Transaction.amount_xrp))
-                .filter(
-                    Transaction.direction == "outbound",
-                    Transaction.timestamp >= since,
-                )
-                .scalar()
-                or 0.0
+        with ReadSession() as session:
+            return self._build(session)
+
+    async def build_async(self) -> DashboardResponse:
+        return await run_read(self._build)
+
+    def _build(self, session) -> DashboardResponse:
+        balance = total_balance(session)
+        since = datetime.utcnow() - timedelta(hours=24)
+        inflow, outflow, _ = flow_between(session, since)
+        alerts = session.scalars(
+            select(AlertEvent).where(AlertEvent.status == "open").order_by(
+                desc(AlertEvent.created_at)
             )
-            alerts = session.scalars(
-                select(AlertEvent).where(AlertEvent.status == "open").order_by(
-                    desc(AlertEvent.created_at)
-                )
-            ).all()
-            txs = session.scalars(
-                select(Transaction)
-                .order_by(desc(Transaction.timestamp))
-                .limit(25)
-            ).all()
+        ).all()
+        txs = session.scalars(
+            select(Transaction)
+            .order_by(desc(Transaction.timestamp))
+            .limit(25)
+        ).all()
         summary = DashboardSummary(
             total_balance_xrp=balance, inflow_24h=inflow, outflow_24h=outflow, alert_count=len(alerts)
         )
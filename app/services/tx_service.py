@@ -1,46 +1,345 @@
+import base64
+import csv
+import heapq
+import io
+import json
+import zlib
 from datetime import datetime, timedelta
+from itertools import chain, islice
+from typing import Iterator, List, Optional
 
-from sqlalchemy import select, desc, func
+from sqlalchemy import or_, select, desc, tuple_
 
-from ..db import SessionLocal
-from ..models import Transaction
+from ..db import ReadSession, run_read
+from ..memos import memo_filter, ranked_matches, transaction_rowid
+from ..models import ArchivePartition, Transaction
+from ..raw_store import load_raw
+from ..retention import attached, partitions
+from ..rollups import flow_between
+from ..schemas import TransactionQuery
+
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_FIELDS = (
+    "hash",
+    "ledger_index",
+    "timestamp",
+    "account",
+    "destination",
+    "amount_xrp",
+    "direction",
+    "counterparty",
+    "memo",
+)
+
+LIST_COLUMNS = (
+    Transaction.hash,
+    Transaction.ledger_index,
+    Transaction.timestamp,
+    Transaction.account,
+    Transaction.destination,
+    Transaction.counterparty,
+    Transaction.amount_xrp,
+    Transaction.direction,
+    Transaction.memo,
+)
+
+
+def encode_cursor(timestamp: datetime, tx_hash: str) -> str:
+    raw = json.dumps([timestamp.isoformat(), tx_hash]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, tx_hash = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(timestamp), tx_hash
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def encode_rank_cursor(score: float, tx_hash: str) -> str:
+    raw = json.dumps([score, tx_hash]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_rank_cursor(cursor: str) -> tuple[float, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        score, tx_hash = json.loads(base64.urlsafe_b64decode(padded))
+        return float(score), str(tx_hash)
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def transaction_filters(query: TransactionQuery) -> list:
+    clauses = []
+    if query.direction:
+        clauses.append(Transaction.direction == query.direction)
+    if query.account:
+        # Either side, as /charts?account= counts flows of the account.
+        clauses.append(
+            or_(Transaction.account == query.account, Transaction.destination == query.account)
+        )
+    if query.counterparty:
+        clauses.append(Transaction.counterparty == query.counterparty)
+    if query.ledger_min is not None:
+        clauses.append(Transaction.ledger_index >= query.ledger_min)
+    if query.ledger_max is not None:
+        clauses.append(Transaction.ledger_index <= query.ledger_max)
+    if query.since is not None:
+        clauses.append(Transaction.timestamp >= query.since)
+    if query.until is not None:
+        clauses.append(Transaction.timestamp < query.until)
+    if query.min_amount_xrp is not None:
+        clauses.append(Transaction.amount_xrp >= query.min_amount_xrp)
+    if query.max_amount_xrp is not None:
+        clauses.append(Transaction.amount_xrp <= query.max_amount_xrp)
+    return clauses
+
+
+def serialize_row(row) -> dict:
+    return {
+        "hash": row.hash,
+        "ledger_index": row.ledger_index,
+        "timestamp": row.timestamp.isoformat(),
+        "account": row.account,
+        "destination": row.destination,
+        "amount_xrp": row.amount_xrp,
+        "direction": row.direction,
+        "counterparty": row.counterparty,
+        "memo": row.memo,
+    }
+
+
+def ordered_select(query: TransactionQuery):
+    stmt = (
+        select(*LIST_COLUMNS)
+        .where(*transaction_filters(query))
+        .order_by(desc(Transaction.timestamp), desc(Transaction.hash))
+    )
+    if query.q:
+        stmt = stmt.where(memo_filter(query.q))
+    if query.cursor:
+        stmt = stmt.where(
+            tuple_(Transaction.timestamp, Transaction.hash) < decode_cursor(query.cursor)
+        )
+    return stmt
+
+
+def ranked_select(query: TransactionQuery):
+    """Memo search results, best match first, keyset-paged on (score, hash).
+
+    Scores are bm25 over the index as it stands, so rows committed between
+    two pages can shift later ranks slightly.
+    """
+    matches = ranked_matches(query.q)
+    stmt = (
+        select(*LIST_COLUMNS, matches.c.score)
+        .join_from(Transaction, matches, transaction_rowid == matches.c.rowid)
+        .where(*transaction_filters(query))
+        .order_by(matches.c.score, Transaction.hash)
+    )
+    if query.cursor:
+        stmt = stmt.where(
+            tuple_(matches.c.score, Transaction.hash) > decode_rank_cursor(query.cursor)
+        )
+    return stmt
+
+
+def archived_partitions(
+    session, query: TransactionQuery, hot: Optional[list] = None, page_size: int = 0
+) -> List[ArchivePartition]:
+    """Archive months the query's time range (and cursor) still reaches.
+
+    Given a full page of ``hot`` rows, only months holding rows at least
+    as new as the page's last one can change it; usually there are none.
+    """
+    if query.q:
+        # Archives carry no memo index.
+        return []
+    since, until = query.since, query.until
+    if hot and len(hot) >= page_size:
+        since = max(since, hot[-1].timestamp) if since else hot[-1].timestamp
+    if query.cursor:
+        cursor_end = decode_cursor(query.cursor)[0] + timedelta(microseconds=1)
+        until = min(until, cursor_end) if until else cursor_end
+    return partitions(session, since, until)
+
+
+def source_rows(
+    session,
+    query: TransactionQuery,
+    partition: Optional[ArchivePartition],
+    page_size: int,
+    rows: Optional[list] = None,
+):
+    """Newest-first rows of the hot table or one archive, a keyset page at a time.
+
+    ``rows`` is a first page already read.
+    """
+    while True:
+        if rows is None:
+            stmt = ordered_select(query).limit(page_size)
+            if partition is None:
+                rows = session.execute(stmt).all()
+            else:
+                with attached(session, partition) as options:
+                    rows = session.execute(stmt, execution_options=options).all()
+        yield from rows
+        if len(rows) < page_size:
+            return
+        query = query.model_copy(
+            update={"cursor": encode_cursor(rows[-1].timestamp, rows[-1].hash)}
+        )
+        rows = None
+
+
+def merged_rows(session, query: TransactionQuery, archived, page_size: int, hot=None):
+    """Hot and archived rows merged into one newest-first stream.
+
+    Archive months do not overlap, so they are read one after another,
+    newest first, and an older month is only attached once the newer ones
+    ran out. Hot rows can still fall anywhere (a history backfill stores
+    old ledgers), so that stream is merged in.
+
+    A batch caught between the archive and hot commits can be in both
+    files; equal rows arrive next to each other and only the first is kept.
+    """
+    hot_rows = source_rows(session, query, None, page_size, hot)
+    archived_rows = chain.from_iterable(
+        source_rows(session, query, partition, page_size) for partition in archived
+    )
+    last = None
+    for row in heapq.merge(
+        hot_rows, archived_rows, key=lambda row: (row.timestamp, row.hash), reverse=True
+    ):
+        if row.hash != last:
+            last = row.hash
+            yield row
+
+
+def encode_ndjson(rows) -> bytes:
+    return "".join(json.dumps(serialize_row(row)) + "\n" for row in rows).encode()
+
+
+def encode_csv(rows, header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        item = serialize_row(row)
+        writer.writerow([item[field] for field in EXPORT_FIELDS])
+    return buffer.getvalue().encode()
 
 
 class TransactionService:
-    def list(self, limit: int = 50, direction: str | None = None):
-        with SessionLocal() as session:
-            stmt = select(Transaction).order_by(desc(Transaction.timestamp)).limit(limit)
-            if direction:
-                stmt = stmt.where(Transaction.direction == direction)
-            rows = session.scalars(stmt).all()
-            return [
-                {
-                    "hash": tx.hash,
-                    "timestamp": tx.timestamp.isoformat(),
-                    "amount_xrp": tx.amount_xrp,
-                    "direction": tx.direction,
-                    "counterparty": tx.counterparty,
-                    "memo": tx.memo,
-                }
-                for tx in rows
-            ]
+    def list(self, query: TransactionQuery):
+        with ReadSession() as session:
+            return self._list(session, query)
 
-    def inflow_outflow_24h(self):
-        since = datetime.utcnow() - timedelta(hours=24)
-        with SessionLocal() as session:
-            inbound = (
-                session.query(func.sum(Transaction.amount_xrp))
-                .filter(Transaction.direction == "inbound", Transaction.timestamp >= since)
-                .scalar()
-                or 0.0
-            )
-            outbound = (
-                session.query(func.sum(Transaction.amount_xrp))
-                .filter(
-                    Transaction.direction == "outbound",
-                    Transaction.timestamp >= since,
+    async def list_async(self, query: TransactionQuery):
+        return await run_read(self._list, query)
+
+    def _list(self, session, query: TransactionQuery):
+        if query.q:
+            return self._search(session, query)
+        rows = session.execute(ordered_select(query).limit(query.limit + 1)).all()
+        archived = archived_partitions(session, query, rows, query.limit + 1)
+        if archived:
+            rows = list(
+                islice(
+                    merged_rows(session, query, archived, query.limit + 1, rows),
+                    query.limit + 1,
                 )
-                .scalar()
-                or 0.0
             )
+        next_cursor = None
+        if len(rows) > query.limit:
+            rows = rows[: query.limit]
+            next_cursor = encode_cursor(rows[-1].timestamp, rows[-1].hash)
+        return {"items": [serialize_row(row) for row in rows], "next_cursor": next_cursor}
+
+    def _search(self, session, query: TransactionQuery):
+        """Ranked memo search over the hot table.
+
+        Archived months carry no memo index, so the ones the query's range
+        reaches are listed in ``unsearched_months`` rather than searched.
+        """
+        rows = session.execute(ranked_select(query).limit(query.limit + 1)).all()
+        next_cursor = None
+        if len(rows) > query.limit:
+            rows = rows[: query.limit]
+            next_cursor = encode_rank_cursor(rows[-1].score, rows[-1].hash)
+        items = [{**serialize_row(row), "score": row.score} for row in rows]
+        skipped = [partition.month for partition in partitions(session, query.since, query.until)]
+        return {"items": items, "next_cursor": next_cursor, "unsearched_months": skipped}
+
+    def get(self, tx_hash: str):
+        """Single transaction with its decompressed raw payload."""
+        with ReadSession() as session:
+            return self._get(session, tx_hash)
+
+    async def get_async(self, tx_hash: str):
+        return await run_read(self._get, tx_hash)
+
+    def _get(self, session, tx_hash: str):
+        row = session.execute(select(*LIST_COLUMNS).where(Transaction.hash == tx_hash)).first()
+        if row is not None:
+            item = serialize_row(row)
+            item["raw"] = load_raw(session, tx_hash)
+            return item
+        for partition in partitions(session):
+            with attached(session, partition) as options:
+                row = session.execute(
+                    select(*LIST_COLUMNS).where(Transaction.hash == tx_hash),
+                    execution_options=options,
+                ).first()
+                if row is not None:
+                    item = serialize_row(row)
+                    item["raw"] = load_raw(session, tx_hash, execution_options=options)
+                    return item
+        return None
+
+    def export(
+        self, query: TransactionQuery, fmt: str = "ndjson", compress: bool = False
+    ) -> Iterator[bytes]:
+        """Stream every matching row, newest first, ignoring ``query.limit``.
+
+        Rows come off a server-side cursor ``EXPORT_CHUNK_SIZE`` at a time and
+        are encoded (and gzipped) chunk by chunk, so memory use does not
+        depend on the size of the export. When the range reaches archived
+        months, the hot table and then each month in turn are read in keyset
+        pages of the same size and merged.
+        """
+        gzip = zlib.compressobj(wbits=16 + zlib.MAX_WBITS) if compress else None
+        with ReadSession() as session:
+            archived = archived_partitions(session, query)
+            if archived:
+                merged = merged_rows(session, query, archived, EXPORT_CHUNK_SIZE)
+                chunks = iter(lambda: list(islice(merged, EXPORT_CHUNK_SIZE)), [])
+            else:
+                stmt = ordered_select(query).execution_options(yield_per=EXPORT_CHUNK_SIZE)
+                chunks = session.execute(stmt).partitions()
+            first = True
+            for rows in chunks:
+                if fmt == "csv":
+                    chunk = encode_csv(rows, header=first)
+                else:
+                    chunk = encode_ndjson(rows)
+                first = False
+                if gzip:
+                    chunk = gzip.compress(chunk)
+                if chunk:
+                    yield chunk
+            if fmt == "csv" and first:
+                chunk = encode_csv([], header=True)
+                yield gzip.compress(chunk) if gzip else chunk
+        if gzip:
+            yield gzip.flush()
+
+    def inflow_outflow_24h(self):
+        since = datetime.utcnow() - timedelta(hours=24)
+        with ReadSession() as session:
+            inbound, outbound, _ = flow_between(session, since)
         return inbound, outbound
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import asyncio
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+
+from .models import StateVersion
+
+RULES = "rules"
+DATA = "data"  # transactions or alert events changed
+ACCOUNTS = "accounts"  # watched account list changed
+ROLLUPS_BUILT = "rollups_built"  # set once the flow rollups have been built
+BALANCES_BUILT = "balances_built"  # set once balances have been read from raw payloads
+
+# Bumped alongside the DB stamp so readers in the same process see a change
+# without waiting for their next poll of ``state_versions``.
+_local_versions: Dict[str, int] = defaultdict(int)
+# Coroutines blocked in wait_local; notify_local may run on a worker thread.
+_waiters: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = defaultdict(set)
+
+
+def get_version(session, name: str) -> int:
+    return session.scalar(
+        select(StateVersion.value).where(StateVersion.name == name)
+    ) or 0
+
+
+def bump_version(session, name: str):
+    """Increment the stamp in ``session``'s transaction.
+
+    Callers commit and then call :func:`notify_local` so in-process readers
+    never rebuild from the pre-commit state.
+    """
+    stmt = insert(StateVersion).values(name=name, value=1, updated_at=datetime.utcnow())
+    session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["name"],
+            set_={
+                "value": StateVersion.value + 1,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+    )
+
+
+def notify_local(name: str):
+    _local_versions[name] += 1
+    for loop, event in list(_waiters[name]):
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:  # loop already closed
+            _waiters[name].discard((loop, event))
+
+
+def local_version(name: str) -> int:
+    return _local_versions[name]
+
+
+async def wait_local(name: str, seen: int, timeout: float) -> int:
+    """Sleep up to ``timeout``, returning early once the local stamp passes ``seen``.
+
+    Pollers of ``state_versions`` use this in place of a plain sleep: changes
+    from another process still wait for the next poll, while changes made in
+    this one (collector running inside the API) are picked up at once.
+    """
+    if _local_versions[name] == seen:
+        entry = (asyncio.get_running_loop(), asyncio.Event())
+        _waiters[name].add(entry)
+        try:
+            await asyncio.wait_for(entry[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            _waiters[name].discard(entry)
+    return _local_versions[name]
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import structlog
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+
+from .db import SessionLocal
+from .balances import store_balances
+from .dedup import SeenHashes
+from .memos import store_memos
+from .metrics import BATCH_WRITE_SECONDS, DUPLICATES, INSERTED
+from .models import CursorState, Transaction
+from .raw_store import store_raw
+from .rollups import apply_rollups
+from .versions import DATA, bump_version, notify_local
+
+logger = structlog.get_logger(__name__)
+
+TRANSACTION_COLUMNS = frozenset(Transaction.__table__.columns.keys())
+# One cached statement executed with a parameter list; SQLAlchemy batches
+# it into multi-row VALUES under SQLite's bound-parameter limit, instead of
+# compiling a fresh statement per chunk.
+INSERT_TRANSACTIONS = (
+    insert(Transaction.__table__)
+    .on_conflict_do_nothing(index_elements=["hash"])
+    .returning(Transaction.__table__.c.hash)
+)
+
+
+def store_transactions(session, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Bulk insert-or-ignore on the hash key; returns only the rows that were new.
+
+    The compressed raw payloads, memo search index, rollup buckets, account
+    balances and the ``data`` version stamp for the new rows are written in the same
+    transaction.
+    """
+    if not rows:
+        return []
+    values = [
+        {key: value for key, value in row.items() if key in TRANSACTION_COLUMNS}
+        for row in rows
+    ]
+    inserted = set(session.scalars(INSERT_TRANSACTIONS, values).all())
+    new_rows = []
+    for row in rows:
+        if row["hash"] in inserted:
+            inserted.discard(row["hash"])
+            new_rows.append(row)
+    if new_rows:
+        store_raw(session, new_rows)
+        store_memos(session, new_rows)
+        apply_rollups(session, new_rows)
+        store_balances(session, new_rows)
+        bump_version(session, DATA)
+    return new_rows
+
+
+def advance_cursor(session, ledger_index: Optional[int]):
+    if ledger_index is None:
+        return
+    cursor = session.scalar(select(CursorState).limit(1))
+    if not cursor:
+        session.add(CursorState(last_ledger_index=ledger_index))
+        return
+    if (cursor.last_ledger_index or 0) < ledger_index:
+        cursor.last_ledger_index = ledger_index
+        cursor.updated_at = datetime.utcnow()
+
+
+def newest_hashes(session, limit: int) -> List[str]:
+    """Hashes of the ``limit`` most recent transactions, oldest first."""
+    hashes = session.scalars(
+        select(Transaction.hash)
+        .order_by(Transaction.timestamp.desc(), Transaction.hash.desc())
+        .limit(limit)
+    ).all()
+    return hashes[::-1]
+
+
+class BatchWriter:
+    """Group-commit stage between the stream and SQLite.
+
+    Normalized transactions are queued and written in batches of up to
+    ``batch_size`` rows, or whatever arrived within ``flush_interval`` seconds
+    of the first queued row, with one insert and one cursor update per batch.
+
+    While ``cursor_frozen`` is set (a backfill is filling a gap) batches are
+    still written but the cursor is left alone, so a crash mid-backfill
+    resumes from the start of the gap; :meth:`settle_cursor` catches it up.
+
+    With a ``dedup`` filter, hashes already queued or stored are dropped in
+    :meth:`put`, so replays from reconnects and overlapping backfills never
+    reach SQLite.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 100,
+        flush_interval: float = 0.25,
+        on_commit: Callable[[List[Dict[str, Any]]], Awaitable[None]] | None = None,
+        session_factory=SessionLocal,
+        dedup: Optional[SeenHashes] = None,
+        read_session_factory=None,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.0, flush_interval)
+        self.on_commit = on_commit
+        self.session_factory = session_factory
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=self.batch_size * 4)
+        self.cursor_frozen = False
+        self._pending_ledger: Optional[int] = None
+        self.dedup = dedup
+        self.read_session_factory = read_session_factory or session_factory
+        self.duplicates = 0
+
+    async def put(self, tx_data: Dict[str, Any]):
+        if self.dedup is not None:
+            tx_hash = tx_data["hash"]
+            seen = self.dedup.check(tx_hash)
+            if seen is None:
+                seen = await asyncio.to_thread(self._is_stored, tx_hash)
+            if seen:
+                self.duplicates += 1
+                DUPLICATES.inc(stage="writer")
+                return
+            self.dedup.add(tx_hash)
+        await self.queue.put(tx_data)
+
+    def _is_stored(self, tx_hash: str) -> bool:
+        with self.read_session_factory() as session:
+            return session.get(Transaction, tx_hash) is not None
+
+    def warm_dedup(self, limit: int):
+        """Reset the duplicate filter and seed it with the newest stored hashes."""
+        if self.dedup is None:
+            return
+        self.dedup.clear()
+        if limit > 0:
+            with self.read_session_factory() as session:
+                self.dedup.warm(newest_hashes(session, limit))
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            try:
+                deadline = loop.time() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    if not self.queue.empty():
+                        batch.append(self.queue.get_nowait())
+                        continue
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                await self.flush(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def settle_cursor(self):
+        """Wait for queued rows to be written, then unfreeze and advance the cursor."""
+        await self.queue.join()
+        self.cursor_frozen = False
+        ledger_index, self._pending_ledger = self._pending_ledger, None
+        if ledger_index is not None:
+            await asyncio.to_thread(self._write_cursor, ledger_index)
+
+    def release_cursor(self):
+        """Drop a hold left by an interrupted backfill, without advancing.
+
+        The stored cursor still points at the start of the unfinished gap,
+        so the next gap backfill redoes it from there.
+        """
+        self.cursor_frozen = False
+        self._pending_ledger = None
+
+    def _write_cursor(self, ledger_index: int):
+        with self.session_factory() as session:
+            advance_cursor(session, ledger_index)
+            session.commit()
+
+    async def flush(self, batch: List[Dict[str, Any]]):
+        with BATCH_WRITE_SECONDS.time():
+            inserted = await asyncio.to_thread(self.write_batch, batch)
+        INSERTED.inc(len(inserted))
+        logger.info(
+            "collector.persisted",
+            received=len(batch),
+            inserted=len(inserted),
+            duplicates_dropped=self.duplicates,
+        )
+        if inserted and self.on_commit:
+            await self.on_commit(inserted)
+
+    def write_batch(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        ledger_index = max(
+            (row["ledger_index"] for row in batch if row.get("ledger_index")),
+            default=None,
+        )
+        with self.session_factory() as session:
+            try:
+                inserted = store_transactions(session, batch)
+                if self.cursor_frozen:
+                    if ledger_index is not None:
+                        self._pending_ledger = max(self._pending_ledger or 0, ledger_index)
+                else:
+                    advance_cursor(session, ledger_index)
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+        if inserted:
+            notify_local(DATA)
+        return inserted
@@ -0,0 +1,4 @@
+"""Benchmark harness: a fake XRPL node, micro-benchmarks and throughput runs.
+
+Run ``python -m bench --help`` for the commands.
+"""
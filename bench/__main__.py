@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+from pathlib import Path
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def isolate_environment(port: int):
+    """Point the app at a scratch database and the fake node.
+
+    Must run before anything under ``app`` is imported: settings are read
+    at import time. Child processes (the startup probes) inherit it.
+    """
+    from .micro import ACCOUNTS
+
+    scratch = Path(tempfile.mkdtemp(prefix="xrp-monitor-bench-"))
+    os.environ.update(
+        {
+            "DB_PATH": str(scratch / "bench.db"),
+            "METRICS_SNAPSHOT_PATH": str(scratch / "collector_metrics.json"),
+            "XRPL_WS_URL": f"ws://127.0.0.1:{port}",
+            "XRPL_WS_URLS": "",
+            "XRPL_ACCOUNT_ADDRESSES": ",".join(ACCOUNTS),
+            "ALERT_MIN_XRP": "1000000000",
+            "WEBHOOK_URL": "",
+            "SMTP_HOST": "",
+            "ENABLE_DESKTOP_NOTIFICATIONS": "false",
+        }
+    )
+    return scratch
+
+
+def run(args) -> int:
+    port = free_port()
+    isolate_environment(port)
+
+    import logging
+
+    import structlog
+
+    # Per-batch log lines would dominate the timings.
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+
+    from app.db import init_db
+
+    from .e2e import bench_throughput
+    from .micro import BENCHMARKS
+    from .report import build_report, compare, load_report, save_report
+    from .startup import bench_startup
+
+    init_db()
+    # Startup first, while the scratch database is still small.
+    selected = args.only or ["startup", *BENCHMARKS, "throughput"]
+    rates = [float(rate) for rate in args.rates.split(",")]
+    results = {}
+    for name in selected:
+        print(f"running {name} ...", file=sys.stderr)
+        if name == "throughput":
+            results[name] = bench_throughput(port, rates, duration=args.duration)
+        elif name == "startup":
+            results[name] = bench_startup()
+        else:
+            results[name] = BENCHMARKS[name]()
+    report = build_report(results, {"rates": rates, "duration": args.duration})
+    path = save_report(report, args.output)
+    print(f"report written to {path}", file=sys.stderr)
+    if args.compare:
+        print(compare(load_report(args.compare), report))
+    else:
+        print(compare({"results": {}}, report))
+    return 0
+
+
+def compare_reports(args) -> int:
+    from .report import compare, load_report
+
+    print(compare(load_report(args.base), load_report(args.current)))
+    return 0
+
+
+def serve(args) -> int:
+    from .fake_node import FakeXRPLNode, load_recording, synthetic_transactions
+
+    accounts = args.accounts.split(",")
+    if args.replay:
+        source = load_recording(args.replay)
+    else:
+        source = synthetic_transactions(accounts, count=args.count)
+
+    async def main():
+        node = FakeXRPLNode(source, rate=args.rate, port=args.port)
+        async with node:
+            print(f"fake XRPL node listening on {node.url}", file=sys.stderr)
+            await node.finished.wait()
+            await asyncio.Event().wait()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def record(args) -> int:
+    from .fake_node import record as capture
+
+    asyncio.run(capture(args.url, args.accounts.split(","), args.count, args.out))
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="run benchmarks and write a JSON report")
+    p_run.add_argument(
+        "--only",
+        action="append",
+        choices=[
+            "startup", "normalize_transaction", "alert_evaluate", "dashboard_build", "throughput"
+        ],
+    )
+    p_run.add_argument("--rates", default="250,500,1000,2000", help="events/s for throughput steps")
+    p_run.add_argument("--duration", type=float, default=5.0, help="seconds per throughput step")
+    p_run.add_argument("--output", type=Path)
+    p_run.add_argument("--compare", type=Path, help="earlier report to diff against")
+    p_run.set_defaults(func=run)
+
+    p_compare = sub.add_parser("compare", help="diff two reports")
+    p_compare.add_argument("base", type=Path)
+    p_compare.add_argument("current", type=Path)
+    p_compare.set_defaults(func=compare_reports)
+
+    p_serve = sub.add_parser("serve", help="run the fake node standalone")
+    p_serve.add_argument("--port", type=int, default=6006)
+    p_serve.add_argument("--rate", type=float, default=100.0)
+    p_serve.add_argument("--count", type=int)
+    p_serve.add_argument("--accounts", default="rBenchWatchedAAAAAAAAAAAAAAAAAA")
+    p_serve.add_argument("--replay", type=Path, help="NDJSON recording to stream instead")
+    p_serve.set_defaults(func=serve)
+
+    p_record = sub.add_parser("record", help="capture live transactions from a real node")
+    p_record.add_argument("--url", default="wss://s1.ripple.com/")
+    p_record.add_argument("--accounts", required=True)
+    p_record.add_argument("--count", type=int, default=1000)
+    p_record.add_argument("--out", type=Path, required=True)
+    p_record.set_defaults(func=record)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
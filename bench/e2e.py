@@ -0,0 +1,92 @@
+"""End-to-end collector throughput against the fake node.
+
+For each target rate the fake node streams ``rate * duration`` synthetic
+payments to a fresh :class:`CollectorService`, and the run records how fast
+rows were actually committed, how long the writer needed to drain after
+the node stopped, and the worst ingest lag seen along the way.
+
+The clock starts at the first committed row, so imports, database setup,
+connecting and subscribing do not count against the rate, and the flush
+delay of the first batch offsets that of the last. A short warm-up step
+runs first and is discarded.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Dict, List
+
+from .fake_node import FakeXRPLNode, synthetic_transactions
+from .micro import ACCOUNTS
+
+
+async def run_rate(port: int, rate: float, duration: float, seed: int, timeout: float = 60.0):
+    from app.collector import CollectorService
+    from app.metrics import INGEST_LAG, INSERTED
+
+    count = int(rate * duration)
+    node = FakeXRPLNode(
+        synthetic_transactions(ACCOUNTS, count=count, seed=seed), rate=rate, port=port
+    )
+    async with node:
+        service = CollectorService()
+        inserted_before = INSERTED.value()
+        task = asyncio.create_task(service.run())
+        max_lag = 0.0
+        try:
+            subscribed = asyncio.create_task(node.subscribed.wait())
+            await asyncio.wait(
+                {task, subscribed}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            subscribed.cancel()
+            if task.done():
+                task.result()
+            if not node.subscribed.is_set():
+                raise TimeoutError(f"collector did not subscribe within {timeout}s")
+            started = None
+            deadline = time.perf_counter() + duration + timeout
+            while INSERTED.value() - inserted_before < count and time.perf_counter() < deadline:
+                await asyncio.sleep(0.01)
+                if started is None and INSERTED.value() > inserted_before:
+                    started = time.perf_counter()
+                max_lag = max(max_lag, INGEST_LAG.value() or 0.0)
+                if task.done():
+                    task.result()
+            finished = time.perf_counter()
+            produced_at = node.finished_at
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    inserted = INSERTED.value() - inserted_before
+    elapsed = finished - (started or finished)
+    return {
+        "target_rate": rate,
+        "events": count,
+        "inserted": inserted,
+        "achieved_rate": inserted / elapsed if elapsed else 0.0,
+        "drain_s": finished - (produced_at or finished),
+        "max_ingest_lag_s": max_lag,
+        "complete": inserted >= count,
+    }
+
+
+def bench_throughput(
+    port: int, rates: List[float], duration: float = 5.0, warmup: float = 1.0
+) -> Dict[str, Any]:
+    if warmup > 0:
+        asyncio.run(run_rate(port, min(rates), warmup, seed=999))
+    steps = [
+        asyncio.run(run_rate(port, rate, duration, seed=1000 + i))
+        for i, rate in enumerate(rates)
+    ]
+    sustained = [
+        step["target_rate"]
+        for step in steps
+        if step["complete"] and step["achieved_rate"] >= 0.95 * step["target_rate"]
+    ]
+    result: Dict[str, Any] = {"max_sustained_rate": max(sustained, default=0.0)}
+    for step in steps:
+        prefix = f"rate_{int(step['target_rate'])}"
+        for key in ("achieved_rate", "drain_s", "max_ingest_lag_s"):
+            result[f"{prefix}.{key}"] = step[key]
+    return result
@@ -0,0 +1,247 @@
+"""A local websocket server that speaks enough of the rippled API for the collector.
+
+Supported commands: ``subscribe`` / ``unsubscribe`` (``accounts`` and the
+``ledger`` stream) and paged ``account_tx``. Transactions come from a
+synthetic generator or a recorded NDJSON file of stream messages and are
+pushed to every connection subscribed to their sender or destination at
+``rate`` messages per second, starting once the first account subscription
+arrives, with a ``ledgerClosed`` message every second.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import random
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import websockets
+
+RIPPLE_EPOCH = 946684800
+DROPS_PER_XRP = 1_000_000
+
+
+def synthetic_transactions(
+    accounts: List[str],
+    peers: Optional[List[str]] = None,
+    count: Optional[int] = None,
+    seed: int = 0,
+    memo_rate: float = 0.2,
+    ledger_start: int = 80_000_000,
+    per_ledger: int = 20,
+) -> Iterator[Dict[str, Any]]:
+    """Payments between watched ``accounts`` and ``peers`` in stream format."""
+    rng = random.Random(seed)
+    peers = peers or [f"rPeer{i:04d}xxxxxxxxxxxxxxxxxx" for i in range(50)]
+    words = ["invoice", "rent", "refund", "payroll", "gift", "exchange", "deposit"]
+    balances = {account: 10_000 * DROPS_PER_XRP for account in [*accounts, *peers]}
+    i = 0
+    while count is None or i < count:
+        watched = rng.choice(accounts)
+        peer = rng.choice(peers)
+        sender, receiver = (watched, peer) if rng.random() < 0.5 else (peer, watched)
+        drops = str(rng.randint(1, 500 * DROPS_PER_XRP))
+        tx: Dict[str, Any] = {
+            "TransactionType": "Payment",
+            "Account": sender,
+            "Destination": receiver,
+            "Amount": drops,
+            "Fee": "12",
+            "Sequence": i + 1,
+            "hash": hashlib.sha256(f"{seed}:{i}".encode()).hexdigest().upper(),
+        }
+        if rng.random() < memo_rate:
+            memo = f"{rng.choice(words)} #{rng.randint(1, 9999)}"
+            tx["Memos"] = [{"Memo": {"MemoData": memo.encode().hex().upper()}}]
+        ledger_index = ledger_start + i // per_ledger
+        tx["ledger_index"] = ledger_index
+        balances[sender] -= int(drops) + 12
+        balances[receiver] += int(drops)
+        affected = [
+            {
+                "ModifiedNode": {
+                    "LedgerEntryType": "AccountRoot",
+                    "FinalFields": {"Account": account, "Balance": str(balances[account])},
+                }
+            }
+            for account in (sender, receiver)
+        ]
+        yield {
+            "type": "transaction",
+            "engine_result": "tesSUCCESS",
+            "validated": True,
+            "ledger_index": ledger_index,
+            "transaction": tx,
+            "meta": {
+                "TransactionResult": "tesSUCCESS",
+                "TransactionIndex": i % per_ledger,
+                "delivered_amount": drops,
+                "AffectedNodes": affected,
+            },
+        }
+        i += 1
+
+
+def load_recording(path: Path) -> List[Dict[str, Any]]:
+    """Stream messages captured with ``python -m bench record``."""
+    with open(path) as handle:
+        messages = [json.loads(line) for line in handle if line.strip()]
+    return [m for m in messages if m.get("type") == "transaction"]
+
+
+def _participants(message: Dict[str, Any]) -> set:
+    tx = message.get("transaction") or {}
+    return {tx.get("Account"), tx.get("Destination")}
+
+
+class FakeXRPLNode:
+    def __init__(
+        self,
+        source: Iterable[Dict[str, Any]] = (),
+        rate: float = 100.0,
+        history: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        restamp: bool = True,
+    ):
+        self.source = iter(source)
+        self.rate = rate
+        # account -> account_tx items ({"tx", "meta", "validated"}), oldest first
+        self.history = history or {}
+        self.host = host
+        self.port = port
+        # Stamp each message with the send time so ingest lag is meaningful.
+        self.restamp = restamp
+        self.subscriptions: Dict[Any, set] = {}
+        self.ledger_index = 80_000_000
+        self.sent = 0
+        self.subscribed = asyncio.Event()
+        self.finished = asyncio.Event()
+        self.finished_at: Optional[float] = None
+        self._server = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = await websockets.serve(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._tasks = [
+            asyncio.create_task(self._produce()),
+            asyncio.create_task(self._close_ledgers()),
+        ]
+        return self
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def _handle(self, websocket, path=None):
+        self.subscriptions[websocket] = set()
+        try:
+            async for raw in websocket:
+                request = json.loads(raw)
+                await websocket.send(json.dumps(self.respond(websocket, request)))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self.subscriptions.pop(websocket, None)
+
+    def respond(self, websocket, request: Dict[str, Any]) -> Dict[str, Any]:
+        command = request.get("command")
+        base = {"id": request.get("id"), "type": "response"}
+        if command == "subscribe":
+            self.subscriptions[websocket].update(request.get("accounts") or [])
+            if request.get("accounts"):
+                self.subscribed.set()
+            if "ledger" in (request.get("streams") or []):
+                self.subscriptions[websocket].add(("stream", "ledger"))
+            return {**base, "status": "success", "result": {"ledger_index": self.ledger_index}}
+        if command == "unsubscribe":
+            self.subscriptions[websocket].difference_update(request.get("accounts") or [])
+            return {**base, "status": "success", "result": {}}
+        if command == "account_tx":
+            return {**base, "status": "success", "result": self._account_tx(request)}
+        return {**base, "status": "error", "error": "unknownCmd", "request": request}
+
+    def _account_tx(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        account = request.get("account")
+        floor = request.get("ledger_index_min", -1)
+        items = [
+            item
+            for item in self.history.get(account, [])
+            if floor in (None, -1) or item["tx"].get("ledger_index", 0) >= floor
+        ]
+        offset = int(request.get("marker") or 0)
+        limit = request.get("limit") or 200
+        page = items[offset : offset + limit]
+        result: Dict[str, Any] = {"account": account, "transactions": page, "limit": limit}
+        if offset + limit < len(items):
+            result["marker"] = str(offset + limit)
+        return result
+
+    async def _broadcast(self, message: Dict[str, Any], keys: set):
+        payload = None
+        for websocket, subscribed in list(self.subscriptions.items()):
+            if subscribed & keys:
+                payload = payload or json.dumps(message)
+                try:
+                    await websocket.send(payload)
+                except websockets.ConnectionClosed:
+                    pass
+
+    async def _produce(self):
+        # Nothing is buffered for late subscribers, so wait for the first one.
+        await self.subscribed.wait()
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        for message in self.source:
+            due = started + self.sent / self.rate
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self.restamp:
+                message["transaction"]["date"] = int(time.time()) - RIPPLE_EPOCH
+            await self._broadcast(message, _participants(message))
+            self.sent += 1
+        self.finished_at = time.perf_counter()
+        self.finished.set()
+
+    async def _close_ledgers(self):
+        while True:
+            await asyncio.sleep(1)
+            self.ledger_index += 1
+            await self._broadcast(
+                {
+                    "type": "ledgerClosed",
+                    "ledger_index": self.ledger_index,
+                    "ledger_time": int(time.time()) - RIPPLE_EPOCH,
+                },
+                {("stream", "ledger")},
+            )
+
+
+async def record(url: str, accounts: List[str], count: int, out: Path):
+    """Capture ``count`` live transaction messages from a real node as NDJSON."""
+    async with websockets.connect(url) as websocket:
+        await websocket.send(json.dumps({"id": 1, "command": "subscribe", "accounts": accounts}))
+        captured = 0
+        with open(out, "w") as handle:
+            while captured < count:
+                message = json.loads(await websocket.recv())
+                if message.get("type") == "transaction":
+                    handle.write(json.dumps(message) + "\n")
+                    captured += 1
@@ -0,0 +1,139 @@
+"""Micro-benchmarks for the collector and API hot paths.
+
+Each benchmark returns a flat dict of numbers so reports from different
+commits can be compared key by key.
+"""
+from __future__ import annotations
+
+import asyncio
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+
+from .fake_node import synthetic_transactions
+
+ACCOUNTS = ["rBenchWatchedAAAAAAAAAAAAAAAAAA", "rBenchWatchedBBBBBBBBBBBBBBBBBB"]
+
+
+def timeit(fn: Callable[[], Any], repeat: int = 5) -> Dict[str, float]:
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    return {"best_s": min(runs), "median_s": statistics.median(runs)}
+
+
+def per_op(result: Dict[str, float], ops: int) -> Dict[str, float]:
+    return {
+        **result,
+        "ops": ops,
+        "us_per_op": result["median_s"] / ops * 1e6,
+        "ops_per_s": ops / result["median_s"],
+    }
+
+
+def bench_normalize(count: int = 20_000) -> Dict[str, float]:
+    from app.xrpl_client import normalize_transaction
+
+    events = list(synthetic_transactions(ACCOUNTS, count=count, seed=1))
+    for event in events:
+        event["transaction"]["date"] = 750_000_000
+    watched = set(ACCOUNTS)
+
+    def run():
+        for event in events:
+            normalize_transaction(event, watched)
+
+    return per_op(timeit(run), count)
+
+
+def seed_rules(count: int):
+    from app.db import SessionLocal
+    from app.models import AlertRule
+
+    words = ["invoice", "rent", "refund", "payroll", "gift", "exchange", "deposit"]
+    with SessionLocal() as session:
+        for i in range(count):
+            session.add(
+                AlertRule(
+                    name=f"bench-{i}",
+                    # High thresholds: rules are matched but rarely fire, so the
+                    # benchmark measures matching rather than alert writes.
+                    min_amount_xrp=400 + (i % 1000),
+                    direction=["inbound", "outbound", None][i % 3],
+                    counterparty=f"rPeer{i % 50:04d}xxxxxxxxxxxxxxxxxx" if i % 4 == 0 else None,
+                    memo_keyword=words[i % len(words)] if i % 5 == 0 else None,
+                )
+            )
+        session.commit()
+
+
+def bench_alert_evaluate(rules: int = 2_000, count: int = 5_000) -> Dict[str, float]:
+    from app.alerts import AlertEngine
+    from app.xrpl_client import normalize_transaction
+
+    seed_rules(rules)
+    rows = [
+        normalize_transaction(event, set(ACCOUNTS))
+        for event in synthetic_transactions(ACCOUNTS, count=count, seed=2)
+    ]
+    for row in rows:
+        row["amount_xrp"] = min(row["amount_xrp"], 399.0)
+
+    async def run_all():
+        engine = AlertEngine()
+        engine.settings = engine.settings.model_copy(update={"alert_min_xrp": 1e12})
+        engine.rules()
+        start = time.perf_counter()
+        for row in rows:
+            await engine.evaluate(row)
+        elapsed = time.perf_counter() - start
+        await engine.flush()
+        engine.delivery.close()
+        return elapsed
+
+    runs = [asyncio.run(run_all()) for _ in range(3)]
+    return {**per_op({"best_s": min(runs), "median_s": statistics.median(runs)}, count), "rules": rules}
+
+
+def seed_transactions(count: int, chunk: int = 5_000):
+    from app.db import SessionLocal
+    from app.writer import store_transactions
+    from app.xrpl_client import normalize_transaction
+
+    events = synthetic_transactions(ACCOUNTS, count=count, seed=3)
+    now = int(time.time()) - 946684800
+    batch: List[Dict[str, Any]] = []
+    for i, event in enumerate(events):
+        # Spread over the last 90 days so every rollup resolution is used.
+        event["transaction"]["date"] = now - (count - i) * (90 * 86400 // count)
+        batch.append(normalize_transaction(event, set(ACCOUNTS)))
+        if len(batch) == chunk:
+            with SessionLocal() as session:
+                store_transactions(session, batch)
+                session.commit()
+            batch = []
+    if batch:
+        with SessionLocal() as session:
+            store_transactions(session, batch)
+            session.commit()
+
+
+def bench_dashboard_build(rows: int = 100_000) -> Dict[str, float]:
+    from app.services.dashboard_service import DashboardService
+
+    seed_start = time.perf_counter()
+    seed_transactions(rows)
+    seeded = time.perf_counter() - seed_start
+    service = DashboardService()
+    service.build()
+    result = timeit(service.build, repeat=20)
+    return {**result, "rows": rows, "seed_rows_per_s": rows / seeded}
+
+
+BENCHMARKS = {
+    "normalize_transaction": bench_normalize,
+    "alert_evaluate": bench_alert_evaluate,
+    "dashboard_build": bench_dashboard_build,
+}
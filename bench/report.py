@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import json
+import os
+import platform
+import subprocess
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def git_revision() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(
+            subprocess.run(
+                ["git", "status", "--porcelain", "--untracked-files=no"],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit, "dirty": dirty}
+
+
+def build_report(results: Dict[str, Dict[str, Any]], params: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        **git_revision(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "params": params,
+        "results": results,
+    }
+
+
+def save_report(report: Dict[str, Any], path: Optional[Path] = None) -> Path:
+    if path is None:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        commit = (report.get("commit") or "nocommit")[:10]
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = RESULTS_DIR / f"{stamp}-{commit}.json"
+    path.write_text(json.dumps(report, indent=2, sort_keys=True))
+    return path
+
+
+def load_report(path: Path) -> Dict[str, Any]:
+    return json.loads(Path(path).read_text())
+
+
+def compare(base: Dict[str, Any], current: Dict[str, Any]) -> str:
+    """Side-by-side table of every numeric metric the two reports share."""
+    lines = [
+        f"base    {base.get('commit') or '?'}  {base.get('created_at')}",
+        f"current {current.get('commit') or '?'}  {current.get('created_at')}",
+        "",
+        f"{'benchmark':<24} {'metric':<32} {'base':>14} {'current':>14} {'change':>9}",
+    ]
+    for name, metrics in current["results"].items():
+        before = base.get("results", {}).get(name, {})
+        for key, value in metrics.items():
+            old = before.get(key)
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                continue
+            if not isinstance(old, (int, float)) or isinstance(old, bool):
+                change = "new"
+                old_text = "-"
+            else:
+                change = f"{(value - old) / old * 100:+.1f}%" if old else "n/a"
+                old_text = f"{old:.6g}"
+            lines.append(f"{name:<24} {key:<32} {old_text:>14} {value:>14.6g} {change:>9}")
+    return "\n".join(lines)
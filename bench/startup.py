@@ -0,0 +1,84 @@
+"""Cold-start benchmark: import time and first-request latency.
+
+Every sample is a fresh interpreter (``python -m bench.startup api`` or
+``collector``) so nothing is warm in ``sys.modules``. The child inherits
+the scratch environment set up by ``python -m bench`` and prints one JSON
+line of timings.
+"""
+from __future__ import annotations
+
+import json
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+# Modules the API and collector must not load until a feature needs them.
+DEFERRED = ("xrpl", "plyer", "requests", "smtplib", "apscheduler", "aiosqlite")
+
+
+def deferred_loaded() -> int:
+    return sum(name in sys.modules for name in DEFERRED)
+
+
+def probe_collector() -> Dict[str, float]:
+    start = time.perf_counter()
+    from app.collector import CollectorService  # noqa: F401
+
+    return {"import_s": time.perf_counter() - start, "deferred_modules": deferred_loaded()}
+
+
+def probe_api() -> Dict[str, float]:
+    start = time.perf_counter()
+    from app.mcp_server import app
+
+    imported = time.perf_counter() - start
+    deferred = deferred_loaded()
+    from fastapi.testclient import TestClient
+
+    from app.config import get_settings
+
+    client = TestClient(app, headers={"x-api-key": get_settings().api_key})
+    start = time.perf_counter()
+    with client:
+        started = time.perf_counter() - start
+        start = time.perf_counter()
+        client.get("/dashboard").raise_for_status()
+        first = time.perf_counter() - start
+        start = time.perf_counter()
+        client.get("/dashboard").raise_for_status()
+        second = time.perf_counter() - start
+    return {
+        "import_s": imported,
+        "deferred_modules": deferred,
+        "lifespan_s": started,
+        "first_request_s": first,
+        "second_request_s": second,
+    }
+
+
+PROBES = {"api": probe_api, "collector": probe_collector}
+
+
+def sample(target: str) -> Dict[str, float]:
+    output = subprocess.run(
+        [sys.executable, "-m", "bench.startup", target],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def bench_startup(repeat: int = 5) -> Dict[str, float]:
+    result: Dict[str, float] = {}
+    for target in PROBES:
+        runs: List[Dict[str, float]] = [sample(target) for _ in range(repeat)]
+        for key in runs[0]:
+            result[f"{target}_{key}"] = statistics.median(run[key] for run in runs)
+    return result
+
+
+if __name__ == "__main__":
+    print(json.dumps(PROBES[sys.argv[1]]()))
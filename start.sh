@@ -3,6 +3,13 @@ set -euo pipefail
 
 mkdir -p /app/data
 
+# Single-process mode: the API runs the collector on its own event loop.
+case "${RUN_COLLECTOR_IN_API:-false}" in
+  1|true|True|TRUE|yes|on)
+    exec uvicorn app.mcp_server:app --host 0.0.0.0 --port 8000
+    ;;
+esac
+
 python -m app.collector &
 COLLECTOR_PID=$!
 
@@ -0,0 +1,29 @@
+import os
+import tempfile
+
+import pytest
+
+# The app reads its settings on import; point them at a scratch DB.
+os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="xrp-monitor-tests-"), "test.db")
+os.environ["API_KEY"] = ""
+
+
+@pytest.fixture
+def session_factory():
+    """A sessionmaker on a private in-memory database with the full schema.
+
+    StaticPool keeps the one connection alive, so every session (and the
+    worker threads ``asyncio.to_thread`` hands them to) sees the same data.
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from app.models import Base
+
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
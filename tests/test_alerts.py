@@ -0,0 +1,88 @@
+import asyncio
+import threading
+
+from sqlalchemy import select
+
+from app import alerts
+from app.alerts import AlertEngine
+from app.db import SessionLocal, init_db
+from app.models import AlertEvent, AlertRule
+from app.versions import RULES, bump_version, notify_local
+
+BURSTY = "rCoalesceBurstyAAAAAAAAAAAAAAAA"
+NOISY = "rCoalesceNoisyAAAAAAAAAAAAAAAAA"
+
+
+def tx(i, counterparty):
+    return {
+        "hash": f"COALESCE{i}",
+        "amount_xrp": 1.0,
+        "direction": "inbound",
+        "counterparty": counterparty,
+        "memo": None,
+    }
+
+
+def test_bursts_coalesce_into_a_digest_and_rules_throttle():
+    init_db()
+    with SessionLocal() as session:
+        session.add(AlertRule(name="bursty", counterparty=BURSTY))
+        session.add(AlertRule(name="noisy", counterparty=NOISY, min_interval_seconds=3600))
+        bump_version(session, RULES)
+        session.commit()
+    notify_local(RULES)
+
+    async def scenario():
+        engine = AlertEngine()
+        engine.settings = engine.settings.model_copy(
+            update={"alert_min_xrp": 1e12, "alert_coalesce_seconds": 0.05}
+        )
+        for i in range(6):
+            await engine.evaluate(tx(i, BURSTY))
+        await asyncio.sleep(0.15)
+        # Quiet again: the noisy rule fires once, then is throttled for an hour.
+        for i in range(10, 14):
+            await engine.evaluate(tx(i, NOISY))
+        assert engine.suppressed == 3
+        await engine.evaluate(tx(20, BURSTY))
+        await engine.flush()
+        engine.delivery.close()
+
+    asyncio.run(scenario())
+    with SessionLocal() as session:
+        events = session.scalars(
+            select(AlertEvent)
+            .where(AlertEvent.transaction_hash.like("COALESCE%"))
+            .order_by(AlertEvent.id)
+        ).all()
+    assert [(e.transaction_hash, e.alert_count, e.suppressed_count) for e in events] == [
+        ("COALESCE0", 1, 0),
+        ("COALESCE1", 5, 0),
+        ("COALESCE10", 1, 0),
+        ("COALESCE20", 1, 3),
+    ]
+    assert events[1].message.startswith("5 XRP alerts")
+    assert events[3].message.endswith("(+3 throttled)")
+
+
+def test_rule_refresh_runs_off_the_event_loop(monkeypatch):
+    init_db()
+    threads = []
+
+    def recording_session():
+        threads.append(threading.current_thread())
+        return SessionLocal()
+
+    monkeypatch.setattr(alerts, "ReadSession", recording_session)
+
+    async def scenario():
+        engine = AlertEngine()
+        engine.settings = engine.settings.model_copy(update={"alert_min_xrp": 1e12})
+        await engine.evaluate(tx(30, NOISY))
+        notify_local(RULES)
+        await engine.evaluate(tx(31, NOISY))
+        engine.delivery.close()
+
+    asyncio.run(scenario())
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
@@ -0,0 +1,275 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.config import get_settings
+from app.db import SessionLocal, get_async_read_engine, run_read
+from app.mcp_server import app
+from app.models import AlertEvent
+from app.versions import DATA, bump_version
+from app.writer import store_transactions
+
+FILTERS = {"direction": "inbound", "min_amount_xrp": 5, "ledger_max": 1029}
+
+
+def seed_transactions():
+    start = datetime(2023, 6, 1)
+    rows = [
+        {
+            "hash": f"PAGE{i:03d}",
+            "ledger_index": 1000 + i,
+            "account": "rPeer" if i % 2 else "rWatched",
+            "destination": "rWatched" if i % 2 else "rPeer",
+            "counterparty": "rPeer",
+            "amount_xrp": float(i),
+            "direction": "inbound" if i % 2 else "outbound",
+            "memo": None,
+            # Pairs share a timestamp so the hash tiebreak is exercised.
+            "timestamp": start + timedelta(minutes=i // 2),
+        }
+        for i in range(30)
+    ]
+    with SessionLocal() as session:
+        store_transactions(session, rows)
+        session.commit()
+    return sorted(
+        (row for row in rows if row["direction"] == "inbound" and row["amount_xrp"] >= 5),
+        key=lambda row: (row["timestamp"], row["hash"]),
+        reverse=True,
+    )
+
+
+def test_dashboard_etag_round_trip():
+    with TestClient(app) as client:
+        first = client.get("/dashboard")
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+
+        cached = client.get("/dashboard", headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+
+        with SessionLocal() as session:
+            session.add(AlertEvent(message="big payment"))
+            bump_version(session, DATA)
+            session.commit()
+
+        changed = client.get("/dashboard", headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+        assert changed.json()["alerts"][0]["message"] == "big payment"
+
+
+def test_transactions_keyset_pages_with_filters():
+    expected = seed_transactions()
+    seen = []
+    params = {**FILTERS, "limit": 4}
+    with TestClient(app) as client:
+        while True:
+            body = client.get("/transactions", params=params).json()
+            seen.extend(item["hash"] for item in body["items"])
+            if not body["next_cursor"]:
+                break
+            params["cursor"] = body["next_cursor"]
+        assert client.get("/transactions", params={"cursor": "nope"}).status_code == 400
+
+    assert seen == [row["hash"] for row in expected]
+
+
+def test_transaction_bounds_with_a_utc_offset_match_naive_utc():
+    params = {**FILTERS, "limit": 3, "until": "2023-06-01T00:12:00"}
+    with TestClient(app) as client:
+        seed_transactions()
+        naive = client.get("/transactions", params={**params, "since": "2023-06-01T00:05:00"})
+        aware = client.get("/transactions", params={**params, "since": "2023-06-01T00:05:00Z"})
+        offset = client.get(
+            "/transactions",
+            params={
+                **params,
+                "since": "2023-06-01T01:05:00+01:00",
+                "until": "2023-06-01T01:12:00+01:00",
+            },
+        )
+    assert naive.status_code == aware.status_code == offset.status_code == 200
+    assert naive.json()["items"] and aware.json() == naive.json() == offset.json()
+
+
+def test_transaction_account_filter_matches_sender_or_destination():
+    params = {"account": "rWatched", "since": "2023-06-01", "until": "2023-06-02", "limit": 500}
+    with TestClient(app) as client:
+        seed_transactions()
+        body = client.get("/transactions", params=params).json()
+    hashes = {item["hash"] for item in body["items"] if item["hash"].startswith("PAGE")}
+    assert hashes == {f"PAGE{i:03d}" for i in range(30)}
+
+
+def test_export_streams_filtered_rows_as_ndjson_and_csv():
+    expected = [row["hash"] for row in seed_transactions()]
+    with TestClient(app) as client:
+        response = client.get(
+            "/transactions/export", params=FILTERS, headers={"Accept-Encoding": "gzip"}
+        )
+        assert response.headers["content-encoding"] == "gzip"
+        ndjson = [json.loads(line) for line in response.text.splitlines()]
+
+        csv_lines = client.get(
+            "/transactions/export", params={**FILTERS, "format": "csv"}
+        ).text.splitlines()
+
+    assert [row["hash"] for row in ndjson] == expected
+    assert csv_lines[0].startswith("hash,ledger_index,timestamp")
+    assert len(csv_lines) == len(expected) + 1
+
+
+def test_transaction_detail_loads_raw_payload():
+    raw = {"transaction": {"hash": "DETAIL1"}, "meta": {"TransactionResult": "tesSUCCESS"}}
+    with SessionLocal() as session:
+        store_transactions(
+            session,
+            [
+                {
+                    "hash": "DETAIL1",
+                    "ledger_index": 5,
+                    "account": "rPeer",
+                    "destination": "rWatched",
+                    "counterparty": "rPeer",
+                    "amount_xrp": 1.0,
+                    "direction": "inbound",
+                    "memo": None,
+                    "timestamp": datetime(2023, 1, 1),
+                    "raw": raw,
+                }
+            ],
+        )
+        session.commit()
+    with TestClient(app) as client:
+        assert client.get("/transactions/DETAIL1").json()["raw"] == raw
+        assert client.get("/transactions/MISSING").status_code == 404
+
+
+def test_watched_accounts_add_list_remove():
+    address = "rHb9CJAWyB4rj91VRWn96DkukG4bwdtyTh"
+    with TestClient(app) as client:
+        assert client.post("/accounts", json={"address": "not-an-address"}).status_code == 422
+        created = client.post("/accounts", json={"address": address})
+        assert created.status_code == 201
+        assert created.json()["history_complete"] is False
+        assert client.post("/accounts", json={"address": address}).status_code == 409
+        listed = [item["address"] for item in client.get("/accounts").json()["items"]]
+        assert address in listed
+        assert client.delete(f"/accounts/{address}").status_code == 200
+        assert client.delete(f"/accounts/{address}").status_code == 404
+
+
+def test_metrics_merge_collector_snapshot():
+    from app.config import get_settings
+    from app.metrics import Registry, write_snapshot
+
+    collector = Registry()
+    collector.counter("xrpl_events", "Transaction messages received.").inc(3)
+    write_snapshot(get_settings().collector_metrics_path, registry=collector)
+    with TestClient(app) as client:
+        client.get("/dashboard")
+        body = client.get("/metrics").text
+    assert 'xrpl_events_total{process="collector"} 3' in body
+    assert 'http_request_seconds_count{process="api",method="GET",route="/dashboard",status="200"}' in body
+    assert body.count("# TYPE xrpl_events counter") == 1
+    assert 'db_query_seconds_bucket{process="api",engine="read",statement="select"' in body
+
+
+def test_chart_series_endpoint():
+    with TestClient(app) as client:
+        seed_transactions()
+        response = client.get(
+            "/charts/inflow",
+            params={"start": "2023-06-01T00:00:00", "end": "2023-06-01T02:00:00", "points": 50},
+        )
+        assert response.status_code == 200
+        body = response.json()
+        assert body["resolution"] == "minute" and len(body["points"]) <= 50
+        aware = client.get(
+            "/charts/inflow",
+            params={"start": "2023-06-01T00:00:00Z", "end": "2023-06-01T02:00:00Z", "points": 50},
+        )
+        assert aware.json()["points"] == body["points"]
+        assert sum(point["value"] for point in body["points"]) > 0
+        open_ended = client.get("/charts/inflow", params={"start": "2023-06-01T00:00:00Z"})
+        assert open_ended.status_code == 200
+        assert client.get("/charts/nope").status_code == 404
+        assert client.get("/charts/inflow", params={"points": 1}).status_code == 422
+        assert client.get(
+            "/charts/inflow", params={"start": "2024-01-02T00:00:00", "end": "2024-01-01T00:00:00"}
+        ).status_code == 400
+
+
+def test_async_reads_are_bounded_by_the_slots():
+    active = peak = 0
+
+    def probe(session):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        # Yields to the loop while aiosqlite runs it, so other reads can start.
+        session.execute(text("SELECT 1")).scalar()
+        active -= 1
+
+    async def burst():
+        await asyncio.gather(*(run_read(probe) for _ in range(40)))
+
+    asyncio.run(burst())
+    assert 1 < peak <= get_settings().db_async_concurrency
+
+    # Connections stay open for the next burst, at most one per slot.
+    assert 0 < get_async_read_engine().pool.checkedin() <= get_settings().db_async_concurrency
+
+
+def test_memo_search_ranks_and_pages():
+    memos = {
+        "MEMO0": ["rent march"],
+        "MEMO1": ["rent", "rent rent deposit"],
+        "MEMO2": ["refund"],
+        "MEMO3": ["coffee", "rentals"],
+    }
+    with SessionLocal() as session:
+        store_transactions(
+            session,
+            [
+                {
+                    "hash": tx_hash,
+                    "ledger_index": 3000 + i,
+                    "account": "rMemoSearch",
+                    "destination": "rPeer",
+                    "amount_xrp": 1.0,
+                    "direction": "outbound",
+                    "memo": texts[0],
+                    "memos": texts,
+                    "timestamp": datetime(2023, 9, 1, 0, i),
+                }
+                for i, (tx_hash, texts) in enumerate(memos.items())
+            ],
+        )
+        session.commit()
+
+    params = {"q": "rent", "account": "rMemoSearch", "limit": 1}
+    with TestClient(app) as client:
+        first = client.get("/transactions", params=params).json()
+        second = client.get(
+            "/transactions", params={**params, "cursor": first["next_cursor"]}
+        ).json()
+        assert [item["hash"] for item in first["items"] + second["items"]] == ["MEMO1", "MEMO0"]
+        assert second["next_cursor"] is None
+        assert first["items"][0]["score"] <= second["items"][0]["score"]
+
+        prefix = client.get("/transactions", params={**params, "q": "rent*", "limit": 10})
+        assert {item["hash"] for item in prefix.json()["items"]} == {"MEMO0", "MEMO1", "MEMO3"}
+        # Operators and quotes are searched for, not parsed.
+        odd = client.get("/transactions", params={**params, "q": 'deposit" OR (refund'})
+        assert odd.json()["items"] == []
+        assert client.get("/transactions", params={"q": "**"}).status_code == 400
+
+        exported = client.get(
+            "/transactions/export", params={"q": "deposit", "account": "rMemoSearch"}
+        )
+        assert [json.loads(line)["hash"] for line in exported.text.splitlines()] == ["MEMO1"]
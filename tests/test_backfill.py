@@ -0,0 +1,187 @@
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app.backfill import BackfillEngine
+from app.models import CursorState
+from app.writer import BatchWriter
+
+
+class FakeResponse:
+    def __init__(self, result):
+        self.result = result
+
+    def is_successful(self):
+        return "error" not in self.result
+
+
+class FakeClient:
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+
+    async def request(self, req):
+        self.requests.append((req.account, req.ledger_index_min, req.marker))
+        return FakeResponse(self.pages[(req.account, req.marker)])
+
+
+class FakeWriter:
+    def __init__(self):
+        self.rows = []
+        self.quiet = []
+        self.cursor_frozen = False
+        self.settled = 0
+
+    async def put(self, tx_data):
+        self.rows.append(tx_data["hash"])
+        if tx_data.get("skip_alerts"):
+            self.quiet.append(tx_data["hash"])
+
+    async def settle_cursor(self):
+        self.settled += 1
+        self.cursor_frozen = False
+
+
+def item(tx_hash, ledger_index):
+    return {
+        "tx": {
+            "hash": tx_hash,
+            "ledger_index": ledger_index,
+            "Account": "rPeer",
+            "Destination": "rWatched",
+            "Amount": "1000000",
+            "date": 0,
+        },
+        "meta": {},
+        "validated": True,
+    }
+
+
+def test_backfill_follows_markers_and_settles_cursor():
+    client = FakeClient(
+        {
+            ("rA", None): {"transactions": [item("A1", 10)], "marker": "m1"},
+            ("rA", "m1"): {"transactions": [item("A2", 11)]},
+            ("rB", None): {"transactions": [item("B1", 12)]},
+        }
+    )
+    writer = FakeWriter()
+    engine = BackfillEngine(writer, concurrency=2)
+
+    ok = asyncio.run(engine.run(client, ["rA", "rB"], ledger_index_min=9))
+
+    assert ok
+    assert sorted(writer.rows) == ["A1", "A2", "B1"]
+    assert ("rA", 9, "m1") in client.requests
+    assert writer.settled == 1 and not writer.cursor_frozen
+    # Gap rows were missed live, so they still alert.
+    assert writer.quiet == []
+
+
+def test_failed_account_is_retried():
+    client = FakeClient({("rA", None): {"transactions": [item("A1", 10)]}})
+    responses = iter([FakeResponse({"error": "tooBusy"})])
+    request = client.request
+
+    async def flaky(req):
+        return next(responses, None) or await request(req)
+
+    client.request = flaky
+    writer = FakeWriter()
+    engine = BackfillEngine(writer, retry_delay=0)
+
+    assert asyncio.run(engine.run(client, ["rA"], ledger_index_min=9))
+    assert writer.rows == ["A1"] and writer.settled == 1
+
+
+def test_failed_backfill_releases_cursor_after_retries():
+    client = FakeClient({("rA", None): {"error": "actNotFound"}})
+    writer = FakeWriter()
+    engine = BackfillEngine(writer, retries=2, retry_delay=0)
+
+    assert not asyncio.run(engine.run(client, ["rA"], ledger_index_min=9))
+    assert len(client.requests) == 3
+    assert not writer.cursor_frozen and writer.settled == 1
+
+
+def test_shards_reconnecting_together_backfill_from_the_same_cursor():
+    writer = FakeWriter()
+    engine = BackfillEngine(writer)
+    stored = {"cursor": 9}
+    engine.start_ledger = lambda: stored["cursor"]
+    settle = writer.settle_cursor
+
+    async def settle_to_live():
+        # Live rows written meanwhile carry the cursor past both gaps.
+        await settle()
+        stored["cursor"] = 50
+
+    writer.settle_cursor = settle_to_live
+    shard_a = FakeClient({("rA", None): {"transactions": [item("A1", 10)]}})
+    shard_b = FakeClient({("rB", None): {"transactions": [item("B1", 11)]}})
+
+    async def reconnect():
+        await asyncio.gather(
+            engine.schedule(shard_a, ["rA"]), engine.schedule(shard_b, ["rB"])
+        )
+
+    asyncio.run(reconnect())
+
+    assert shard_a.requests == [("rA", 9, None)]
+    assert shard_b.requests == [("rB", 9, None)]
+    assert sorted(writer.rows) == ["A1", "B1"]
+    assert writer.settled == 1 and not writer.cursor_frozen
+
+
+def test_history_backfill_leaves_cursor_alone():
+    client = FakeClient({("rNew", None): {"transactions": [item("N1", 3)]}})
+    writer = FakeWriter()
+    engine = BackfillEngine(writer, watched={"rNew"})
+
+    assert asyncio.run(engine.run(client, ["rNew"], ledger_index_min=-1, hold_cursor=False))
+    assert writer.rows == ["N1"]
+    assert not writer.cursor_frozen and writer.settled == 0
+    assert writer.quiet == ["N1"]
+
+
+def live_row(tx_hash, ledger_index):
+    return {
+        "hash": tx_hash,
+        "ledger_index": ledger_index,
+        "account": "rPeer",
+        "destination": "rWatched",
+        "amount_xrp": 1.0,
+        "direction": "inbound",
+        "memo": None,
+        "timestamp": datetime(2024, 1, 1),
+        "raw": {},
+    }
+
+
+def test_cancelled_gap_backfill_keeps_its_gap_and_can_be_released(session_factory):
+    class HangingClient:
+        async def request(self, req):
+            await asyncio.Event().wait()
+
+    writer = BatchWriter(session_factory=session_factory)
+    engine = BackfillEngine(writer, session_factory=session_factory)
+
+    async def restart():
+        task = engine.schedule(HangingClient(), ["rA"])
+        await asyncio.sleep(0)
+        writer.write_batch([live_row("L1", 50)])
+        engine.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(restart())
+    with session_factory() as session:
+        assert session.scalar(select(CursorState.last_ledger_index)) is None
+    assert writer.cursor_frozen and engine.held == 0
+
+    # What CollectorService.run does before starting again.
+    writer.release_cursor()
+    assert not writer.cursor_frozen and writer._pending_ledger is None
+    writer.write_batch([live_row("L2", 60)])
+    with session_factory() as session:
+        assert session.scalar(select(CursorState.last_ledger_index)) == 60
@@ -0,0 +1,73 @@
+from app import balances
+from app.balances import balance_history, ensure_built, latest_balances, rebuild, total_balance
+from app.models import TransactionRaw, WatchedAccount
+from app.writer import store_transactions
+from app.xrpl_client import normalize_transaction
+
+WATCHED = "rWatchedBalanceAAAAAAAAAAAAAAAA"
+
+
+def event(tx_hash, ledger_index, tx_index, balance_drops, date):
+    return {
+        "type": "transaction",
+        "ledger_index": ledger_index,
+        "transaction": {
+            "hash": tx_hash,
+            "Account": WATCHED,
+            "Destination": "rPeer",
+            "Amount": "1000000",
+            "Fee": "12",
+            "date": date,
+        },
+        "meta": {
+            "TransactionIndex": tx_index,
+            "delivered_amount": "1000000",
+            "AffectedNodes": [
+                {
+                    "ModifiedNode": {
+                        "LedgerEntryType": "AccountRoot",
+                        "FinalFields": {"Account": WATCHED, "Balance": str(balance_drops)},
+                    }
+                },
+                {
+                    "ModifiedNode": {
+                        "LedgerEntryType": "AccountRoot",
+                        "FinalFields": {"Account": "rPeer", "Balance": "999"},
+                    }
+                },
+                {"CreatedNode": {"LedgerEntryType": "Offer", "NewFields": {}}},
+            ],
+        },
+    }
+
+
+def test_balances_follow_metadata_and_keep_last_in_ledger(session_factory):
+    session = session_factory()
+    session.add(WatchedAccount(address=WATCHED, history_complete=True))
+    watched = {WATCHED}
+    events = [
+        event("B1", 100, 3, 50_000_000, 700_000_000),
+        # Same ledger, later in it: wins even though it is stored first below.
+        event("B3", 101, 9, 30_000_000, 700_000_010),
+        event("B2", 101, 2, 40_000_000, 700_000_010),
+    ]
+    store_transactions(session, [normalize_transaction(e, watched) for e in events])
+
+    assert latest_balances(session) == {WATCHED: 30.0}
+    assert total_balance(session, [WATCHED, "rUnknown"]) == 30.0
+    history = balance_history(session, WATCHED)
+    assert [(p["ledger_index"], p["balance_xrp"]) for p in history] == [(100, 50.0), (101, 30.0)]
+
+    assert rebuild(session) == 3
+    assert latest_balances(session) == {WATCHED: 30.0}
+
+
+def test_ensure_built_rebuilds_once_even_if_no_balance_is_found(session_factory, monkeypatch):
+    calls = []
+    monkeypatch.setattr(balances, "rebuild", lambda session: calls.append(1) or 0)
+    with session_factory() as session:
+        session.add(TransactionRaw(hash="NOBALANCE", codec="zlib", data=b""))
+        assert ensure_built(session) is True
+        session.commit()
+        assert ensure_built(session) is False
+    assert calls == [1]
@@ -0,0 +1,124 @@
+import math
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app.balances import store_balances
+from app.charts import build_series, lttb, minmax
+from app.models import WatchedAccount
+from app.rollups import DAY, HOUR
+from app.writer import store_transactions
+
+
+def wave(count):
+    start = datetime(2024, 1, 1)
+    return [(start + timedelta(minutes=i), math.sin(i / 50) + (5 if i == 777 else 0)) for i in range(count)]
+
+
+def test_downsampling_keeps_endpoints_and_spikes():
+    points = wave(5000)
+    for sampled in (lttb(points, 200), minmax(points, 200)):
+        assert len(sampled) <= 200
+        assert points[777] in sampled
+        assert [ts for ts, _ in sampled] == sorted(ts for ts, _ in sampled)
+    assert lttb(points, 200)[0] == points[0] and lttb(points, 200)[-1] == points[-1]
+    assert lttb(points[:10], 200) == points[:10]
+
+
+def test_flow_series_reads_rollups_and_fits_the_budget(session_factory):
+    session = session_factory()
+    start = datetime(2022, 1, 1)
+    rows = [
+        {
+            "hash": f"C{i}",
+            "ledger_index": i + 1,
+            "account": "rPeer",
+            "destination": "rWatched",
+            "amount_xrp": 2.0,
+            "direction": "inbound",
+            "memo": None,
+            "timestamp": start + timedelta(hours=7 * i),
+        }
+        for i in range(1000)
+    ]
+    store_transactions(session, rows)
+    end = start + timedelta(days=365 * 2)
+
+    full = build_series(session, "inflow", start, end, points=5000, resolution=DAY)
+    assert len(full["points"]) == 730
+    assert sum(point["value"] for point in full["points"]) == 2000.0
+
+    chart = build_series(session, "tx_count", start, end, points=100)
+    assert chart["resolution"] == DAY
+    assert len(chart["points"]) <= 100
+
+
+def test_balance_series_samples_closing_balances(session_factory):
+    session = session_factory()
+    session.add(WatchedAccount(address="rWatched", history_complete=True))
+    start = datetime(2024, 1, 1)
+    store_balances(
+        session,
+        [
+            {
+                "balances": [
+                    {
+                        "account": "rWatched",
+                        "ledger_index": i + 1,
+                        "tx_index": 0,
+                        "balance_xrp": float(i),
+                        "timestamp": start + timedelta(minutes=30 * i),
+                        "tx_hash": None,
+                    }
+                    for i in range(48)
+                ]
+            }
+        ],
+    )
+    chart = build_series(session, "balance", start, start + timedelta(days=1), resolution=HOUR)
+    values = [point["value"] for point in chart["points"]]
+    assert len(values) == 24
+    assert values[0] == 1.0 and values[-1] == 47.0
+
+    coarse = build_series(session, "balance", start, start + timedelta(days=1), points=6, resolution=HOUR)
+    assert [point["value"] for point in coarse["points"]] == [7.0, 15.0, 23.0, 31.0, 39.0, 47.0]
+
+
+def test_balance_series_query_count_does_not_grow_with_points_or_accounts(session_factory):
+    session = session_factory()
+    accounts = [f"rWatched{i}" for i in range(5)]
+    session.add_all(WatchedAccount(address=a, history_complete=True) for a in accounts)
+    start = datetime(2024, 1, 1)
+    store_balances(
+        session,
+        [
+            {
+                "balances": [
+                    {
+                        "account": account,
+                        "ledger_index": i + 1,
+                        "tx_index": 0,
+                        "balance_xrp": float(i + n),
+                        "timestamp": start + timedelta(hours=6 * i - 12),
+                        "tx_hash": None,
+                    }
+                    for n, account in enumerate(accounts)
+                    for i in range(200)
+                ]
+            }
+        ],
+    )
+    session.flush()
+    statements = []
+    event.listen(
+        session.bind, "before_cursor_execute", lambda *args: statements.append(args[2])
+    )
+    end = start + timedelta(days=30)
+    chart = build_series(session, "balance", start, end, points=1000, resolution=HOUR)
+
+    assert len(statements) <= 3
+    values = [point["value"] for point in chart["points"]]
+    assert len(values) == 30 * 24
+    # 06:00 on day one: every account's third change (i=3) is the latest.
+    assert values[6] == sum(3.0 + n for n in range(5))
+    assert values[-1] == sum(float(121 + n) for n in range(5))
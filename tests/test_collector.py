@@ -0,0 +1,61 @@
+import asyncio
+import threading
+
+from app.collector import CollectorService, supervise
+from app.versions import local_version, notify_local, wait_local
+
+
+def test_supervise_rebuilds_and_restarts_the_collector():
+    attempts = []
+
+    class Flaky:
+        def __init__(self):
+            assert threading.current_thread() is not threading.main_thread()
+            attempts.append("init")
+            if attempts.count("init") == 1:
+                raise RuntimeError("startup failed")
+
+        async def run(self):
+            attempts.append("run")
+            if attempts.count("run") == 1:
+                raise RuntimeError("stream failed")
+            await asyncio.Event().wait()
+
+    async def scenario():
+        task = asyncio.create_task(supervise(Flaky, restart_seconds=0))
+        await asyncio.sleep(0.05)
+        assert not task.done()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        assert task.cancelled()
+
+    asyncio.run(scenario())
+    assert attempts == ["init", "init", "run", "run"]
+
+
+def test_wait_local_wakes_on_in_process_changes():
+    async def scenario():
+        seen = local_version("test")
+        waiter = asyncio.create_task(wait_local("test", seen, timeout=5))
+        await asyncio.sleep(0.01)
+        await asyncio.to_thread(notify_local, "test")
+        assert await asyncio.wait_for(waiter, 1) == seen + 1
+        # Nothing new: falls back to the poll interval.
+        assert await wait_local("test", seen + 1, timeout=0.01) == seen + 1
+
+    asyncio.run(scenario())
+
+
+def test_replayed_history_does_not_alert():
+    evaluated = []
+
+    class Engine:
+        async def evaluate(self, tx_data):
+            evaluated.append(tx_data["hash"])
+
+    class Service:
+        alert_engine = Engine()
+
+    rows = [{"hash": "LIVE"}, {"hash": "OLD", "skip_alerts": True}]
+    asyncio.run(CollectorService.on_commit(Service(), rows))
+    assert evaluated == ["LIVE"]
@@ -0,0 +1,120 @@
+import asyncio
+import time
+
+from app.connections import ConnectionManager, SubscriptionShards
+
+
+class FakeClient:
+    def __init__(self, messages, delay=0.0):
+        self.messages = messages
+        self.delay = delay
+
+    async def __aiter__(self):
+        for message in self.messages:
+            await asyncio.sleep(self.delay)
+            yield message
+
+
+class OpenClient(FakeClient):
+    """Delivers its messages, then stays connected and silent."""
+
+    def is_open(self):
+        return True
+
+    async def __aiter__(self):
+        async for message in super().__aiter__():
+            yield message
+        await asyncio.Event().wait()
+
+
+class FakeSubscriber:
+    def __init__(self):
+        self.requests = []
+
+    async def request(self, req):
+        self.requests.append(req)
+
+
+def tx(tx_hash):
+    return {"type": "transaction", "transaction": {"hash": tx_hash}}
+
+
+def test_first_copy_wins_and_late_copies_update_lag():
+    manager = ConnectionManager(["wss://fast", "wss://slow"], hedge=2)
+    fast, slow = manager.endpoints
+    messages = [tx("A"), {"type": "ledgerClosed", "ledger_index": 9}, tx("B")]
+
+    async def scenario():
+        await asyncio.gather(
+            manager._read(fast, FakeClient(messages, delay=0.01)),
+            manager._read(slow, FakeClient(messages, delay=0.03)),
+        )
+        delivered = []
+        while not manager._out.empty():
+            delivered.append(manager._out.get_nowait()["transaction"]["hash"])
+        return delivered
+
+    assert asyncio.run(scenario()) == ["A", "B"]
+    assert fast.first_copies == 3 and slow.late_copies == 3
+    assert slow.lag > fast.lag == 0.0
+    assert manager._pick() is fast
+
+
+def test_shards_route_accounts_and_update_live_subscriptions():
+    shards = SubscriptionShards(["wss://a"], shards=3, hedge=1)
+    accounts = [f"rAccount{i}" for i in range(12)]
+    parts = shards.partition(accounts)
+    assert sorted(a for part in parts.values() for a in part) == sorted(accounts)
+    assert all(shards.managers[i] is shards.shard_for(a) for i, p in parts.items() for a in p)
+    assert all(manager.seen is shards.seen for manager in shards.managers)
+
+    manager = shards.shard_for("rNew")
+    client = FakeSubscriber()
+    manager.clients.add(client)
+
+    async def scenario():
+        await shards.add_accounts(["rNew"])
+        await shards.add_accounts(["rNew"])
+        await shards.remove_accounts(["rNew"])
+
+    asyncio.run(scenario())
+    assert [(r.method, r.accounts) for r in client.requests] == [
+        ("subscribe", ["rNew"]),
+        ("unsubscribe", ["rNew"]),
+    ]
+    assert "rNew" not in shards.accounts
+
+
+def test_backpressure_does_not_trip_the_heartbeat():
+    manager = ConnectionManager(["wss://a"], hedge=1, heartbeat_timeout=0.2, out=asyncio.Queue(1))
+    (endpoint,) = manager.endpoints
+
+    async def scenario():
+        endpoint.last_message_at = time.monotonic()
+        client = OpenClient([tx("A"), tx("B"), tx("C")])
+        pump = asyncio.create_task(manager._pump(endpoint, client))
+        # The consumer stalls for longer than the heartbeat timeout.
+        await asyncio.sleep(0.5)
+        assert not pump.done()
+        delivered = [(await manager._out.get())["transaction"]["hash"] for _ in range(3)]
+        pump.cancel()
+        await asyncio.gather(pump, return_exceptions=True)
+        return delivered
+
+    assert asyncio.run(scenario()) == ["A", "B", "C"]
+
+
+def test_ledger_closes_are_compared_within_a_shard():
+    shards = SubscriptionShards(["wss://a", "wss://b"], shards=2, hedge=2)
+    closed = [{"type": "ledgerClosed", "ledger_index": 9}]
+
+    async def scenario():
+        for manager in shards.managers:
+            await manager._read(manager.endpoints[0], FakeClient(closed))
+            await manager._read(manager.endpoints[1], FakeClient(closed, delay=0.01))
+
+    asyncio.run(scenario())
+    for manager in shards.managers:
+        first, late = manager.endpoints
+        assert (first.first_copies, first.late_copies) == (1, 0)
+        assert (late.first_copies, late.late_copies) == (0, 1)
@@ -0,0 +1,41 @@
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.exc import OperationalError
+
+from app.db import ReadSession, SessionLocal, get_read_engine, get_write_engine, init_db
+from app.models import WatchedAccount
+
+
+def test_database_runs_in_wal_mode():
+    init_db()
+    for engine in (get_write_engine(), get_read_engine()):
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+
+
+def test_read_engine_rejects_writes():
+    init_db()
+    with ReadSession() as session:
+        with pytest.raises(OperationalError):
+            session.execute(
+                text("INSERT INTO watched_accounts (address, history_complete) VALUES ('rRO', 0)")
+            )
+
+
+def test_readers_see_committed_rows_while_a_write_is_open():
+    init_db()
+    with SessionLocal() as session:
+        session.add(WatchedAccount(address="rCommittedDbTest", history_complete=True))
+        session.commit()
+
+    stmt = select(WatchedAccount.address).where(WatchedAccount.address.like("r%DbTest"))
+    with SessionLocal() as writer:
+        writer.add(WatchedAccount(address="rPendingDbTest", history_complete=True))
+        # BEGIN IMMEDIATE: the write lock is held until the commit below.
+        writer.flush()
+        with ReadSession() as reader:
+            assert list(reader.scalars(stmt)) == ["rCommittedDbTest"]
+        writer.commit()
+
+    with ReadSession() as reader:
+        assert sorted(reader.scalars(stmt)) == ["rCommittedDbTest", "rPendingDbTest"]
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import time
+
+from sqlalchemy import select
+
+from app.config import Settings
+from app.delivery import DeliveryWorker
+from app.models import AlertDelivery
+
+
+class FlakyChannel:
+    name = "webhook"
+    concurrency = 2
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.sent = []
+
+    def send(self, payload):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("boom")
+        self.sent.append(payload["id"])
+
+    def close(self):
+        pass
+
+
+def test_delivery_worker_retries_until_sent(session_factory):
+    settings = Settings(
+        WEBHOOK_URL="http://example.invalid/hook",
+        ALERT_RETRY_BASE_SECONDS=0,
+        OUTBOX_POLL_SECONDS=0.01,
+    )
+    worker = DeliveryWorker(settings, session_factory=session_factory)
+    channel = FlakyChannel(failures=2)
+    worker.channels = {"webhook": channel}
+
+    with session_factory() as session:
+        worker.enqueue(session, 7, {"id": 7, "message": "hi", "tx_hash": "H"})
+        session.commit()
+
+    async def scenario():
+        task = asyncio.create_task(worker.run())
+        await asyncio.sleep(0.3)
+        task.cancel()
+
+    asyncio.run(scenario())
+
+    assert channel.sent == [7]
+    with session_factory() as session:
+        row = session.scalars(select(AlertDelivery)).one()
+        assert (row.status, row.attempts) == ("sent", 3)
+
+
+class SlowChannel(FlakyChannel):
+    def __init__(self, started):
+        super().__init__(failures=0)
+        self.started = started
+
+    def send(self, payload):
+        self.started.set()
+        time.sleep(0.2)
+        super().send(payload)
+
+
+def test_restarted_worker_does_not_resend_in_flight_alerts(session_factory):
+    settings = Settings(WEBHOOK_URL="http://example.invalid/hook", OUTBOX_POLL_SECONDS=0.01)
+    worker = DeliveryWorker(settings, session_factory=session_factory)
+    started = threading.Event()
+    channel = SlowChannel(started)
+    worker.channels = {"webhook": channel}
+
+    with session_factory() as session:
+        worker.enqueue(session, 8, {"id": 8, "message": "hi", "tx_hash": "H"})
+        session.commit()
+
+    async def scenario():
+        task = asyncio.create_task(worker.run())
+        await asyncio.to_thread(started.wait, 1)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        # Same process, same worker: the collector's supervisor restarts it.
+        task = asyncio.create_task(worker.run())
+        await asyncio.sleep(0.1)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(scenario())
+
+    assert channel.sent == [8]
+    with session_factory() as session:
+        row = session.scalars(select(AlertDelivery)).one()
+        assert (row.status, row.attempts) == ("sent", 1)
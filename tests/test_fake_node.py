@@ -0,0 +1,50 @@
+import asyncio
+
+from xrpl.asyncio.clients import AsyncWebsocketClient
+from xrpl.models.requests import AccountTx, Subscribe
+
+from bench.fake_node import FakeXRPLNode, synthetic_transactions
+
+WATCHED = "rBenchWatchedAAAAAAAAAAAAAAAAAA"
+
+
+def test_fake_node_streams_to_subscribers_and_pages_account_tx():
+    history = {
+        WATCHED: [
+            {"tx": {"hash": f"H{i}", "ledger_index": 10 + i}, "meta": {}, "validated": True}
+            for i in range(5)
+        ]
+    }
+
+    async def scenario():
+        source = synthetic_transactions([WATCHED], count=3, seed=9)
+        async with FakeXRPLNode(source, rate=1000, history=history) as node:
+            client = AsyncWebsocketClient(node.url)
+            await client.open()
+            try:
+                response = await client.request(Subscribe(accounts=[WATCHED]))
+                assert response.is_successful()
+                hashes = []
+                async for message in client:
+                    if message.get("type") != "transaction":
+                        continue
+                    hashes.append(message["transaction"]["hash"])
+                    if len(hashes) == 3:
+                        break
+                pages = []
+                marker = None
+                while True:
+                    page = await client.request(
+                        AccountTx(account=WATCHED, ledger_index_min=12, limit=2, marker=marker)
+                    )
+                    pages.append([item["tx"]["hash"] for item in page.result["transactions"]])
+                    marker = page.result.get("marker")
+                    if not marker:
+                        break
+            finally:
+                await client.close()
+        return hashes, pages
+
+    hashes, pages = asyncio.run(asyncio.wait_for(scenario(), 10))
+    assert len(set(hashes)) == 3
+    assert pages == [["H2", "H3"], ["H4"]]
@@ -0,0 +1,108 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import delete
+
+from app.db import ReadSession, SessionLocal, init_db
+from app.feed import (
+    ALERT,
+    TRANSACTION,
+    FeedEvent,
+    FeedHub,
+    encode_sse,
+    fetch_after,
+    format_id,
+    head_position,
+    parse_id,
+)
+from app.models import AlertEvent, Transaction
+from app.versions import DATA, bump_version
+from app.writer import store_transactions
+
+
+def write_activity(prefix):
+    with SessionLocal() as session:
+        store_transactions(
+            session,
+            [
+                {
+                    "hash": f"{prefix}{i}",
+                    "ledger_index": 5000 + i,
+                    "account": "rPeer",
+                    "destination": "rWatched",
+                    "amount_xrp": 1.0,
+                    "direction": "inbound",
+                    "memo": None,
+                    "timestamp": datetime(2024, 2, 1, 12, i),
+                }
+                for i in range(3)
+            ],
+        )
+        session.add(AlertEvent(transaction_hash=f"{prefix}0", message=f"{prefix} alert"))
+        bump_version(session, DATA)
+        session.commit()
+
+
+async def take(stream, count):
+    events = []
+    async for event in stream:
+        if event is not None:
+            events.append(event)
+        if len(events) == count:
+            return events
+
+
+def test_feed_fans_out_and_resumes_from_event_id():
+    init_db()
+
+    async def scenario():
+        hub = FeedHub(poll_seconds=0.01, heartbeat_seconds=5, queue_size=1)
+        await hub.start()
+        readers = [asyncio.create_task(take(hub.stream(), 4)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert len(hub.subscribers) == 2
+        await asyncio.to_thread(write_activity, "FEEDA")
+        first, second = await asyncio.wait_for(asyncio.gather(*readers), 5)
+        assert [event.data.get("hash") for event in first[:3]] == ["FEEDA0", "FEEDA1", "FEEDA2"]
+        assert [event.kind for event in first] == [TRANSACTION] * 3 + [ALERT]
+        assert first == second
+
+        # Resume after the first transaction, then follow live rows.
+        resumed = hub.stream(parse_id(format_id(first[0].position)))
+        backlog = await asyncio.wait_for(take(resumed, 3), 5)
+        assert [event.position for event in backlog] == [event.position for event in first[1:]]
+        await asyncio.to_thread(write_activity, "FEEDB")
+        live = await asyncio.wait_for(take(resumed, 4), 5)
+        assert live[0].data["hash"] == "FEEDB0"
+        await resumed.aclose()
+        await hub.stop()
+        assert not hub.subscribers
+
+    asyncio.run(scenario())
+
+
+def test_sse_frames_and_ids():
+    event = FeedEvent(ALERT, (12, 3), {"id": 3})
+    assert encode_sse(event) == b'id: 12-3\nevent: alert\ndata: {"id":3}\n\n'
+    assert encode_sse(None) == b": keep-alive\n\n"
+    assert parse_id("12-3") == (12, 3)
+    with pytest.raises(ValueError):
+        parse_id("bogus")
+
+
+def test_feed_ids_survive_deleting_the_newest_transaction():
+    init_db()
+    write_activity("FEEDC")
+    with ReadSession() as session:
+        position = head_position(session)
+    # Retention (or a manual cleanup) removes the newest row; its rowid is
+    # free again, but the feed sequence must not hand it out twice.
+    with SessionLocal() as session:
+        session.execute(delete(Transaction).where(Transaction.hash == "FEEDC2"))
+        session.commit()
+    write_activity("FEEDD")
+    with ReadSession() as session:
+        events, _ = fetch_after(session, position, 100)
+    hashes = [event.data["hash"] for event in events if event.kind == TRANSACTION]
+    assert hashes == ["FEEDD0", "FEEDD1", "FEEDD2"]
@@ -0,0 +1,54 @@
+import asyncio
+import gzip
+import json
+
+from sqlalchemy import func, select
+
+from app.db import SessionLocal, init_db
+from app.importer import read_dump, run_import
+from app.models import CursorState, Transaction
+
+WATCHED = "rImportWatchedAAAAAAAAAAAAAAAA"
+
+
+def item(i):
+    return {
+        "tx": {
+            "hash": f"IMPORT{i:04d}",
+            "ledger_index": 500 + i,
+            "Account": "rPeer" if i % 2 else WATCHED,
+            "Destination": WATCHED if i % 2 else "rPeer",
+            "Amount": "2000000",
+            "date": 700_000_000 + i,
+        },
+        "meta": {"delivered_amount": "2000000"},
+        "validated": True,
+    }
+
+
+def test_import_reads_every_dump_shape_and_rebuilds_cursor(tmp_path):
+    jsonl = tmp_path / "a.jsonl.gz"
+    with gzip.open(jsonl, "wt") as handle:
+        for i in range(6):
+            handle.write(json.dumps(item(i)) + "\n")
+        # A whole response on one line, overlapping the items above.
+        handle.write(json.dumps({"result": {"transactions": [item(5), item(6)]}}) + "\n")
+    response = tmp_path / "b.json"
+    response.write_text(json.dumps({"result": {"transactions": [item(7), item(8)]}}))
+    assert len(list(read_dump(jsonl))) == 8
+
+    init_db()
+    stats = asyncio.run(
+        run_import([jsonl, response], [WATCHED], workers=1, chunk_size=3, skip_alerts=True)
+    )
+
+    assert stats["items"] == 10 and stats["inserted"] == 9
+    assert stats["cursor"] >= 508
+    with SessionLocal() as session:
+        rows = session.execute(
+            select(Transaction.direction, func.count())
+            .where(Transaction.hash.like("IMPORT%"))
+            .group_by(Transaction.direction)
+        ).all()
+        assert dict(rows) == {"inbound": 4, "outbound": 5}
+        assert session.scalar(select(CursorState.last_ledger_index)) >= 508
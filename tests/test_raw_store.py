@@ -0,0 +1,57 @@
+import json
+import sqlite3
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.migrations import migrate
+from app.models import Base, TransactionRaw
+from app.raw_store import ZLIB, RawCodec, load_raw, zstandard
+
+EVENT = {
+    "type": "transaction",
+    "transaction": {"hash": "H1", "Account": "rA", "Amount": "1000000"},
+    "meta": {"AffectedNodes": [{"ModifiedNode": {"LedgerEntryType": "AccountRoot"}}]},
+}
+
+
+def test_codecs_round_trip():
+    codec = RawCodec(codec=ZLIB)
+    name, dict_id, data = codec.compress(None, EVENT)
+    assert (name, dict_id) == (ZLIB, None)
+    assert codec.decompress(None, name, dict_id, data) == EVENT
+    if zstandard is not None:
+        zstd = RawCodec(codec="zstd")
+        zstd._dict_loaded = True
+        zstd._compressor = zstandard.ZstdCompressor(level=3)
+        name, dict_id, data = zstd.compress(None, EVENT)
+        assert zstd.decompress(None, name, dict_id, data) == EVENT
+
+
+def test_migration_moves_legacy_raw_column(tmp_path):
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE transactions (hash VARCHAR(128) PRIMARY KEY, ledger_index INTEGER NOT NULL, "
+        "account VARCHAR(64) NOT NULL, destination VARCHAR(64), amount_xrp FLOAT NOT NULL, "
+        "direction VARCHAR(8) NOT NULL, memo TEXT, timestamp DATETIME NOT NULL, raw JSON)"
+    )
+    conn.execute(
+        "INSERT INTO transactions VALUES ('H1', 1, 'rA', 'rB', 1.0, 'outbound', NULL, "
+        "'2024-01-01 00:00:00', ?)",
+        (json.dumps(EVENT),),
+    )
+    conn.commit()
+    conn.close()
+
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    migrate(engine, Base.metadata)
+    migrate(engine, Base.metadata)
+
+    with engine.connect() as conn:
+        columns = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(transactions)")}
+    assert "raw" not in columns
+    with sessionmaker(bind=engine)() as session:
+        assert session.scalars(select(TransactionRaw.hash)).all() == ["H1"]
+        assert load_raw(session, "H1") == EVENT
@@ -0,0 +1,107 @@
+import asyncio
+import json
+from datetime import datetime
+
+from sqlalchemy import event, select
+
+from app.config import get_settings
+from app.db import SessionLocal, get_read_engine, init_db
+from app.models import ArchivePartition, Transaction, TransactionRaw
+from app.retention import month_bounds, run_retention
+from app.schemas import TransactionQuery
+from app.services.tx_service import TransactionService
+from app.writer import store_transactions
+
+ACCOUNT = "rRetentionAAAAAAAAAAAAAAAAAAAAA"
+# Far enough back that no other test's rows fall before the cutoff.
+TIMES = [
+    datetime(2000, 11, 10),
+    datetime(2000, 11, 20),
+    datetime(2001, 1, 5),
+    datetime(2001, 3, 1),
+    datetime(2001, 3, 5),
+]
+
+
+def seed():
+    with SessionLocal() as session:
+        store_transactions(
+            session,
+            [
+                {
+                    "hash": f"RET{i}",
+                    "ledger_index": 100 + i,
+                    "account": ACCOUNT,
+                    "destination": "rPeer",
+                    "amount_xrp": float(i + 1),
+                    "direction": "outbound",
+                    "memo": None,
+                    "timestamp": ts,
+                    "raw": {"transaction": {"hash": f"RET{i}"}},
+                }
+                for i, ts in enumerate(TIMES)
+            ],
+        )
+        session.commit()
+
+
+def test_month_bounds_roll_over_the_year():
+    assert month_bounds("2001-12") == (datetime(2001, 12, 1), datetime(2002, 1, 1))
+
+
+def test_retention_archives_old_months_and_reads_span_them():
+    init_db()
+    seed()
+
+    stats = run_retention(days=30, batch_size=1, now=datetime(2001, 3, 10))
+
+    assert stats["moved"] == 3
+    assert stats["months"] == ["2000-11", "2001-01"]
+    # December had nothing to move, so it gets no file.
+    assert not (get_settings().archive_path / "transactions-2000-12.db").exists()
+    with SessionLocal() as session:
+        hot = session.scalars(select(Transaction.hash).where(Transaction.account == ACCOUNT))
+        assert sorted(hot) == ["RET3", "RET4"]
+        assert session.get(TransactionRaw, "RET0") is None
+        november = session.get(ArchivePartition, "2000-11")
+        assert (november.row_count, november.min_timestamp) == (2, TIMES[0])
+
+    service = TransactionService()
+    query = TransactionQuery(account=ACCOUNT, limit=2)
+    pages = [service.list(query)]
+    while pages[-1]["next_cursor"]:
+        pages.append(service.list(query.model_copy(update={"cursor": pages[-1]["next_cursor"]})))
+    hashes = [item["hash"] for page in pages for item in page["items"]]
+    assert hashes == ["RET4", "RET3", "RET2", "RET1", "RET0"]
+
+    assert asyncio.run(service.list_async(query)) == pages[0]
+
+    # A page the hot table fills on its own attaches no archive.
+    statements = []
+    record = lambda conn, cursor, statement, *args: statements.append(statement)  # noqa: E731
+    event.listen(get_read_engine(), "before_cursor_execute", record)
+    try:
+        page = service.list(TransactionQuery(account=ACCOUNT, limit=1))
+    finally:
+        event.remove(get_read_engine(), "before_cursor_execute", record)
+    assert [item["hash"] for item in page["items"]] == ["RET4"]
+    assert not [statement for statement in statements if "ATTACH" in statement]
+
+    recent = service.list(TransactionQuery(account=ACCOUNT, since=datetime(2001, 2, 20)))
+    assert [item["hash"] for item in recent["items"]] == ["RET4", "RET3"]
+
+    # Memo search covers the hot table and names the archived months it skipped.
+    search = TransactionQuery(account=ACCOUNT, q="rent", since=datetime(2000, 1, 1))
+    assert service.list(search)["unsearched_months"] == ["2001-01", "2000-11"]
+    search = search.model_copy(update={"since": datetime(2001, 2, 20)})
+    assert service.list(search)["unsearched_months"] == []
+
+    exported = b"".join(service.export(TransactionQuery(account=ACCOUNT)))
+    assert [json.loads(line)["hash"] for line in exported.splitlines()] == hashes
+
+    archived = asyncio.run(service.get_async("RET0"))
+    assert archived["amount_xrp"] == 1.0
+    assert archived["raw"] == {"transaction": {"hash": "RET0"}}
+
+    # Nothing left before the cutoff: a second pass is a no-op.
+    assert run_retention(days=30, now=datetime(2001, 3, 10))["moved"] == 0
@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+
+from app.rule_index import KeywordMatcher, RuleIndex
+
+
+def rule(rule_id, min_amount_xrp=None, direction=None, counterparty=None, memo_keyword=None):
+    return SimpleNamespace(
+        id=rule_id,
+        min_amount_xrp=min_amount_xrp,
+        direction=direction,
+        counterparty=counterparty,
+        memo_keyword=memo_keyword,
+    )
+
+
+def tx(amount_xrp, direction="inbound", counterparty="rPeer", memo=None):
+    return {
+        "amount_xrp": amount_xrp,
+        "direction": direction,
+        "counterparty": counterparty,
+        "memo": memo,
+    }
+
+
+def test_keyword_matcher_finds_overlapping_keywords():
+    matcher = KeywordMatcher(["pay", "payment", "men", "rent"])
+    assert matcher.find("monthly payment for rent") == {"pay", "payment", "men", "rent"}
+    assert matcher.find("nothing here") == set()
+
+
+def test_rule_index_matches_like_a_linear_scan():
+    rules = [
+        rule(1, min_amount_xrp=100),
+        rule(2, direction="outbound"),
+        rule(3, counterparty="rPeer", min_amount_xrp=10),
+        rule(4, memo_keyword="Invoice"),
+        rule(5, direction="inbound", memo_keyword="voice", min_amount_xrp=5),
+        rule(6, counterparty="rOther"),
+    ]
+    index = RuleIndex(rules)
+
+    assert [r.id for r in index.match(tx(1))] == []
+    assert [r.id for r in index.match(tx(50))] == [3]
+    assert [r.id for r in index.match(tx(150, memo="INVOICE 42"))] == [1, 3, 4, 5]
+    assert [r.id for r in index.match(tx(2, direction="outbound", counterparty="rOther"))] == [2, 6]
+    # Keywords are found in every memo, but never across two of them.
+    second = {**tx(150, memo="rent"), "memos": ["rent", "invoice 42"]}
+    assert [r.id for r in index.match(second)] == [1, 3, 4, 5]
+    split = {**tx(150, memo="inv"), "memos": ["inv", "oice"]}
+    assert [r.id for r in index.match(split)] == [1, 3]
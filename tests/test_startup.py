@@ -0,0 +1,17 @@
+import subprocess
+import sys
+
+from bench.startup import DEFERRED
+
+
+def test_importing_the_app_defers_heavy_modules():
+    # A fresh interpreter: this one has imported everything already.
+    code = (
+        "import sys, app.mcp_server, app.collector, app.db; "
+        f"print(','.join(name for name in {DEFERRED!r} if name in sys.modules)); "
+        "print(app.db.get_write_engine.cache_info().currsize)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    ).stdout.splitlines()
+    assert output == ["", "0"]
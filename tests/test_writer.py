@@ -0,0 +1,94 @@
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app.dedup import BloomFilter, SeenHashes
+from app.models import CursorState, Transaction
+from app.writer import BatchWriter
+
+
+def make_tx(tx_hash, ledger_index):
+    return {
+        "hash": tx_hash,
+        "ledger_index": ledger_index,
+        "account": "rSender",
+        "destination": "rWatched",
+        "amount_xrp": 1.5,
+        "direction": "inbound",
+        "counterparty": "rSender",
+        "memo": None,
+        "timestamp": datetime(2024, 1, 1),
+        "raw": {},
+    }
+
+
+def test_batch_writer_ignores_duplicates_and_advances_cursor_once(session_factory):
+    committed = []
+
+    async def on_commit(rows):
+        committed.extend(row["hash"] for row in rows)
+
+    async def scenario():
+        writer = BatchWriter(
+            batch_size=10,
+            flush_interval=0.01,
+            on_commit=on_commit,
+            session_factory=session_factory,
+        )
+        task = asyncio.create_task(writer.run())
+        for tx in [make_tx("A", 5), make_tx("B", 7), make_tx("A", 5)]:
+            await writer.put(tx)
+        await asyncio.sleep(0.1)
+        await writer.put(make_tx("B", 7))
+        await asyncio.sleep(0.1)
+        task.cancel()
+
+    asyncio.run(scenario())
+
+    assert committed == ["A", "B"]
+    with session_factory() as session:
+        assert session.scalars(select(Transaction.hash)).all() == ["A", "B"]
+        cursors = session.scalars(select(CursorState)).all()
+        assert [cursor.last_ledger_index for cursor in cursors] == [7]
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, error_rate=0.01)
+    keys = [f"HASH{i}" for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    assert sum(f"OTHER{i}" in bloom for i in range(1000)) < 50
+
+
+def test_dedup_filter_rotates_instead_of_saturating():
+    seen = SeenHashes(10, bloom_capacity=1000, error_rate=0.01)
+    for i in range(20_000):
+        seen.add(f"HASH{i}")
+    # The newest generation is still remembered.
+    assert all(seen.check(f"HASH{i}") is not False for i in range(19_000, 20_000))
+    # Unseen hashes rarely need the database lookup.
+    fallbacks = sum(seen.check(f"OTHER{i}") is None for i in range(2000))
+    assert fallbacks < 2000 * 0.05
+
+
+def test_dedup_filter_drops_replays_before_the_queue(session_factory):
+    with session_factory() as session:
+        session.add(Transaction(**{k: v for k, v in make_tx("OLD", 1).items() if k != "raw"}))
+        session.commit()
+
+    async def scenario():
+        writer = BatchWriter(
+            session_factory=session_factory, dedup=SeenHashes(10, bloom_capacity=100)
+        )
+        writer.warm_dedup(10)
+        assert writer.dedup.check("OLD") is True
+        writer.dedup.recent.clear()
+        assert writer.dedup.check("OLD") is None
+        for tx in [make_tx("OLD", 1), make_tx("NEW", 2), make_tx("NEW", 2)]:
+            await writer.put(tx)
+        return writer
+
+    writer = asyncio.run(scenario())
+    assert writer.queue.qsize() == 1 and writer.duplicates == 2